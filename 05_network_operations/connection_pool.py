@@ -0,0 +1,320 @@
+"""
+Section 05: Netmiko Connection Pool
+
+Opening a Netmiko session costs a TCP connect, an SSH key exchange, a login
+and the driver's session preparation (prompt detection, terminal length 0) -
+often seconds against a real device - while the show command itself takes
+milliseconds. ConnectionPool keeps sessions open and hands them out again:
+
+- sessions are keyed by device (host, port, username, device_type)
+- at most max_per_device sessions per device; further callers wait up to
+  checkout_timeout for one to come back (raises PoolTimeout)
+- a session that sat idle longer than validate_after is checked with
+  is_alive() before it is handed out; a dead one is replaced transparently
+- a background thread sends keepalives (is_alive() writes to the channel) to
+  idle sessions every keepalive_interval, and closes sessions idle longer
+  than idle_timeout or older than max_lifetime
+- a session whose command raised is closed instead of reused, since its
+  channel may be mid-output
+- everything is guarded by one Condition, so FastAPI's threadpool can share
+  the pool; SSH connects and keepalives run outside the lock
+
+Usage:
+    pool = ConnectionPool(max_per_device=2)
+    with pool.session(device) as net_connect:
+        output = net_connect.send_command("show version")
+
+Run this file directly for a benchmark against a local SSH stand-in:
+python connection_pool.py
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from netmiko import ConnectHandler
+
+
+class PoolTimeout(Exception):
+    """No session for the device became free within checkout_timeout."""
+
+
+class PooledSession:
+    """One open Netmiko connection and its bookkeeping."""
+
+    __slots__ = ("key", "connection", "created", "last_used", "checked", "uses")
+
+    def __init__(self, key, connection, now: float):
+        self.key = key
+        self.connection = connection
+        self.created = now
+        self.last_used = now
+        self.checked = now  # Last time the session was known to be alive
+        self.uses = 0
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of Netmiko sessions, keyed by device.
+
+    - connect:            callable(**device) -> connection (default ConnectHandler)
+    - max_per_device:     open sessions allowed per device
+    - idle_timeout:       close sessions unused this long (0 = close on checkin)
+    - max_lifetime:       close sessions this old, however busy
+    - keepalive_interval: probe idle sessions this often
+    - validate_after:     probe an idle session before reuse once it sat this long
+    - checkout_timeout:   how long a caller waits for a busy device's session
+    """
+
+    def __init__(self, connect=None, max_per_device: int = 2, idle_timeout: float = 300.0,
+                 max_lifetime: float = 3600.0, keepalive_interval: float = 60.0, validate_after: float = 30.0,
+                 checkout_timeout: float = 30.0, clock=time.monotonic):
+        self.connect = connect or ConnectHandler
+        self.max_per_device = max_per_device
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.keepalive_interval = keepalive_interval
+        self.validate_after = validate_after
+        self.checkout_timeout = checkout_timeout
+        self.clock = clock
+        self._idle = {}   # key -> [PooledSession], most recently used last
+        self._open = {}   # key -> sessions open or being opened (idle + in use)
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._closed = False
+
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.evicted = 0
+        self.health_failures = 0
+        self.waits = 0
+        self.timeouts = 0
+
+    @staticmethod
+    def key(device: dict):
+        return (device["host"], int(device.get("port") or 22), device.get("username"), device["device_type"])
+
+    def open_count(self):
+        with self._condition:
+            return sum(self._open.values())
+
+    @contextmanager
+    def session(self, device: dict):
+        """Borrow a connection for the duration of the with-block."""
+        pooled = self.checkout(device)
+        try:
+            yield pooled.connection
+        except BaseException:
+            self.checkin(pooled, broken=True)
+            raise
+        self.checkin(pooled)
+
+    def checkout(self, device: dict):
+        key = self.key(device)
+        deadline = self.clock() + self.checkout_timeout
+        while True:
+            pooled = None
+            with self._condition:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                while True:
+                    idle = self._idle.get(key)
+                    if idle:
+                        pooled = idle.pop()
+                        break
+                    if self._open.get(key, 0) < self.max_per_device:
+                        self._open[key] = self._open.get(key, 0) + 1  # Reserve the slot, connect outside the lock
+                        break
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(f"No session to {key[0]} free within {self.checkout_timeout}s "
+                                          f"({self.max_per_device} in use)")
+                    self.waits += 1
+                    self._condition.wait(remaining)
+
+            if pooled is None:
+                return self._open_session(key, device)
+
+            now = self.clock()
+            if now - pooled.created >= self.max_lifetime:
+                self._discard(pooled)
+                continue
+            if now - max(pooled.last_used, pooled.checked) >= self.validate_after:
+                if not self._alive(pooled):
+                    with self._condition:
+                        self.health_failures += 1
+                    self._discard(pooled)
+                    continue
+            with self._condition:
+                self.reused += 1
+            return pooled
+
+    def _open_session(self, key, device):
+        try:
+            connection = self.connect(**device)
+        except BaseException:
+            with self._condition:
+                self._release_slot(key)
+            raise
+        with self._condition:
+            self.created += 1
+        return PooledSession(key, connection, self.clock())
+
+    def checkin(self, pooled: PooledSession, broken: bool = False):
+        if broken or self._closed or self.idle_timeout <= 0:
+            if broken:
+                with self._condition:
+                    self.discarded += 1
+            return self._discard(pooled)
+        with self._condition:
+            pooled.last_used = self.clock()
+            pooled.uses += 1
+            self._idle.setdefault(pooled.key, []).append(pooled)
+            self._condition.notify_all()
+
+    def _alive(self, pooled: PooledSession):
+        try:
+            alive = pooled.connection.is_alive()
+        except Exception:
+            alive = False
+        if alive:
+            pooled.checked = self.clock()
+        return alive
+
+    def _release_slot(self, key):
+        remaining = self._open.get(key, 0) - 1
+        if remaining > 0:
+            self._open[key] = remaining
+        else:
+            self._open.pop(key, None)
+            self._idle.pop(key, None)
+        self._condition.notify_all()
+
+    def _discard(self, pooled: PooledSession):
+        try:
+            pooled.connection.disconnect()
+        except Exception:
+            pass  # Already gone
+        with self._condition:
+            self._release_slot(pooled.key)
+
+    # ----- background maintenance ----------------------------------------
+
+    def maintain(self):
+        """Close expired idle sessions and send keepalives to the rest (one pass)."""
+        now = self.clock()
+        expired = []
+        probe = []
+        with self._condition:
+            for key, idle in self._idle.items():
+                keep = []
+                for pooled in idle:
+                    if now - pooled.last_used >= self.idle_timeout or now - pooled.created >= self.max_lifetime:
+                        expired.append(pooled)
+                    elif now - max(pooled.last_used, pooled.checked) >= self.keepalive_interval:
+                        probe.append(pooled)  # Out of the idle list while it is probed
+                    else:
+                        keep.append(pooled)
+                idle[:] = keep
+            self.evicted += len(expired)
+        for pooled in expired:
+            self._discard(pooled)
+        for pooled in probe:
+            if self._alive(pooled):
+                with self._condition:
+                    # Put back on the cold end: recently used sessions stay preferred
+                    self._idle.setdefault(pooled.key, []).insert(0, pooled)
+                    self._condition.notify_all()
+            else:
+                with self._condition:
+                    self.health_failures += 1
+                self._discard(pooled)
+
+    def _run(self):
+        interval = max(0.5, min(self.keepalive_interval, self.idle_timeout or self.keepalive_interval) / 4)
+        while not self._stop.wait(interval):
+            self.maintain()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="netmiko-pool")
+            self._thread.start()
+
+    def close(self):
+        """Stop maintenance and disconnect every idle session; busy ones close on checkin."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._condition:
+            self._closed = True
+            idle = [pooled for sessions in self._idle.values() for pooled in sessions]
+            for sessions in self._idle.values():
+                sessions.clear()
+        for pooled in idle:
+            self._discard(pooled)
+
+    def stats(self):
+        with self._condition:
+            devices = {
+                f"{host}:{port}": {"open": count, "idle": len(self._idle.get((host, port, username, device_type), ())),
+                                   "in_use": count - len(self._idle.get((host, port, username, device_type), ()))}
+                for (host, port, username, device_type), count in self._open.items()
+            }
+            return {
+                "max_per_device": self.max_per_device,
+                "idle_timeout": self.idle_timeout,
+                "keepalive_interval": self.keepalive_interval,
+                "open_sessions": sum(self._open.values()),
+                "created": self.created,
+                "reused": self.reused,
+                "discarded": self.discarded,
+                "evicted": self.evicted,
+                "health_failures": self.health_failures,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "devices": devices
+            }
+
+
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    from fake_device import FakeDeviceServer
+
+    server = FakeDeviceServer(command_delay=0.005).start()
+    devices = [server.device_params(number) for number in range(4)]
+    requests = 40
+
+    def fresh(device):
+        with ConnectHandler(**device) as net_connect:
+            return net_connect.send_command("show ip interface brief")
+
+    pool = ConnectionPool(max_per_device=2)
+
+    def pooled(device):
+        with pool.session(device) as net_connect:
+            return net_connect.send_command("show ip interface brief")
+
+    print("🔌 Netmiko Connection Pool Benchmark")
+    print("=" * 60)
+    print(f"Local SSH stand-in on port {server.port}, {len(devices)} devices, {requests} requests per run")
+    for label, function in (("new session per request", fresh), ("connection pool", pooled)):
+        started = time.perf_counter()
+        for number in range(requests):
+            function(devices[number % len(devices)])
+        sequential = (time.perf_counter() - started) / requests * 1000
+        with ThreadPoolExecutor(8) as executor:
+            started = time.perf_counter()
+            list(executor.map(function, [devices[number % len(devices)] for number in range(requests)]))
+            concurrent = (time.perf_counter() - started) / requests * 1000
+        print(f"{label:<24} {sequential:7.1f} ms per request one at a time, "
+              f"{concurrent:7.1f} ms per request with 8 threads")
+    stats = pool.stats()
+    print(f"Pool: {stats['created']} sessions opened, {stats['reused']} reused, {stats['waits']} waits; "
+          f"device saw {server.logins} logins in total")
+    pool.close()
+    server.stop()
@@ -0,0 +1,321 @@
+"""
+Section 05: Local SSH Stand-in for a Cisco IOS Device
+
+The DevNet sandbox is shared and slow to reach, so the benchmarks in this
+section talk to FakeDeviceServer instead: a paramiko SSH server that logs in
+like an IOS XE router, echoes commands, answers a handful of show commands
+and ends every answer with a `hostname#` prompt - enough for Netmiko's
+cisco_ios driver.
+
+One server answers for many devices: it listens on every 127.x.y.z loopback
+address (Linux routes the whole 127.0.0.0/8 block to lo), and the address a
+client connected to picks the device. device_params(n) returns the Netmiko
+parameters for device n.
+
+- command_delay: seconds each command "runs" on the device, or
+                 callable(hostname) -> seconds for devices of different speed
+- login_delay:   extra seconds before the login is accepted (a far-away device)
+
+Usage:
+    server = FakeDeviceServer(command_delay=0.05)
+    server.start()
+    with ConnectHandler(**server.device_params(0)) as connection:
+        print(connection.send_command("show version"))
+    server.stop()
+"""
+
+import logging
+import socket
+import threading
+import time
+
+import paramiko
+
+USERNAME = "developer"
+PASSWORD = "C1sco12345"
+
+_host_key = None
+_host_key_lock = threading.Lock()
+
+
+def host_key():
+    """One RSA key per process - generating it takes a moment."""
+    global _host_key
+    with _host_key_lock:
+        if _host_key is None:
+            _host_key = paramiko.RSAKey.generate(2048)
+        return _host_key
+
+
+def interface_name(number: int):
+    """48 ports per member switch, 8 members per stack: GigabitEthernet1/0/1 onwards."""
+    return f"GigabitEthernet{number // 384 + 1}/{number // 48 % 8}/{number % 48 + 1}"
+
+
+def show_ip_interface_brief(interfaces: int = 8):
+    lines = ["Interface              IP-Address      OK? Method Status                Protocol"]
+    for number in range(interfaces):
+        address = f"10.{number // 250 % 250}.{number % 250}.1" if number % 3 else "unassigned"
+        status, protocol = ("up", "up") if number % 5 else ("administratively down", "down")
+        lines.append(f"{interface_name(number):<22} {address:<16}YES {'manual' if number % 3 else 'unset ':<7}"
+                     f"{status:<22}{protocol}")
+    return "\n".join(lines)
+
+
+def show_interfaces(interfaces: int = 8):
+    blocks = []
+    for number in range(interfaces):
+        up = number % 5 != 0
+        status = "up" if up else "administratively down"
+        protocol = "up (connected)" if up else "down (disabled)"
+        mac = f"00a3.d1{number >> 16 & 255:02x}.{number >> 8 & 255:02x}{number & 255:02x}"
+        lines = [f"{interface_name(number)} is {status}, line protocol is {protocol}",
+                 f"  Hardware is Gigabit Ethernet, address is {mac} (bia {mac})"]
+        if number % 2:
+            lines.append(f"  Description: uplink-{number:05d}")
+        if number % 3:
+            lines.append(f"  Internet address is 10.{number // 250 % 250}.{number % 250}.1/24")
+        lines += [
+            "  MTU 1500 bytes, BW 1000000 Kbit/sec, DLY 10 usec, ",
+            "     reliability 255/255, txload 1/255, rxload 1/255",
+            "  Encapsulation ARPA, loopback not set",
+            "  Keepalive set (10 sec)",
+            "  Full-duplex, 1000Mb/s, media type is 10/100/1000BaseTX",
+            "  input flow-control is off, output flow-control is unsupported ",
+            "  ARP type: ARPA, ARP Timeout 04:00:00",
+            "  Last input 00:00:01, output 00:00:00, output hang never",
+            "  Last clearing of \"show interface\" counters never",
+            "  Input queue: 0/2000/0/0 (size/max/drops/flushes); Total output drops: 0",
+            "  Queueing strategy: fifo",
+            "  Output queue: 0/40 (size/max)",
+            f"  5 minute input rate {number * 1000} bits/sec, {number} packets/sec",
+            f"  5 minute output rate {number * 2000} bits/sec, {number * 2} packets/sec",
+            f"     {number * 1234} packets input, {number * 567890} bytes, 0 no buffer",
+            f"     Received {number} broadcasts ({number} multicasts)",
+            "     0 runts, 0 giants, 0 throttles ",
+            f"     {number % 7} input errors, {number % 3} CRC, 0 frame, 0 overrun, 0 ignored",
+            "     0 watchdog, 0 multicast, 0 pause input",
+            "     0 input packets with dribble condition detected",
+            f"     {number * 2345} packets output, {number * 678901} bytes, 0 underruns",
+            f"     {number % 2} output errors, 0 collisions, {number % 4} interface resets",
+            "     0 unknown protocol drops",
+            "     0 babbles, 0 late collision, 0 deferred",
+            "     0 lost carrier, 0 no carrier, 0 pause output",
+            "     0 output buffer failures, 0 output buffers swapped out",
+        ]
+        blocks.append("\n".join(lines))
+    return "\n".join(blocks)
+
+
+def show_ip_route(routes: int = 8):
+    lines = [
+        "Codes: L - local, C - connected, S - static, R - RIP, M - mobile, B - BGP",
+        "       D - EIGRP, EX - EIGRP external, O - OSPF, IA - OSPF inter area ",
+        "       N1 - OSPF NSSA external type 1, N2 - OSPF NSSA external type 2",
+        "       E1 - OSPF external type 1, E2 - OSPF external type 2",
+        "       i - IS-IS, su - IS-IS summary, L1 - IS-IS level-1, L2 - IS-IS level-2",
+        "       ia - IS-IS inter area, * - candidate default, U - per-user static route",
+        "       o - ODR, P - periodic downloaded static route, H - NHRP, l - LISP",
+        "       a - application route",
+        "       + - replicated route, % - next hop override, p - overrides from PfR",
+        "",
+        "Gateway of last resort is 10.0.0.1 to network 0.0.0.0",
+        "",
+        "S*    0.0.0.0/0 [1/0] via 10.0.0.1",
+        "      10.0.0.0/8 is variably subnetted, %d subnets, 2 masks" % (routes + 2),
+        "C        10.0.0.0/24 is directly connected, GigabitEthernet1",
+        "L        10.0.0.2/32 is directly connected, GigabitEthernet1",
+    ]
+    for number in range(routes):
+        prefix = f"10.{1 + number // 62500 % 250}.{number // 250 % 250}.{number % 250}/32"
+        kind = number % 4
+        if kind == 0:
+            lines.append(f"O IA     {prefix} [110/{number % 50 + 2}] via 10.0.0.3, 1d02h, GigabitEthernet2")
+        elif kind == 1:
+            lines.append(f"O E2     {prefix} [110/20] via 10.0.0.3, 00:12:44, GigabitEthernet2")
+        elif kind == 2:
+            lines.append(f"B        {prefix} [20/0] via 192.0.2.{number % 250 + 1}, 3w2d")
+        else:
+            lines.append(f"D        {prefix} ")
+            lines.append(f"           [90/{3072 + number}] via 10.0.0.4, 2d11h, GigabitEthernet3")
+            lines.append(f"           [90/{3072 + number}] via 10.0.0.5, 2d11h, GigabitEthernet4")
+    return "\n".join(lines)
+
+
+def show_arp(entries: int = 8):
+    lines = ["Protocol  Address          Age (min)  Hardware Addr   Type   Interface"]
+    for number in range(entries):
+        address = f"10.{number // 62500 % 250}.{number // 250 % 250}.{number % 250 + 1}"
+        age = "-" if number == 0 else str(number % 240)
+        mac = f"0050.56{number >> 16 & 255:02x}.{number >> 8 & 255:02x}{number & 255:02x}"
+        lines.append(f"Internet  {address:<15}{age:>10}   {mac}  ARPA   {interface_name(number % 48)}")
+    return "\n".join(lines)
+
+
+def default_outputs(hostname: str):
+    return {
+        "terminal length 0": "",
+        "terminal width 511": "",
+        "show version": (f"Cisco IOS XE Software, Version 17.9.4a\n{hostname} uptime is 12 weeks, 3 days, 2 hours\n"
+                         "cisco C9300-48P (X86) processor with 1419044K/6147K bytes of memory.\n"
+                         "Configuration register is 0x102"),
+        "show ip interface brief": show_ip_interface_brief(),
+        "show interfaces": show_interfaces(),
+        "show ip route": show_ip_route(),
+        "show arp": show_arp(),
+        "show processes cpu": ("CPU utilization for five seconds: 7%/0%; one minute: 6%; five minutes: 5%\n"
+                               " PID Runtime(ms)     Invoked      uSecs   5Sec   1Min   5Min TTY Process\n"
+                               "   1          12         430         27  0.00%  0.00%  0.00%   0 Chunk Manager"),
+        "show memory statistics": ("                Head    Total(b)     Used(b)     Free(b)   Lowest(b)  Largest(b)\n"
+                                   "Processor  7F1C8F0048  1419044864   612345678   806699186   790123456   801234567"),
+    }
+
+
+class FakeShell(paramiko.ServerInterface):
+    """Password auth for the stand-in credentials and a shell channel."""
+
+    def __init__(self, login_delay: float):
+        self.login_delay = login_delay
+        self.shell_requested = threading.Event()
+
+    def check_auth_password(self, username, password):
+        if self.login_delay:
+            time.sleep(self.login_delay)
+        if username == USERNAME and password == PASSWORD:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED if kind == "session" else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.shell_requested.set()
+        return True
+
+
+class FakeDeviceServer:
+    """Threaded SSH server answering as many IOS devices (one per loopback address)."""
+
+    def __init__(self, port: int = 0, command_delay: float = 0.0, login_delay: float = 0.0, outputs: dict = None):
+        self.port = port
+        self.command_delay = command_delay
+        self.login_delay = login_delay
+        self.outputs = outputs or {}  # Extra/overriding command -> output for every device
+        self._listener = None
+        self._running = threading.Event()
+        self.logins = 0
+        self.commands = 0
+        self.open_sessions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def address_of(device_number: int):
+        return f"127.{(device_number >> 16) & 255}.{(device_number >> 8) & 255}.{(device_number & 255) + 1}"
+
+    @staticmethod
+    def hostname_of(address: str):
+        _, high, middle, low = (int(part) for part in address.split("."))
+        return f"lab-sw-{(high << 16) + (middle << 8) + low - 1:04d}"
+
+    def device_params(self, device_number: int = 0, **overrides):
+        """Netmiko ConnectHandler parameters for one stand-in device."""
+        return {"device_type": "cisco_ios", "host": self.address_of(device_number), "port": self.port,
+                "username": USERNAME, "password": PASSWORD, "timeout": 10, **overrides}
+
+    def start(self):
+        host_key()
+        # Clients that just drop the TCP connection make the server side log "Socket exception"
+        logging.getLogger("paramiko.transport").setLevel(logging.CRITICAL)
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind(("", self.port))  # Every 127.x address - Linux routes 127/8 to loopback
+        self._listener.listen(1024)
+        self.port = self._listener.getsockname()[1]
+        self._running.set()
+        threading.Thread(target=self._accept, daemon=True, name="fake-device-accept").start()
+        return self
+
+    def stop(self):
+        self._running.clear()
+        if self._listener is not None:
+            self._listener.close()
+
+    def _accept(self):
+        while self._running.is_set():
+            try:
+                client, _address = self._listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(client,), daemon=True, name="fake-device-session").start()
+
+    def _serve(self, client):
+        hostname = self.hostname_of(client.getsockname()[0])
+        transport = paramiko.Transport(client)
+        transport.add_server_key(host_key())
+        interface = FakeShell(self.login_delay)
+        try:
+            transport.start_server(server=interface)
+            channel = transport.accept(20)
+            if channel is None or not interface.shell_requested.wait(10):
+                return
+            with self._lock:
+                self.logins += 1
+                self.open_sessions += 1
+            try:
+                self._shell(channel, hostname)
+            finally:
+                with self._lock:
+                    self.open_sessions -= 1
+        except (EOFError, OSError, paramiko.SSHException):
+            pass
+        finally:
+            transport.close()
+
+    def _shell(self, channel, hostname):
+        outputs = {**default_outputs(hostname), **self.outputs}
+        prompt = f"{hostname}#"
+        channel.sendall(f"\r\n{prompt}".encode())
+        pending = b""
+        while True:
+            data = channel.recv(4096)
+            if not data:
+                return
+            pending += data
+            while b"\n" in pending or b"\r" in pending:
+                split = min(index for index in (pending.find(b"\n"), pending.find(b"\r")) if index >= 0)
+                line, pending = pending[:split].decode(errors="replace").strip(), pending[split + 1:]
+                if pending[:1] == b"\n":
+                    pending = pending[1:]
+                if line in ("exit", "logout"):
+                    channel.close()
+                    return
+                answer = ""
+                if line:
+                    with self._lock:
+                        self.commands += 1
+                    delay = self.command_delay(hostname) if callable(self.command_delay) else self.command_delay
+                    if delay:
+                        time.sleep(delay)
+                    answer = outputs.get(line, f"% Invalid input detected at '^' marker.\n{line}")
+                    answer = answer.replace("\n", "\r\n") + ("\r\n" if answer else "")
+                channel.sendall(f"{line}\r\n{answer}{prompt}".encode())
+
+
+if __name__ == "__main__":
+    from netmiko import ConnectHandler
+
+    server = FakeDeviceServer().start()
+    print(f"🧪 Fake IOS devices listening on port {server.port}")
+    for number in (0, 1):
+        started = time.perf_counter()
+        with ConnectHandler(**server.device_params(number)) as connection:
+            connected = time.perf_counter() - started
+            print(f"{connection.find_prompt()} connected in {connected * 1000:.0f} ms")
+            print(connection.send_command("show ip interface brief"))
+    server.stop()
@@ -0,0 +1,124 @@
+"""
+Section 05: Concurrent Multi-Device Fan-out
+
+Running show commands on 500 devices one after another takes the sum of
+all their response times. fan_out() runs one task per device on a bounded
+thread pool and yields each device's result as soon as it finishes, so the
+whole run takes about as long as the slowest device:
+
+- max_workers bounds the threads (and so the SSH sessions opened at once)
+- each device gets `timeout` seconds from the moment its task starts
+  (waiting for a free worker doesn't count); a device that runs over is
+  reported as "timeout" and the others carry on
+- a failing device is reported as "failed" with its error - partial results
+  are still results
+- results arrive in completion order, ready to be streamed to the client
+
+A timed-out device's thread can't be killed; pass the same timeout to
+Netmiko (read_timeout) so it ends soon after.
+
+Run this file directly for a benchmark: python fanout.py
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def fan_out(targets, task, max_workers: int = 64, timeout: float = 30.0):
+    """
+    Run task(device) for every (name, device) in targets concurrently.
+
+    Yields {"device", "status", "seconds", "result" | "error"} per device as
+    each one finishes: status is "success", "failed" or "timeout".
+    """
+    targets = list(dict(targets).items())  # One task per device name
+    if not targets:
+        return
+    started = {}
+
+    def run(name, device):
+        started[name] = time.monotonic()
+        return task(device)
+
+    executor = ThreadPoolExecutor(min(max_workers, len(targets)), thread_name_prefix="fanout")
+    pending = {executor.submit(run, name, device): name for name, device in targets}
+    try:
+        while pending:
+            deadlines = [started[name] + timeout for name in pending.values() if name in started]
+            wait_seconds = max(0.0, min(deadlines) - time.monotonic()) if deadlines else timeout
+            done, _ = wait(pending, timeout=wait_seconds, return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            for future in done:
+                name = pending.pop(future)
+                seconds = round(now - started.get(name, now), 3)
+                try:
+                    yield {"device": name, "status": "success", "seconds": seconds, "result": future.result()}
+                except Exception as e:
+                    yield {"device": name, "status": "failed", "seconds": seconds, "error": str(e)}
+            for future, name in list(pending.items()):
+                if name in started and now - started[name] >= timeout:
+                    del pending[future]
+                    yield {"device": name, "status": "timeout", "seconds": round(now - started[name], 3),
+                           "error": f"No answer within {timeout}s"}
+    finally:
+        # Also runs when a streaming client goes away: don't start devices nobody waits for
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def summarize(results, started: float):
+    """Counts per status for a finished (or interrupted) fan-out."""
+    counts = {"success": 0, "failed": 0, "timeout": 0}
+    for result in results:
+        counts[result["status"]] += 1
+    devices = sum(counts.values())
+    return {"devices": devices, "succeeded": counts["success"], "failed": counts["failed"],
+            "timed_out": counts["timeout"], "seconds": round(time.monotonic() - started, 3),
+            "status": "success" if counts["success"] == devices else "partial" if counts["success"] else "failed"}
+
+
+if __name__ == "__main__":
+    import random
+
+    from connection_pool import ConnectionPool
+    from fake_device import FakeDeviceServer
+
+    print("🌐 Multi-Device Fan-out Benchmark")
+    print("=" * 60)
+
+    # 1) Scheduling: 500 devices answering in 0.1-1.5 s, one unreachable
+    rng = random.Random(22)
+    delays = {f"device-{number:03d}": rng.uniform(0.1, 1.5) for number in range(500)}
+    delays["device-250"] = 60  # Unreachable
+
+    def slow_task(name):
+        time.sleep(delays[name])
+        return "ok"
+
+    started = time.monotonic()
+    results = list(fan_out(((name, name) for name in delays), slow_task, max_workers=500, timeout=2.0))
+    summary = summarize(results, started)
+    sequential = sum(min(delay, 2.0) for delay in delays.values())
+    print(f"500 simulated devices: {summary['seconds']:.1f} s concurrently vs {sequential:,.0f} s one by one "
+          f"({summary['succeeded']} ok, {summary['timed_out']} timed out)")
+
+    # 2) Real SSH sessions to the local stand-in, devices answering in 50-300 ms
+    device_count = 50
+    server = FakeDeviceServer(command_delay=lambda hostname: 0.05 + (hash(hostname) % 250) / 1000).start()
+    pool = ConnectionPool(max_per_device=1)
+    targets = [(f"lab-sw-{number:04d}", server.device_params(number)) for number in range(device_count)]
+
+    def show_version(device):
+        with pool.session(device) as net_connect:
+            return net_connect.send_command("show version")
+
+    list(fan_out(targets, show_version, max_workers=device_count))  # Log in everywhere first
+    started = time.monotonic()
+    for _name, device in targets:
+        show_version(device)
+    one_by_one = time.monotonic() - started
+    started = time.monotonic()
+    summary = summarize(fan_out(targets, show_version, max_workers=device_count), started)
+    print(f"{device_count} SSH devices (pooled sessions): {summary['seconds']:.2f} s concurrently vs "
+          f"{one_by_one:.2f} s one by one")
+    pool.close()
+    server.stop()
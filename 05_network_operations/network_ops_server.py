@@ -1,7 +1,7 @@
 """
 Section 05: Network Operations via Webhooks
 
-TODO: Build webhooks that connect to real network devices using Netmiko!
+Webhooks that connect to real network devices using Netmiko!
 This is where your webhook server becomes a true network automation platform.
 
 IMPORTANT: Use DevNet Sandbox devices for safe testing - never production devices!
@@ -9,13 +9,92 @@ IMPORTANT: Use DevNet Sandbox devices for safe testing - never production device
 Hint: Always handle network connection failures gracefully!
 """
 
-# TODO: Import required modules for network operations
-# Hint: from fastapi import FastAPI, HTTPException
-# Hint: from netmiko import ConnectHandler
-# TODO: Import any other modules (os for env vars, yaml for config, etc.)
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
 
-# TODO: Create your FastAPI application
-# Hint: Add a title about network automation capabilities
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from netmiko import ConnectHandler
+
+from connection_pool import ConnectionPool
+from fanout import fan_out, summarize
+from inventory import Inventory, SelectorError
+from output_cache import OutputCache
+from prometheus_metrics import CONTENT_TYPE, HTTPMetrics, MetricsMiddleware, MetricsRegistry
+from show_parsers import parse
+
+# Prometheus metrics at /metrics. With several uvicorn workers, point
+# METRICS_MULTIPROC_DIR at a shared directory so /metrics adds them all up
+metrics = MetricsRegistry(multiprocess_dir=os.getenv("METRICS_MULTIPROC_DIR"))
+http_metrics = HTTPMetrics(metrics)
+device_connect_seconds = metrics.histogram(
+    "network_device_connect_seconds", "Time to open an SSH session to a device", ("host",))
+device_commands = metrics.counter(
+    "network_device_commands_total", "Commands sent to devices by command and outcome", ("command", "status"))
+device_command_seconds = metrics.histogram(
+    "network_device_command_duration_seconds", "Time for a device to answer a command", ("command",))
+
+
+def open_session(**device):
+    """Open a Netmiko session, timing the SSH connect + login for /metrics."""
+    started = time.perf_counter()
+    net_connect = ConnectHandler(**device)
+    device_connect_seconds.observe(time.perf_counter() - started, (device['host'],))
+    return net_connect
+
+
+# Warm SSH sessions shared by every endpoint, so a request doesn't pay for a login.
+# NETWORK_POOL_IDLE_SECONDS=0 closes each session after use (a fresh login per request)
+pool = ConnectionPool(
+    connect=open_session,
+    max_per_device=int(os.getenv("NETWORK_POOL_MAX_PER_DEVICE", "2")),
+    idle_timeout=float(os.getenv("NETWORK_POOL_IDLE_SECONDS", "300")),
+    keepalive_interval=float(os.getenv("NETWORK_POOL_KEEPALIVE_SECONDS", "60")),
+    checkout_timeout=float(os.getenv("NETWORK_POOL_CHECKOUT_TIMEOUT", "30")),
+)
+metrics.gauge("network_device_sessions_open", "SSH sessions to devices currently open",
+              function=pool.open_count)
+metrics.counter("network_device_pool_checkouts_total", "Pooled session checkouts by outcome", ("outcome",),
+                function=lambda: {("created",): pool.created, ("reused",): pool.reused,
+                                  ("waited",): pool.waits, ("timed_out",): pool.timeouts})
+
+# Recent show command output per device, so repeated asks within a few seconds
+# don't go back to the device. NETWORK_CACHE_TTLS='{"show ip route": 60}' changes
+# the seconds per command prefix (0 = never cache); NETWORK_CACHE=0 turns it off
+output_cache = OutputCache(
+    ttls=json.loads(os.getenv("NETWORK_CACHE_TTLS", "{}")),
+    default_ttl=float(os.getenv("NETWORK_CACHE_DEFAULT_TTL", "10")),
+    max_entries=int(os.getenv("NETWORK_CACHE_MAX_ENTRIES", "10000")),
+) if os.getenv("NETWORK_CACHE", "1") != "0" else None
+if output_cache is not None:
+    metrics.counter("network_device_cache_total", "Show command lookups by outcome", ("outcome",),
+                    function=lambda: {("hit",): output_cache.hits, ("miss",): output_cache.misses,
+                                      ("coalesced",): output_cache.coalesced})
+    metrics.gauge("network_device_cache_entries", "Show command outputs currently cached",
+                  function=lambda: len(output_cache))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Write metric snapshots, keep pooled sessions alive and the inventory current while the server runs."""
+    metrics.start()
+    pool.start()
+    inventory.start()
+    yield
+    inventory.close()
+    pool.close()
+    metrics.stop()
+
+
+app = FastAPI(
+    title="Network Operations Webhooks",
+    description="Webhook endpoints that run show commands on network devices with Netmiko",
+    version="1.0.0",
+    lifespan=lifespan,
+)
 
 
 # DevNet Always-On Sandbox Device (safe to use!)
@@ -24,84 +103,252 @@ DEVNET_DEVICE = {
     'host': 'sandbox-iosxe-latest-1.cisco.com',
     'username': 'developer',
     'password': 'C1sco12345',
-    # TODO: Add any additional connection parameters you might need
-    # Hint: 'timeout': 30, 'session_timeout': 60
+    'timeout': 30,
+    'session_timeout': 60,
 }
 
 # TODO: Alternative device for testing (comment out if not available)
 # DEVNET_IOS_XR = {
-#     'device_type': 'cisco_iosxr', 
+#     'device_type': 'cisco_iosxr',
 #     'host': 'sandbox-iosxr-1.cisco.com',
 #     'username': 'admin',
 #     'password': 'C1sco12345',
 # }
 
 
-# TODO: Create a basic device information endpoint
-# Hint: @app.get("/device/info")
-def get_device_info():
+# Multi-device requests: how many devices are worked on at once, and how long
+# one device may take before it is reported as timed out
+FANOUT_WORKERS = int(os.getenv("NETWORK_FANOUT_WORKERS", "64"))
+DEVICE_TIMEOUT = float(os.getenv("NETWORK_DEVICE_TIMEOUT", "30"))
+
+# Optional inventory for "device", "devices" and "selector" targets: NETWORK_INVENTORY
+# names a YAML, CSV or JSON file, or a directory of them, listing devices such as
+# {name: leaf-01, host: 10.0.0.11, site: dc1, role: leaf, platform: c9300, tags: [pci]}.
+# Read on first use (or in the background once the server runs), reloaded when a file changes
+inventory = Inventory(os.getenv("NETWORK_INVENTORY"),
+                      check_interval=float(os.getenv("NETWORK_INVENTORY_CHECK_SECONDS", "2")))
+metrics.gauge("network_inventory_devices", "Devices in the inventory", function=lambda: len(inventory))
+NETMIKO_KEYS = ("device_type", "host", "port", "username", "password", "secret", "timeout")
+SECRET_KEYS = ("password", "secret")
+
+
+def device_params(entry: dict):
+    """Netmiko parameters for an inventory entry; missing credentials come from DEVNET_DEVICE."""
+    return {**DEVNET_DEVICE, **{key: entry[key] for key in NETMIKO_KEYS if key in entry}}
+
+
+def known_device(name: str):
+    """
+    Netmiko parameters for a device the server was configured with: an
+    inventory name or host, or the DEVNET_DEVICE host. None for anything else -
+    a caller must never get the stored credentials sent to a host of its choosing.
+    """
+    entry = inventory.get(name) if inventory.path else None
+    if entry is not None:
+        return device_params(entry)
+    return DEVNET_DEVICE if name == DEVNET_DEVICE['host'] else None
+
+
+def target_device(name: str = None):
+    """Netmiko parameters for a known device name or host (404 otherwise); DEVNET_DEVICE when none is named."""
+    if not name:
+        return DEVNET_DEVICE
+    device = known_device(name)
+    if device is None:
+        raise HTTPException(status_code=404, detail=f"Unknown device '{name}'"
+                            + ("" if inventory.path else " - set NETWORK_INVENTORY to add devices"))
+    return device
+
+
+def cache_key(device: dict):
+    """
+    What output_cache keys a device's output by: the same (host, port, username,
+    device_type) as its pool sessions, so two logins to one host never share answers.
+    """
+    return ConnectionPool.key(device)
+
+
+def device_names(devices):
+    """A request's "devices" field: None or a list of names, 400 for anything else."""
+    if devices is not None and (not isinstance(devices, list)
+                                or not all(isinstance(name, str) for name in devices)):
+        raise HTTPException(status_code=400, detail='"devices" must be a list of device names')
+    return devices
+
+
+def resolve_targets(devices=None, selector: str = None):
+    """
+    [(name, netmiko params)] for a list of inventory names/hosts and/or an
+    inventory selector. Any name the server doesn't know is a 404.
+    """
+    targets = [(name, known_device(name)) for name in device_names(devices) or []]
+    unknown = [name for name, device in targets if device is None]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown devices: {', '.join(map(str, unknown))}"
+                            + ("" if inventory.path else " - set NETWORK_INVENTORY to add devices"))
+    if selector:
+        if not isinstance(selector, str):
+            raise HTTPException(status_code=400, detail='"selector" must be a string')
+        if not inventory.path:
+            raise HTTPException(status_code=400, detail="Selectors need an inventory - set NETWORK_INVENTORY")
+        try:
+            selected = inventory.select(selector)
+        except SelectorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        targets.extend((entry.get("name", entry.get("host")), device_params(entry)) for entry in selected)
+    if not targets:
+        raise HTTPException(status_code=404, detail="No devices matched")
+    return targets
+
+
+def device_timeout(value):
+    """Seconds one device may take: value, or DEVICE_TIMEOUT when not given; 400 if invalid."""
+    if value is None or value == "":
+        return DEVICE_TIMEOUT
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        timeout = None
+    if timeout is None or not 0 < timeout < float("inf"):
+        raise HTTPException(status_code=400, detail=f"timeout must be a positive number of seconds, got {value!r}")
+    return timeout
+
+
+def fan_out_response(targets, task, header: dict, timeout: float, stream: bool):
+    """
+    Run task on every target concurrently. Returns all results at once, or with
+    stream=True one NDJSON line per device as it finishes plus a summary line.
     """
-    TODO: Connect to DevNet device and get basic information
-    
+    started = time.monotonic()
+    results = fan_out(targets, task, max_workers=FANOUT_WORKERS, timeout=timeout)
+    if stream:
+        def lines():
+            finished = []
+            for result in results:
+                finished.append(result)
+                yield json.dumps(result, default=str) + "\n"
+            yield json.dumps({**header, **summarize(finished, started)}) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+    results = list(results)
+    return {**header, **summarize(results, started), "results": results}
+
+
+# Output filters a caller may add after "|" (IOS accepts any prefix: "| i", "| inc")
+OUTPUT_FILTERS = ("include", "exclude", "begin", "section")
+
+
+def show_command_problem(command: str):
+    """
+    Why command isn't a safe single show command, or None if it is.
+
+    Netmiko writes the command to the device's shell as typed, so a line break
+    would run whatever follows it. Allowed: one line, "show ...", optionally
+    followed by one "| include/exclude/begin/section <pattern>" filter.
+    """
+    if any(ord(character) < 32 or ord(character) == 127 for character in command):
+        return "Commands must be a single line without control characters"
+    show, pipe, output_filter = command.partition("|")
+    words = show.split()
+    if len(words) < 2 or words[0].lower() != "show":
+        return "Only 'show' commands are allowed for security"
+    if pipe:
+        filter_words = output_filter.split()
+        if ("|" in output_filter or len(filter_words) < 2
+                or not any(name.startswith(filter_words[0].lower()) for name in OUTPUT_FILTERS)):
+            return "Only one '| include/exclude/begin/section <pattern>' filter is allowed"
+    return None
+
+
+def run_commands(device: dict, commands, read_timeout: float = None, refresh: bool = False):
+    """
+    Run each command on a pooled SSH session, timing every command for /metrics.
+    Recent output comes from output_cache instead (refresh=True asks the device anyway).
+
+    Returns [(command, output), ...] in the order given.
+    """
+    # Netmiko's own limit per command (default 10 s) - fan-out passes its device timeout
+    options = {"read_timeout": read_timeout} if read_timeout else {}
+
+    def send(command):
+        # One checkout per command: never hold a session while waiting for
+        # another request's fetch of the same output
+        with pool.session(device) as net_connect:
+            command_started = time.perf_counter()
+            try:
+                output = net_connect.send_command(command, **options)
+            except Exception:
+                device_commands.inc((command, "failed"))
+                raise
+        device_command_seconds.observe(time.perf_counter() - command_started, (command,))
+        device_commands.inc((command, "success"))
+        return output
+
+    results = []
+    for command in commands:
+        if output_cache is None:
+            output = send(command)
+        else:
+            output = output_cache.fetch(cache_key(device), command, lambda: send(command), refresh=refresh)
+        results.append((command, output))
+    return results
+
+
+@app.get("/device/info")
+def get_device_info(device: str = None):
+    """
+    Connect to DevNet device and get basic information
+
     Execute 'show version' command and return formatted response.
     This endpoint demonstrates basic Netmiko integration.
+    ?device= picks an inventory device (name or host) instead.
     """
-    
+
+    target = target_device(device)
     try:
-        # TODO: Connect to device using Netmiko
-        # Hint: with ConnectHandler(**DEVNET_DEVICE) as net_connect:
-        
-        # TODO: Execute 'show version' command
-        # Hint: version_output = net_connect.send_command('show version')
-        
-        # TODO: Return formatted webhook response
+        [(_command, version_output)] = run_commands(target, ['show version'])
+
         return {
             "webhook": "Device Information Retrieved",
-            "device_host": "TODO: Get from DEVNET_DEVICE",
+            "device_host": target['host'],
             "command_executed": "show version",
-            "device_output": "TODO: Return version_output", 
+            "device_output": version_output,
             "status": "success",
-            "timestamp": "TODO: Add current timestamp if desired"
+            "timestamp": datetime.now().isoformat()
         }
-        
+
     except Exception as e:
-        # TODO: Handle connection failures gracefully
-        # Hint: Use HTTPException for proper HTTP error responses
         return {
             "error": f"Device connection failed: {str(e)}",
-            "device_host": DEVNET_DEVICE['host'],
+            "device_host": target['host'],
             "status": "failed",
             "troubleshooting": "Check device connectivity and credentials"
         }
 
 
-# TODO: Create an interface status endpoint  
-# Hint: @app.get("/device/interfaces")
-def get_interface_status():
+@app.get("/device/interfaces")
+def get_interface_status(device: str = None):
     """
-    TODO: Get interface status from network device
-    
+    Get interface status from network device
+
     Execute 'show ip interface brief' and return interface information.
     Consider parsing the output into structured data.
+    ?device= picks an inventory device (name or host) instead.
     """
-    
+
+    target = target_device(device)
     try:
-        # TODO: Connect to device
-        
-        # TODO: Execute 'show ip interface brief' 
-        # Hint: interface_output = net_connect.send_command('show ip interface brief')
-        
-        # TODO: Optional - Parse output into structured format
-        # For now, just return the raw output, but consider parsing later!
-        
+        [(_command, interface_output)] = run_commands(target, ['show ip interface brief'])
+
         return {
             "webhook": "Interface Status Retrieved",
             "command": "show ip interface brief",
-            "interfaces": "TODO: Return interface_output or parsed data",
-            "device": DEVNET_DEVICE['host'],
+            "interfaces": interface_output,
+            "interface_list": parse_interface_brief(interface_output),
+            "device": target['host'],
             "status": "success"
         }
-        
+
     except Exception as e:
         return {
             "error": f"Failed to get interface status: {str(e)}",
@@ -109,44 +356,48 @@ def get_interface_status():
         }
 
 
-# TODO: Create a custom command endpoint
-# Hint: @app.post("/device/command")  
+@app.post("/device/command")
 def execute_custom_command(command_data: dict):
     """
-    TODO: Execute any show command via webhook parameter
-    
+    Execute any show command via webhook parameter
+
     Expected input:
     {
         "command": "show ip route",
-        "device": "optional-device-override"
+        "device": "optional-device-override",
+        "refresh": false
     }
-    
-    SECURITY NOTE: Only allow 'show' commands for safety!
-    """
-    
-    # TODO: Extract command from request data
-    command = "TODO: Get command from command_data"
-    
-    # TODO: Validate command is safe (starts with 'show')
-    if not command.lower().startswith('show'):
+
+    Recent output is answered from the cache; refresh=true asks the device.
+
+    SECURITY NOTE: Only one line of 'show' (plus an optional include/exclude/
+    begin/section filter) is allowed - see show_command_problem.
+    """
+
+    command = str(command_data.get("command", "")).strip()
+
+    # Validate command is safe: a single show command, nothing after a line break
+    problem = show_command_problem(command)
+    if problem is not None:
         return {
-            "error": "Only 'show' commands are allowed for security",
+            "error": problem,
             "command_received": command,
             "status": "rejected"
         }
-    
+
+    target = target_device(command_data.get("device"))
     try:
-        # TODO: Connect and execute the command
-        # TODO: Return formatted response with command output
-        
+        [(_command, output)] = run_commands(target, [command], refresh=bool(command_data.get("refresh")))
+
         return {
             "webhook": "Custom Command Executed",
             "command": command,
-            "output": "TODO: Return command output",
-            "device": DEVNET_DEVICE['host'],
+            "output": output,
+            "parsed": parsed_output(command, output),
+            "device": target['host'],
             "status": "success"
         }
-        
+
     except Exception as e:
         return {
             "error": f"Command execution failed: {str(e)}",
@@ -155,30 +406,36 @@ def execute_custom_command(command_data: dict):
         }
 
 
-# TODO: Create a network diagnostics webhook
-# Hint: @app.post("/network/diagnose")
+@app.post("/network/diagnose")
 def network_diagnostics(issue_data: dict):
     """
-    TODO: Run comprehensive diagnostics based on issue type
-    
+    Run comprehensive diagnostics based on issue type
+
     Expected input:
     {
         "issue_type": "connectivity|performance|interface",
-        "description": "Description of the issue", 
-        "affected_interface": "optional interface name"
+        "description": "Description of the issue",
+        "affected_interface": "optional interface name",
+        "device": "optional inventory name or host",
+        "devices": ["optional", "device", "names"],
+        "selector": "optional inventory selector, e.g. site=dc1 AND role=leaf",
+        "timeout": 30,
+        "stream": false
     }
-    
-    Run different commands based on issue_type!
-    """
-    
-    issue_type = "TODO: Get from issue_data"
-    description = "TODO: Get from issue_data"
-    
-    # TODO: Define diagnostic commands based on issue type
+
+    Run different commands based on issue_type! With devices or a selector
+    every device is diagnosed at once; stream=true returns NDJSON lines as
+    each device finishes.
+    """
+
+    issue_type = issue_data.get("issue_type", "unknown")
+    description = issue_data.get("description", "")
+
+    # Diagnostic commands based on issue type
     if issue_type == "connectivity":
         commands = [
             "show ip interface brief",
-            "show ip route", 
+            "show ip route",
             "show arp"
         ]
     elif issue_type == "performance":
@@ -195,29 +452,36 @@ def network_diagnostics(issue_data: dict):
         ]
     else:
         commands = ["show version"]  # Default command
-    
-    # TODO: Execute diagnostic commands
-    diagnostic_results = []
-    
+
+    if issue_data.get("devices") or issue_data.get("selector"):
+        targets = resolve_targets(issue_data.get("devices"), issue_data.get("selector"))
+        timeout = device_timeout(issue_data.get("timeout"))
+
+        def diagnose(device):
+            return [{"command": command, "output": output, "parsed": parsed_output(command, output)}
+                    for command, output in run_commands(device, commands, read_timeout=timeout)]
+
+        header = {"webhook": "Network Diagnostics Completed", "issue_type": issue_type,
+                  "issue_description": description, "diagnostics_run": len(commands)}
+        return fan_out_response(targets, diagnose, header, timeout, bool(issue_data.get("stream")))
+
+    target = target_device(issue_data.get("device"))
     try:
-        # TODO: Connect to device
-        # TODO: Execute each command in the commands list
-        # TODO: Collect results
-        
-        # For each command:
-        #   output = net_connect.send_command(command)
-        #   diagnostic_results.append({"command": command, "output": output})
-        
+        diagnostic_results = [
+            {"command": command, "output": output, "parsed": parsed_output(command, output)}
+            for command, output in run_commands(target, commands)
+        ]
+
         return {
             "webhook": "Network Diagnostics Completed",
             "issue_type": issue_type,
             "issue_description": description,
             "diagnostics_run": len(commands),
-            "results": "TODO: Return diagnostic_results",
-            "device": DEVNET_DEVICE['host'],
+            "results": diagnostic_results,
+            "device": target['host'],
             "status": "success"
         }
-        
+
     except Exception as e:
         return {
             "error": f"Diagnostics failed: {str(e)}",
@@ -226,102 +490,257 @@ def network_diagnostics(issue_data: dict):
         }
 
 
-# TODO: Create a device health check endpoint
-# Hint: @app.get("/device/health")
-def device_health_check():
+HEALTH_COMMANDS = {
+    "cpu": "show processes cpu",
+    "memory": "show memory statistics",
+    "interfaces": "show ip interface brief",
+    "version": "show version"
+}
+
+# /device/health levels - the same ones the Section 06 CPU and memory alerts use.
+# CPU is the one-minute average, memory the free share of the Processor pool
+CPU_WARNING_PERCENT = 85
+CPU_CRITICAL_PERCENT = 95
+MEMORY_WARNING_FREE_PERCENT = 10
+MEMORY_CRITICAL_FREE_PERCENT = 5
+
+
+def assess_health(checks: dict):
     """
-    TODO: Run multiple commands to assess overall device health
-    
+    Sets each check's "health" (ok, warning, critical or unknown) from its
+    parsed output; returns (overall status, summary).
+    """
+    findings = []
+
+    cpu = (checks["cpu"]["parsed"] or {}).get("summary")
+    if cpu is None:
+        checks["cpu"]["health"] = "unknown"
+    else:
+        load = cpu["one_minute"]
+        checks["cpu"]["health"] = ("critical" if load >= CPU_CRITICAL_PERCENT
+                                   else "warning" if load >= CPU_WARNING_PERCENT else "ok")
+        findings.append((checks["cpu"]["health"], f"CPU {load}% (one minute)"))
+
+    pools = {pool["pool"]: pool for pool in (checks["memory"]["parsed"] or {}).get("records", [])}
+    processor = pools.get("Processor")
+    if processor is None or not processor["total"]:
+        checks["memory"]["health"] = "unknown"
+    else:
+        free = round(processor["free"] / processor["total"] * 100, 1)
+        checks["memory"]["health"] = ("critical" if free <= MEMORY_CRITICAL_FREE_PERCENT
+                                      else "warning" if free <= MEMORY_WARNING_FREE_PERCENT else "ok")
+        findings.append((checks["memory"]["health"], f"{free}% processor memory free"))
+
+    interfaces = (checks["interfaces"]["parsed"] or {}).get("records")
+    if interfaces is None:
+        checks["interfaces"]["health"] = "unknown"
+    else:
+        # Line up but protocol down is a fault; down/down is usually an unused port
+        faulty = [interface["interface"] for interface in interfaces
+                  if interface["status"] == "up" and interface["protocol"] != "up"]
+        checks["interfaces"]["health"] = "warning" if faulty else "ok"
+        findings.append((checks["interfaces"]["health"],
+                         f"{len(faulty)} of {len(interfaces)} interfaces up with protocol down"
+                         + (f" ({', '.join(faulty[:5])})" if faulty else "")))
+
+    checks["version"]["health"] = "ok"
+
+    problems = [text for level, text in findings if level != "ok"]
+    if any(level == "critical" for level, _text in findings):
+        status = "unhealthy"
+    elif problems:
+        status = "degraded"
+    elif checks["cpu"]["health"] == checks["memory"]["health"] == "unknown":
+        return "unknown", "Commands ran, but CPU and memory output could not be read"
+    else:
+        status = "healthy"
+    if problems:
+        return status, "; ".join(problems)
+    return status, "All health checks passed: " + "; ".join(text for _level, text in findings)
+
+
+def check_device_health(device: dict, read_timeout: float = None):
+    """Run the health commands on one device and rate them; raises if the device can't be reached."""
+    outputs = dict(run_commands(device, HEALTH_COMMANDS.values(), read_timeout=read_timeout))
+    checks = {
+        check_name: {"command": command, "output": outputs[command],
+                     "parsed": parsed_output(command, outputs[command]), "status": "success"}
+        for check_name, command in HEALTH_COMMANDS.items()
+    }
+    overall_status, summary = assess_health(checks)
+    return {
+        "checks": checks,
+        "overall_status": overall_status,
+        "summary": summary
+    }
+
+
+@app.get("/device/health")
+def device_health_check(devices: str = None, selector: str = None, timeout: float = None, stream: bool = False):
+    """
+    Run multiple commands to assess overall device health
+
     Check:
     - CPU utilization
-    - Memory usage  
+    - Memory usage
     - Interface status
     - Basic connectivity
-    
-    Return a health summary!
-    """
-    
-    health_commands = {
-        "cpu": "show processes cpu",
-        "memory": "show memory statistics", 
-        "interfaces": "show ip interface brief",
-        "version": "show version"
-    }
-    
+
+    Return a health summary! ?devices=a,b or ?selector=site=dc1 checks many
+    devices at once (?stream=true for NDJSON lines as each one finishes).
+    """
+
+    if devices or selector:
+        timeout = device_timeout(timeout)
+        targets = resolve_targets(devices.split(",") if devices else None, selector)
+        header = {"webhook": "Device Health Check", "timestamp": datetime.now().isoformat()}
+        return fan_out_response(targets, lambda device: check_device_health(device, timeout), header, timeout,
+                                stream)
+
     health_report = {
         "webhook": "Device Health Check",
         "device": DEVNET_DEVICE['host'],
-        "timestamp": "TODO: Add timestamp",
+        "timestamp": datetime.now().isoformat(),
         "overall_status": "unknown",
         "checks": {}
     }
-    
+
     try:
-        # TODO: Connect to device
-        # TODO: Execute each health command
-        # TODO: Collect results for each check
-        
-        # For each command in health_commands:
-        #   output = net_connect.send_command(command)
-        #   health_report["checks"][check_name] = {"command": command, "output": output, "status": "success"}
-        
-        # TODO: Determine overall health status
-        health_report["overall_status"] = "healthy"  # Simplify for now
-        health_report["summary"] = "All health checks completed successfully"
-        
+        health_report.update(check_device_health(DEVNET_DEVICE))
         return health_report
-        
+
     except Exception as e:
         health_report["overall_status"] = "unhealthy"
         health_report["error"] = f"Health check failed: {str(e)}"
         return health_report
 
 
+@app.get("/device/pool")
+def get_connection_pool_status():
+    """
+    Show pooled SSH sessions per device and how often a login was avoided.
+    """
+    return pool.stats()
+
+
+@app.get("/inventory")
+def get_inventory(selector: str = None, limit: int = 100):
+    """
+    Inventory size, index sizes and reload status; ?selector=site=dc1 AND role=leaf
+    lists the matching devices (credentials left out).
+    """
+    result = inventory.stats()
+    if selector:
+        try:
+            selected = inventory.select(selector)
+        except SelectorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        result["selector"] = selector
+        result["matched"] = len(selected)
+        result["matching_devices"] = [{key: value for key, value in entry.items() if key not in SECRET_KEYS}
+                                      for entry in selected[:limit]]
+    return result
+
+
+@app.get("/device/cache")
+def get_output_cache_status():
+    """
+    Show cached show command outputs, hit/miss counts and the TTL per command.
+    """
+    if output_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **output_cache.stats()}
+
+
+@app.post("/device/cache/invalidate")
+def invalidate_output_cache(invalidate_request: dict):
+    """
+    Forget cached output after a device changed, so the next ask goes to it.
+
+    Expected input, any of:
+    {"device": "core-sw-01", "command": "optional show command"}
+    {"devices": ["core-sw-01", "core-sw-02"]}
+    {"all": true}
+    A Section 06 /config-change alert (it carries "device"), or a Section 06
+    notification batch: {"events": [{"event_type": "config_change", "device": "core-sw-01"}]}
+    """
+    if output_cache is None:
+        return {"webhook": "Cache Invalidated", "enabled": False, "entries_dropped": 0}
+    if invalidate_request.get("all"):
+        return {"webhook": "Cache Invalidated", "devices": "all", "entries_dropped": output_cache.invalidate()}
+
+    devices = list(device_names(invalidate_request.get("devices")) or [])
+    if invalidate_request.get("device"):
+        devices.append(invalidate_request["device"])
+    devices.extend(event["device"] for event in invalidate_request.get("events") or []
+                   if event.get("event_type", "config_change") == "config_change" and event.get("device"))
+    if not devices:
+        raise HTTPException(status_code=400, detail="Name a device, devices, events or all=true")
+
+    # Output is cached per device login (cache_key); accept inventory names or hosts.
+    # Nothing is dialed here, so a name the server doesn't know just drops nothing
+    names = sorted({str(name) for name in devices})
+    keys = {cache_key(device) for device in map(known_device, names) if device is not None}
+    command = invalidate_request.get("command")
+    dropped = sum(output_cache.invalidate(key, command) for key in keys)
+    return {"webhook": "Cache Invalidated", "devices": names, "entries_dropped": dropped}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Prometheus scrape endpoint: request counts and latency per route, plus
+    device connect and command timings.
+    """
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
+
+
+# Outermost layer: times every request, labelled by route template
+app.add_middleware(MetricsMiddleware, metrics=http_metrics)
+
+
 # TODO (Optional): Create additional network operation endpoints
 # Ideas:
 # - @app.get("/device/routing") - Show routing table
-# - @app.get("/device/arp") - Show ARP table  
+# - @app.get("/device/arp") - Show ARP table
 # - @app.post("/device/ping") - Execute ping from device
 # - @app.get("/device/logs") - Show recent logs
 
 
-# TODO: Helper function for parsing interface output (Advanced)
+def parsed_output(command: str, output: str):
+    """Records (and summary) for commands show_parsers knows, else None."""
+    parser = parse(command, output)
+    return parser.as_dict() if parser is not None else None
+
+
 def parse_interface_brief(output):
     """
-    TODO: Parse 'show ip interface brief' output into structured data
-    
-    Convert raw text output into JSON format for easier consumption.
-    This is optional but makes your webhook responses much more useful!
-    """
-    # TODO: Split output into lines
-    # TODO: Parse each line into interface data
-    # TODO: Return list of interface dictionaries
-    
-    interfaces = []
-    # lines = output.split('\n')[1:]  # Skip header
-    # for line in lines:
-    #     if line.strip():
-    #         # Parse interface data from line
-    #         # Add to interfaces list
-    
-    return interfaces
+    Parse 'show ip interface brief' output into structured data
+
+    One dictionary per interface: interface, ip_address, ok, method, status, protocol.
+    """
+    return [interface._asdict() for interface in parse("show ip interface brief", output).records]
 
 
 if __name__ == "__main__":
     print("🔌 Network Operations via Webhooks Server")
-    print("=" * 50) 
+    print("=" * 50)
     print("To run this server:")
-    print("1. Complete all TODO items above")
-    print("2. Ensure DevNet sandbox is accessible")
-    print("3. Run: uvicorn network_ops_server:app --reload --host 0.0.0.0 --port 8000")
-    print("4. Visit: http://localhost:8000/docs")
+    print("1. Ensure DevNet sandbox is accessible")
+    print("2. Run: uvicorn network_ops_server:app --reload --host 0.0.0.0 --port 8000")
+    print("3. Visit: http://localhost:8000/docs")
     print()
     print("Available network operations:")
-    print("  GET  /device/info        - Basic device information")
+    print("  GET  /device/info        - Basic device information (?device= for an inventory device)")
     print("  GET  /device/interfaces  - Interface status")
     print("  POST /device/command     - Execute custom show command")
-    print("  POST /network/diagnose   - Run network diagnostics")
-    print("  GET  /device/health      - Comprehensive health check")
+    print("  POST /network/diagnose   - Run network diagnostics (one device, a list or a selector)")
+    print("  GET  /device/health      - Comprehensive health check (?devices=a,b or ?selector=)")
+    print("  GET  /device/pool        - Pooled SSH sessions")
+    print("  GET  /inventory          - Inventory status (?selector=site=dc1 AND role=leaf)")
+    print("  GET  /device/cache       - Cached show command output")
+    print("  POST /device/cache/invalidate - Forget a device's cached output (e.g. after a config change)")
+    print("  GET  /metrics            - Prometheus metrics")
     print()
     print("🏗️  DevNet Sandbox Device:")
     print(f"   Host: {DEVNET_DEVICE['host']}")
@@ -329,4 +748,4 @@ if __name__ == "__main__":
     print()
     print("💡 Test with: curl http://localhost:8000/device/info")
     print("⚠️  Remember: Only use sandbox devices for testing!")
-    print("🔒 Security: Only 'show' commands are allowed")
+    print("🔒 Security: Only single-line 'show' commands are allowed")
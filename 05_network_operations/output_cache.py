@@ -0,0 +1,290 @@
+"""
+Section 05: Show Command Output Cache
+
+Dashboards and webhooks ask the same device for `show ip interface brief`
+or `show version` many times a second. Each ask is an SSH round trip, yet
+the answer barely changes. OutputCache sits in front of the device:
+
+- keyed on (device, normalized command): extra spaces and the case and IOS
+  abbreviations of the command keywords are folded, so "sh ip int br" and
+  "show ip interface brief" share one entry. Arguments and "| include ..."
+  filters keep their case
+- a TTL per command class, longest prefix wins: `show version` is good for
+  hours, `show processes cpu` for seconds; a TTL of 0 never caches
+- single-flight: while one thread fetches an output, identical requests
+  wait for that answer instead of opening their own device call
+- invalidate(device) drops a device's outputs - e.g. when a /config-change
+  alert arrives for it. A fetch that was already running when the device
+  was invalidated is not stored
+- bounded LRU (max_entries) with a per-device index, so invalidation
+  doesn't scan every entry
+
+Handlers run in FastAPI's threadpool, so state is guarded by one lock; the
+device call itself runs outside it.
+
+Run this file directly for a benchmark: python output_cache.py
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds an output stays valid, by command prefix (longest matching prefix wins)
+DEFAULT_TTLS = {
+    "show version": 6 * 3600,
+    "show inventory": 6 * 3600,
+    "show running-config": 300,
+    "show ip interface brief": 30,
+    "show interfaces": 15,
+    "show ip route": 30,
+    "show arp": 30,
+    "show memory statistics": 10,
+    "show processes cpu": 5,
+    "show clock": 0,
+    "show logging": 0,
+}
+
+# Full command words that IOS lets you abbreviate ("sh ver", "show ip int br")
+KNOWN_COMMANDS = (
+    *DEFAULT_TTLS,
+    "show ip arp",
+    "show processes cpu sorted",
+    "show interfaces status",
+    "show interfaces description",
+    "show cdp neighbors",
+    "show lldp neighbors",
+    "show ip ospf neighbor",
+    "show ip bgp summary",
+    "show vlan brief",
+    "show mac address-table",
+    "show startup-config",
+)
+_KNOWN_BY_LENGTH = {}
+for _command in KNOWN_COMMANDS:
+    _KNOWN_BY_LENGTH.setdefault(len(_command.split()), []).append(tuple(_command.split()))
+_LONGEST_COMMAND = max(_KNOWN_BY_LENGTH)
+
+
+def normalize_command(command: str):
+    """
+    Single spaces, and the command keywords lowercased with unambiguous IOS
+    abbreviations expanded. Arguments (interface names, VRFs) and an output
+    filter after "|" are kept as typed - they are case sensitive.
+    """
+    command, pipe, output_filter = command.partition("|")
+    words = command.split()
+    for length in range(min(len(words), _LONGEST_COMMAND), 0, -1):
+        keywords = [word.lower() for word in words[:length]]
+        matches = [known for known in _KNOWN_BY_LENGTH.get(length, ())
+                   if all(full.startswith(word) for word, full in zip(keywords, known))]
+        if matches:
+            if len(matches) == 1:
+                words[:length] = matches[0]
+            break
+    normalized = " ".join(words)
+    return f"{normalized} | {output_filter.strip()}" if pipe else normalized
+
+
+class CachedOutput:
+    __slots__ = ("expires", "output")
+
+    def __init__(self, expires: float, output: str):
+        self.expires = expires
+        self.output = output
+
+
+class Flight:
+    """One device call in progress; identical requests wait on it."""
+
+    __slots__ = ("done", "output", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.output = None
+        self.error = None
+
+
+class OutputCache:
+    """
+    TTL + LRU cache of command output with single-flight loading.
+
+    - ttls:        {command prefix: seconds}, merged over DEFAULT_TTLS
+    - default_ttl: seconds for commands no prefix matches
+    - max_entries: least recently used outputs are evicted beyond this
+    """
+
+    def __init__(self, ttls: dict = None, default_ttl: float = 10.0, max_entries: int = 10_000,
+                 clock=time.monotonic):
+        self.ttls = {normalize_command(prefix): seconds for prefix, seconds in {**DEFAULT_TTLS, **(ttls or {})}.items()}
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()  # (device, command) -> CachedOutput, least recently used first
+        self._by_device = {}           # device -> {command}
+        self._flights = {}             # (device, command) -> Flight
+        self._generations = {}         # device -> invalidation count
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidated = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def ttl_for(self, command: str):
+        words = command.split()
+        for length in range(len(words), 0, -1):
+            ttl = self.ttls.get(" ".join(words[:length]))
+            if ttl is not None:
+                return ttl
+        return self.default_ttl
+
+    def fetch(self, device: str, command: str, load, refresh: bool = False):
+        """
+        Output of command on device: cached, joined from a call in progress, or
+        load() - run once for everyone asking. refresh=True skips the cached copy.
+        """
+        command = normalize_command(command)
+        ttl = self.ttl_for(command)
+        if ttl <= 0:
+            with self._lock:
+                self.misses += 1
+            return load()
+        key = (device, command)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not refresh and entry.expires > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.output
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+                generation = self._generations.get(device, 0)
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.output
+
+        try:
+            flight.output = load()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            with self._lock:
+                if self._generations.get(device, 0) == generation:
+                    self._store(key, CachedOutput(self.clock() + ttl, flight.output))
+            return flight.output
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+
+    def _store(self, key, entry):
+        device, command = key
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._by_device.setdefault(device, set()).add(command)
+        while len(self._entries) > self.max_entries:
+            (old_device, old_command), _ = self._entries.popitem(last=False)
+            self._forget(old_device, old_command)
+            self.evicted += 1
+
+    def _forget(self, device, command):
+        commands = self._by_device.get(device)
+        if commands is not None:
+            commands.discard(command)
+            if not commands:
+                del self._by_device[device]
+
+    def invalidate(self, device: str = None, command: str = None):
+        """
+        Drop cached output for one device (optionally one command), or for
+        everything when device is None. Returns how many entries were dropped.
+        """
+        with self._lock:
+            if device is None:
+                dropped = len(self._entries)
+                for cached_device in list(self._by_device) + [flight_device for flight_device, _ in self._flights]:
+                    self._generations[cached_device] = self._generations.get(cached_device, 0) + 1
+                self._entries.clear()
+                self._by_device.clear()
+                self._flights.clear()
+            else:
+                self._generations[device] = self._generations.get(device, 0) + 1
+                commands = [normalize_command(command)] if command else list(self._by_device.get(device, ()))
+                dropped = 0
+                for cached_command in commands:
+                    if self._entries.pop((device, cached_command), None) is not None:
+                        dropped += 1
+                    self._forget(device, cached_command)
+                    self._flights.pop((device, cached_command), None)  # Later requests start a fresh call
+                if not command:
+                    for key in [key for key in self._flights if key[0] == device]:
+                        del self._flights[key]
+            self.invalidated += dropped
+            return dropped
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "devices": len(self._by_device),
+                "in_flight": len(self._flights),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "invalidated": self.invalidated,
+                "evicted": self.evicted,
+                "ttls": self.ttls,
+                "default_ttl": self.default_ttl
+            }
+
+
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    from connection_pool import ConnectionPool
+    from fake_device import FakeDeviceServer
+
+    server = FakeDeviceServer(command_delay=0.02).start()
+    device = server.device_params(0)
+    pool = ConnectionPool(max_per_device=4)
+    cache = OutputCache()
+    commands = ["show ip interface brief", "sh ip int br", "show version", "show processes cpu"]
+
+    def uncached(command):
+        with pool.session(device) as net_connect:
+            return net_connect.send_command(command)
+
+    def cached(command):
+        return cache.fetch(device["host"], command, lambda: uncached(command))
+
+    print("🗃️ Show Command Cache Benchmark")
+    print("=" * 60)
+    requests = 400
+    for label, function in (("every request to the device", uncached), ("output cache + single-flight", cached)):
+        before = server.commands
+        with ThreadPoolExecutor(16) as executor:
+            started = time.perf_counter()
+            list(executor.map(function, [commands[number % len(commands)] for number in range(requests)]))
+            elapsed = time.perf_counter() - started
+        print(f"{label:<30} {requests / elapsed:8,.0f} requests/s, {server.commands - before:4} device commands "
+              f"for {requests} requests (16 threads)")
+    stats = cache.stats()
+    print(f"Cache: {stats['hits']} hits, {stats['misses']} misses, {stats['coalesced']} joined a call in progress")
+    print(f"normalize_command('sh ip int br') -> '{normalize_command('sh ip int br')}'")
+    pool.close()
+    server.stop()
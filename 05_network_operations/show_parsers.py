@@ -0,0 +1,584 @@
+"""
+Section 05: Show Command Parsers
+
+Webhook consumers want interfaces, routes and ARP entries, not screens of
+text. These parsers turn IOS show output into records, fast enough for a
+router with 10,000+ routes:
+
+- tables (show ip interface brief, show arp, show processes cpu) are sliced
+  at column offsets found once in the header line - no regex per line. A
+  line whose columns don't line up (e.g. an interface name longer than its
+  column) falls back to splitting on whitespace
+- show ip route and show interfaces aren't tables; their lines are told
+  apart by how they start and split with str methods
+- records are NamedTuples: small, immutable, ._asdict() for JSON
+- parsing is incremental: feed() chunks of output as they arrive and get
+  back the records completed so far, close() at the end
+
+Usage:
+    interfaces = parse("show ip interface brief", output).records
+
+    parser = parser_for("show ip route")
+    for chunk in chunks:                # e.g. from net_connect.read_channel()
+        for route in parser.feed(chunk):
+            ...
+    parser.close()
+
+Run this file directly for a benchmark against regex and TextFSM parsing:
+python show_parsers.py
+"""
+
+from typing import NamedTuple
+
+from output_cache import normalize_command
+
+
+class InterfaceBrief(NamedTuple):
+    interface: str
+    ip_address: str
+    ok: str
+    method: str
+    status: str
+    protocol: str
+
+
+class Interface(NamedTuple):
+    interface: str
+    status: str
+    protocol: str
+    description: str = None
+    hardware: str = None
+    mac_address: str = None
+    ip_address: str = None
+    mtu: int = None
+    bandwidth_kbit: int = None
+    duplex: str = None
+    speed: str = None
+    input_rate_bps: int = None
+    output_rate_bps: int = None
+    input_packets: int = None
+    input_bytes: int = None
+    output_packets: int = None
+    output_bytes: int = None
+    input_errors: int = None
+    crc_errors: int = None
+    output_errors: int = None
+    interface_resets: int = None
+
+
+class Route(NamedTuple):
+    """One path to a network - ECMP networks give one Route per next hop."""
+    protocol: str
+    route_type: str
+    network: str
+    distance: int = None
+    metric: int = None
+    next_hop: str = None
+    age: str = None
+    interface: str = None
+
+
+class ArpEntry(NamedTuple):
+    address: str
+    age_minutes: int  # None for the device's own addresses ("-")
+    mac_address: str
+    type: str
+    interface: str
+
+
+class CpuUtilization(NamedTuple):
+    five_seconds: int
+    interrupt: int
+    one_minute: int
+    five_minutes: int
+
+
+class ProcessCpu(NamedTuple):
+    pid: int
+    runtime_ms: int
+    invoked: int
+    usecs: int
+    five_seconds: float
+    one_minute: float
+    five_minutes: float
+    tty: int
+    process: str
+
+
+class MemoryPool(NamedTuple):
+    pool: str
+    head: str
+    total: int
+    used: int
+    free: int
+    lowest: int
+    largest: int
+
+
+class ShowParser:
+    """
+    Base class: feed() output as it arrives, close() when it ended.
+
+    Subclasses implement _parse_lines(lines) -> [records] for complete lines
+    and may return a last record from _finish().
+    """
+
+    command = None
+
+    def __init__(self):
+        self.records = []
+        self.summary = None  # Per-output facts such as CPU utilization
+        self._partial = ""   # A line whose end hasn't arrived yet
+
+    def feed(self, chunk: str):
+        """Parse the complete lines in chunk; returns the records they completed."""
+        lines = (self._partial + chunk).split("\n")
+        self._partial = lines.pop()
+        records = self._parse_lines(lines)
+        self.records.extend(records)
+        return records
+
+    def close(self):
+        """Parse whatever is left; returns the records that completed."""
+        records = self._parse_lines([self._partial]) if self._partial else []
+        self._partial = ""
+        records.extend(self._finish())
+        self.records.extend(records)
+        return records
+
+    def _parse_lines(self, lines):
+        raise NotImplementedError
+
+    def _finish(self):
+        return []
+
+    def as_dict(self):
+        result = {"command": self.command, "records": [record._asdict() for record in self.records]}
+        if self.summary is not None:
+            result["summary"] = self.summary._asdict()
+        return result
+
+
+def column_starts(header: str, names):
+    return [header.index(name) for name in names]
+
+
+class InterfaceBriefParser(ShowParser):
+    """show ip interface brief - left-aligned columns."""
+
+    command = "show ip interface brief"
+
+    def __init__(self):
+        super().__init__()
+        self._columns = None
+
+    def _parse_lines(self, lines):
+        records = []
+        append = records.append
+        columns = self._columns
+        if columns is not None:
+            ip, ok, method, status, protocol = columns
+        for line in lines:
+            if columns is None:
+                if line.startswith("Interface") and "IP-Address" in line:
+                    columns = self._columns = column_starts(line, ("IP-Address", "OK?", "Method", "Status", "Protocol"))
+                    ip, ok, method, status, protocol = columns
+                continue
+            if line[ip - 1:ip] == " " and line[protocol:protocol + 1] not in ("", " "):
+                append(InterfaceBrief(line[:ip].rstrip(), line[ip:ok].rstrip(), line[ok:method].rstrip(),
+                                      line[method:status].rstrip(), line[status:protocol].rstrip(),
+                                      line[protocol:].rstrip()))
+            elif line.strip():
+                parts = line.split()
+                if len(parts) >= 6:  # Name overflowed its column; status may be "administratively down"
+                    append(InterfaceBrief(parts[0], parts[1], parts[2], parts[3], " ".join(parts[4:-1]), parts[-1]))
+        return records
+
+
+class ArpParser(ShowParser):
+    """show arp / show ip arp - left-aligned columns, age right-aligned."""
+
+    command = "show arp"
+
+    def __init__(self):
+        super().__init__()
+        self._columns = None
+
+    def _parse_lines(self, lines):
+        records = []
+        append = records.append
+        columns = self._columns
+        if columns is not None:
+            address, age, hardware, kind, interface = columns
+        for line in lines:
+            if columns is None:
+                if line.startswith("Protocol") and "Hardware Addr" in line:
+                    columns = self._columns = column_starts(line, ("Address", "Age", "Hardware", "Type", "Interface"))
+                    address, age, hardware, kind, interface = columns
+                continue
+            minutes = line[age:hardware].strip()
+            if (line[hardware - 1:hardware] == " " and line[hardware:hardware + 1] not in ("", " ")
+                    and (minutes == "-" or minutes.isdigit())):
+                append(ArpEntry(line[address:age].rstrip(), None if minutes == "-" else int(minutes),
+                                line[hardware:kind].rstrip(), line[kind:interface].rstrip(),
+                                line[interface:].rstrip()))
+            elif line.strip():
+                parts = line.split()
+                if len(parts) >= 5 and (parts[2] == "-" or parts[2].isdigit()):
+                    append(ArpEntry(parts[1], None if parts[2] == "-" else int(parts[2]), parts[3], parts[4],
+                                    parts[5] if len(parts) > 5 else ""))
+        return records
+
+
+class ProcessesCpuParser(ShowParser):
+    """show processes cpu - right-aligned numbers, then the process name."""
+
+    command = "show processes cpu"
+
+    def __init__(self):
+        super().__init__()
+        self._columns = None
+
+    def _parse_lines(self, lines):
+        records = []
+        append = records.append
+        columns = self._columns
+        if columns is not None:
+            pid, runtime, invoked, usecs, sec5, min1, min5, tty, process = columns
+        for line in lines:
+            if columns is None:
+                if line.startswith("CPU utilization"):
+                    try:
+                        self.summary = parse_cpu_utilization(line)
+                    except ValueError:
+                        pass  # A format we don't know - the process table still parses
+                elif "PID" in line and "Runtime(ms)" in line:
+                    names = ("PID", "Runtime(ms)", "Invoked", "uSecs", "5Sec", "1Min", "5Min", "TTY")
+                    columns = self._columns = [line.index(name) + len(name) for name in names] + [line.index("Process")]
+                    pid, runtime, invoked, usecs, sec5, min1, min5, tty, process = columns
+                continue
+            if not line.strip():
+                continue
+            edge = line[tty - 1:tty + 1]  # TTY's last digit, then a space - unless a wide number shifted the row
+            if len(edge) == 2 and edge[0] != " " and edge[1] == " ":
+                try:
+                    append(process_cpu((line[:pid], line[pid:runtime], line[runtime:invoked], line[invoked:usecs],
+                                        line[usecs:sec5], line[sec5:min1], line[min1:min5], line[min5:tty],
+                                        line[process:].rstrip())))
+                    continue
+                except ValueError:
+                    pass
+            fields = line.split(None, 8)
+            if len(fields) == 9:
+                try:
+                    append(process_cpu(fields))
+                except ValueError:
+                    pass  # Not a process line
+        return records
+
+
+def process_cpu(fields):
+    return ProcessCpu(int(fields[0]), int(fields[1]), int(fields[2]), int(fields[3]),
+                      float(fields[4].strip().rstrip("%")), float(fields[5].strip().rstrip("%")),
+                      float(fields[6].strip().rstrip("%")), int(fields[7]), fields[8].strip())
+
+
+def parse_cpu_utilization(line: str):
+    """'CPU utilization for five seconds: 7%/0%; one minute: 6%; five minutes: 5%'"""
+    five_seconds, one_minute, five_minutes = (part.rpartition(": ")[2] for part in line.split(";")[:3])
+    total, _, interrupt = five_seconds.partition("/")
+    return CpuUtilization(int(total.rstrip("%")), int(interrupt.rstrip("%") or 0),
+                          int(one_minute.strip().rstrip("%")), int(five_minutes.strip().rstrip("%")))
+
+
+class MemoryStatisticsParser(ShowParser):
+    """show memory statistics - a few pools; names such as "reserve P" contain spaces."""
+
+    command = "show memory statistics"
+
+    def __init__(self):
+        super().__init__()
+        self._header_seen = False
+
+    def _parse_lines(self, lines):
+        records = []
+        for line in lines:
+            if not self._header_seen:
+                self._header_seen = "Total(b)" in line and "Used(b)" in line
+                continue
+            fields = line.rsplit(None, 6)
+            if len(fields) == 7 and all(field.isdigit() for field in fields[2:]):
+                records.append(MemoryPool(fields[0].strip(), fields[1], *(int(field) for field in fields[2:])))
+        return records
+
+
+class RouteParser(ShowParser):
+    """
+    show ip route - one Route per path.
+
+    A route line is protocol codes, a network and then either
+    "[distance/metric] via next-hop, age, interface" or "is directly
+    connected, interface". Further paths of the same network follow on
+    indented lines starting with "[". Networks printed without a mask take it
+    from the "a.b.c.d/len is subnetted" line above them.
+    """
+
+    command = "show ip route"
+
+    def __init__(self):
+        super().__init__()
+        self._route = None  # (protocol, route_type, network) of the last route line
+        self._mask = None   # Mask of the current "is subnetted" block
+
+    def _parse_lines(self, lines):
+        records = []
+        append = records.append
+        for line in lines:
+            if not line or line[0] == " ":
+                stripped = line.strip()
+                if not stripped:
+                    continue
+                if stripped[0] == "[":
+                    if self._route is not None:
+                        append(Route(*self._route, *parse_route_path(stripped.split())))
+                elif "subnetted" in stripped:
+                    network, _, rest = stripped.partition(" ")
+                    self._mask = network.partition("/")[2] if rest.startswith("is subnetted") else None
+                continue
+            tokens = line.split()
+            # The network follows one or two code tokens: "C", "S*", "O IA", "i L2"
+            if len(tokens) > 1 and tokens[1][0].isdigit():
+                position = 1
+            elif len(tokens) > 2 and tokens[2][0].isdigit():
+                position = 2
+            else:
+                continue  # Codes legend, "Gateway of last resort ..."
+            code = tokens[0]
+            protocol = code.rstrip("*+%")
+            route_type = " ".join(([code[len(protocol):]] if len(code) > len(protocol) else []) + tokens[1:position])
+            network = tokens[position]
+            if "/" not in network:
+                if self._mask is None:
+                    continue  # Not a network, e.g. a wrapped legend line
+                network = f"{network}/{self._mask}"
+            self._route = (protocol, route_type or None, network)
+            rest = tokens[position + 1:]
+            if not rest:
+                continue  # Paths follow on the next lines
+            if rest[0] == "is":  # "is directly connected, Gi1" / "is a summary, 00:01:02, Null0"
+                append(Route(*self._route, interface=rest[-1] if rest[-1][0].isalpha() else None))
+            else:
+                append(Route(*self._route, *parse_route_path(rest)))
+        return records
+
+
+def parse_route_path(tokens):
+    """['[110/2]', 'via', '10.0.0.3,', '1d02h,', 'Gi2'] -> (110, 2, '10.0.0.3', '1d02h', 'Gi2')"""
+    distance = metric = next_hop = age = interface = None
+    if tokens[0][0] == "[":
+        distance, _, metric = tokens[0][1:-1].partition("/")
+        distance, metric = int(distance), int(metric)
+        tokens = tokens[1:]
+    if tokens and tokens[0] == "via":
+        next_hop = tokens[1].rstrip(",")
+        tokens = tokens[2:]
+    for token in tokens:
+        token = token.rstrip(",")
+        if token[0].isdigit():
+            age = token
+        else:
+            interface = token
+    return distance, metric, next_hop, age, interface
+
+
+class InterfacesParser(ShowParser):
+    """
+    show interfaces - a block per interface.
+
+    A block starts at an unindented "X is up, line protocol is up" line and
+    is complete when the next one starts (or at close()). The interesting
+    indented lines are recognised by how they start.
+    """
+
+    command = "show interfaces"
+
+    def __init__(self):
+        super().__init__()
+        self._fields = None  # Values of the interface being read, by Interface field
+
+    def _parse_lines(self, lines):
+        records = []
+        for line in lines:
+            if not line:
+                continue
+            if line[0] != " ":
+                if ", line protocol is " in line:
+                    if self._fields is not None:
+                        records.append(Interface(**self._fields))
+                    name, _, rest = line.partition(" is ")
+                    status, _, protocol = rest.partition(", line protocol is ")
+                    self._fields = {"interface": name, "status": status, "protocol": protocol.split(" ", 1)[0]}
+                continue
+            fields = self._fields
+            if fields is None:
+                continue
+            text = line.strip()
+            if text[0].isdigit():
+                tokens = text.split()
+                if len(tokens) < 5 or not tokens[0].isdigit():
+                    continue
+                second, third = tokens[1], tokens[2]
+                if second == "packets" and third == "input,":
+                    fields["input_packets"], fields["input_bytes"] = int(tokens[0]), int(tokens[3])
+                elif second == "packets" and third == "output,":
+                    fields["output_packets"], fields["output_bytes"] = int(tokens[0]), int(tokens[3])
+                elif second == "input" and third == "errors,":
+                    fields["input_errors"], fields["crc_errors"] = int(tokens[0]), int(tokens[3])
+                elif second == "output" and third == "errors,":
+                    fields["output_errors"] = int(tokens[0])
+                    if tokens[-2:] == ["interface", "resets"]:
+                        fields["interface_resets"] = int(tokens[-3])
+                elif third == "input" and tokens[3] == "rate":  # "5 minute input rate 1000 bits/sec, ..."
+                    fields["input_rate_bps"] = int(tokens[4])
+                elif third == "output" and tokens[3] == "rate":
+                    fields["output_rate_bps"] = int(tokens[4])
+            elif text.startswith("Hardware is "):
+                hardware, _, address = text[12:].partition(", address is ")
+                fields["hardware"] = hardware
+                if address:
+                    fields["mac_address"] = address.split(" ", 1)[0]
+            elif text.startswith("Description: "):
+                fields["description"] = text[13:]
+            elif text.startswith("Internet address is "):
+                fields["ip_address"] = text[20:]
+            elif text.startswith("MTU "):
+                tokens = text.split()
+                fields["mtu"] = int(tokens[1])
+                if len(tokens) > 4 and tokens[3] == "BW":
+                    fields["bandwidth_kbit"] = int(tokens[4])
+            elif "-duplex" in text[:12]:
+                duplex, _, rest = text.partition(", ")
+                fields["duplex"] = duplex
+                fields["speed"] = rest.partition(",")[0] or None
+        return records
+
+    def _finish(self):
+        if self._fields is None:
+            return []
+        record, self._fields = Interface(**self._fields), None
+        return [record]
+
+
+PARSERS = {
+    "show ip interface brief": InterfaceBriefParser,
+    "show interfaces": InterfacesParser,
+    "show ip route": RouteParser,
+    "show arp": ArpParser,
+    "show ip arp": ArpParser,
+    "show processes cpu": ProcessesCpuParser,
+    "show processes cpu sorted": ProcessesCpuParser,
+    "show memory statistics": MemoryStatisticsParser,
+}
+
+
+def parser_for(command: str):
+    """A fresh parser for command (abbreviations allowed), or None if there is none."""
+    parser_class = PARSERS.get(normalize_command(command))
+    return parser_class() if parser_class is not None else None
+
+
+def parse(command: str, output: str):
+    """The closed parser (.records, .summary) for a complete output, or None."""
+    parser = parser_for(command)
+    if parser is not None:
+        parser.feed(output)
+        parser.close()
+    return parser
+
+
+if __name__ == "__main__":
+    import os
+    import re
+    import time
+
+    import fake_device
+
+    print("🧩 Show Command Parser Benchmark")
+    print("=" * 60)
+
+    # The usual hand-written alternative: one regex per line, building the same records
+    brief_pattern = re.compile(r"^(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(up|down|administratively down)\s+(\S+)\s*$")
+    arp_pattern = re.compile(r"^Internet\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)\s*(\S*)\s*$")
+    route_pattern = re.compile(r"^(\S+)(?: (\S+))?\s+(\d+\.\d+\.\d+\.\d+/\d+)\s+\[(\d+)/(\d+)\] via (\S+?),?"
+                               r"(?:\s+(\d\S*?),?)?(?:\s+(\S+))?\s*$")
+
+    def regex_brief(output):
+        return [InterfaceBrief(*match.groups()) for match in map(brief_pattern.match, output.splitlines()) if match]
+
+    def regex_arp(output):
+        return [ArpEntry(address, None if age == "-" else int(age), mac, kind, interface)
+                for address, age, mac, kind, interface in
+                (match.groups() for match in map(arp_pattern.match, output.splitlines()) if match)]
+
+    def regex_route(output):  # Misses paths continued on the next lines
+        return [Route(code, route_type, network, int(distance), int(metric), next_hop, age, interface)
+                for code, route_type, network, distance, metric, next_hop, age, interface in
+                (match.groups() for match in map(route_pattern.match, output.splitlines()) if match)]
+
+    try:
+        import textfsm
+        from ntc_templates.parse import _get_template_dir
+        template_dir = _get_template_dir()
+    except ImportError:
+        textfsm = None
+        print("TextFSM/ntc-templates not installed - comparing with regex only")
+
+    def textfsm_parse(template):
+        def run(output):
+            with open(os.path.join(template_dir, template)) as template_file:
+                return textfsm.TextFSM(template_file).ParseText(output)
+        return run
+
+    def timed(function, output):
+        best = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            records = function(output)
+            best = min(best, time.perf_counter() - started)
+        return best, len(records)
+
+    cases = [
+        ("show ip interface brief", fake_device.show_ip_interface_brief(20_000),
+         regex_brief, "cisco_ios_show_ip_interface_brief.textfsm"),
+        ("show arp", fake_device.show_arp(20_000), regex_arp, "cisco_ios_show_ip_arp.textfsm"),
+        ("show ip route", fake_device.show_ip_route(20_000), regex_route,
+         "cisco_ios_show_ip_route.textfsm"),
+        ("show interfaces", fake_device.show_interfaces(10_000), None, "cisco_ios_show_interfaces.textfsm"),
+    ]
+    for command, output, regex_baseline, template in cases:
+        lines = output.count("\n") + 1
+        print(f"\n{command}: {lines:,} lines, {len(output) / 1024 / 1024:.1f} MiB")
+        seconds, records = timed(lambda text: parse(command, text).records, output)
+        print(f"  {'show_parsers':<28} {seconds * 1000:8.1f} ms  {records:>7,} records")
+
+        def in_chunks(text):
+            parser = parser_for(command)
+            for start in range(0, len(text), 4096):
+                parser.feed(text[start:start + 4096])
+            parser.close()
+            return parser.records
+
+        seconds_chunked, records = timed(in_chunks, output)
+        print(f"  {'show_parsers, 4 KiB chunks':<28} {seconds_chunked * 1000:8.1f} ms  {records:>7,} records")
+        if regex_baseline is not None:
+            baseline, records = timed(regex_baseline, output)
+            print(f"  {'regex per line':<28} {baseline * 1000:8.1f} ms  {records:>7,} records "
+                  f"({baseline / seconds:.1f}x the time)")
+        if textfsm is not None:
+            baseline, records = timed(textfsm_parse(template), output)
+            print(f"  {'TextFSM (ntc-templates)':<28} {baseline * 1000:8.1f} ms  {records:>7,} records "
+                  f"({baseline / seconds:.1f}x the time)")
+
+    cpu = parse("show processes cpu", fake_device.default_outputs("lab-sw-0000")["show processes cpu"])
+    print(f"\nshow processes cpu: {cpu.summary}")
+    print(f"sh ip int br -> {parse('sh ip int br', fake_device.show_ip_interface_brief(2)).records[0]}")
@@ -0,0 +1,399 @@
+"""
+Section 06: Alert Admission Control
+
+The ERROR_PATTERN_WEBHOOK applet matches `.*ERROR.*|.*CRITICAL.*|.*ALERT.*`,
+so one noisy device can flood /error-alert. Two guards sit in front of the
+alert handlers:
+
+1. Per-device token bucket (for the rate-limited event types): each device
+   may send `burst` alerts at once and then `rate` per second. State is two
+   floats per device, updated in O(1) on arrival - no timers. Buckets live in
+   an LRU-ordered dict capped at max_devices; the bucket evicted first is the
+   one idle longest, which has refilled anyway.
+
+2. Global priority gate: at most max_concurrent alerts are handled at once.
+   Late arrivals wait in one FIFO per priority class, and a freed slot goes to
+   the most important waiter - critical first, then interface, error and
+   informational. When the waiting room is full the least important waiter is
+   shed.
+
+Nothing refused is forgotten: every rejected alert is counted in a
+per-device digest (count, first/last time, a few sample messages). The next
+alert admitted for that device carries the digest along in a
+`suppressed_alerts` field, and GET /edm/admission lists what is outstanding.
+
+Everything here runs on the asyncio event loop inside an ASGI middleware, so
+no locks are needed.
+
+Run this file directly for a benchmark: python admission_control.py
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+
+from edm_payload import decode_payload
+
+# Lower number = more important
+PRIORITIES = ("critical", "interface", "error", "informational")
+CRITICAL, INTERFACE, ERROR, INFORMATIONAL = range(len(PRIORITIES))
+
+DIGEST_SAMPLES = 3  # Sample messages kept per device digest
+
+
+class DeviceTokenBuckets:
+    """Per-device token buckets: burst alerts at once, then rate per second."""
+
+    def __init__(self, rate: float, burst: float, max_devices: int = 100_000, clock=time.monotonic):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.max_devices = max_devices
+        self.clock = clock
+        self._buckets = OrderedDict()  # device -> [tokens, last update]
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def allow(self, device, now: float = None):
+        """
+        Take one token for device. Returns (allowed, retry_after_seconds).
+        """
+        now = self.clock() if now is None else now
+        bucket = self._buckets.get(device)
+        if bucket is None:
+            bucket = self._buckets[device] = [self.burst, now]
+            if len(self._buckets) > self.max_devices:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(device)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return True, 0.0
+        return False, (1 - bucket[0]) / self.rate
+
+
+class PriorityGate:
+    """
+    Concurrency limit whose waiting room is served most important first.
+
+    acquire() returns "admitted", "shed" (pushed out by more important
+    alerts) or "timeout" (waited longer than max_wait_seconds). Every
+    "admitted" must be paired with release().
+    """
+
+    def __init__(self, max_concurrent: int, max_waiting: int = 1000, max_wait_seconds: float = 5.0):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.max_wait_seconds = max_wait_seconds
+        self.in_flight = 0
+        self._waiting = [deque() for _ in PRIORITIES]
+
+    @property
+    def waiting(self):
+        return sum(1 for queue in self._waiting for waiter in queue if not waiter.done())
+
+    async def acquire(self, priority: int):
+        if self.in_flight < self.max_concurrent and not any(self._waiting):
+            self.in_flight += 1
+            return "admitted"
+
+        if sum(len(queue) for queue in self._waiting) >= self.max_waiting and not self._shed_below(priority):
+            return "shed"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting[priority].append(waiter)
+        try:
+            admitted = await asyncio.wait_for(waiter, self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            # The slot may have been handed over just as the timer fired
+            if waiter.done() and not waiter.cancelled() and waiter.result():
+                return "admitted"
+            return "timeout"
+        return "admitted" if admitted else "shed"
+
+    def _shed_below(self, priority: int):
+        """Push out the newest waiter less important than priority; False if there is none."""
+        for lower in range(len(PRIORITIES) - 1, priority, -1):
+            queue = self._waiting[lower]
+            while queue:
+                waiter = queue.pop()
+                if not waiter.done():
+                    waiter.set_result(False)
+                    return True
+        return False
+
+    def release(self):
+        """Hand the slot to the most important waiter, or free it."""
+        for queue in self._waiting:
+            while queue:
+                waiter = queue.popleft()
+                if not waiter.done():
+                    waiter.set_result(True)
+                    return
+        self.in_flight -= 1
+
+
+class SuppressedDigest:
+    """Per-device summary of alerts that were refused."""
+
+    def __init__(self, max_devices: int = 100_000, clock=time.time):
+        self.max_devices = max_devices
+        self.clock = clock
+        self._digests = OrderedDict()
+
+    def __len__(self):
+        return len(self._digests)
+
+    def record(self, device, priority: int, reason: str, message: str = None):
+        now = self.clock()
+        digest = self._digests.get(device)
+        if digest is None:
+            digest = self._digests[device] = {
+                "count": 0, "first_suppressed": now, "last_suppressed": now,
+                "by_reason": {}, "by_priority": {}, "samples": deque(maxlen=DIGEST_SAMPLES)
+            }
+            if len(self._digests) > self.max_devices:
+                self._digests.popitem(last=False)
+        else:
+            self._digests.move_to_end(device)
+        digest["count"] += 1
+        digest["last_suppressed"] = now
+        digest["by_reason"][reason] = digest["by_reason"].get(reason, 0) + 1
+        name = PRIORITIES[priority]
+        digest["by_priority"][name] = digest["by_priority"].get(name, 0) + 1
+        if message:
+            digest["samples"].append(message)
+        return digest["count"]
+
+    @staticmethod
+    def _export(device, digest):
+        return {
+            "device": device,
+            "count": digest["count"],
+            "first_suppressed": datetime.fromtimestamp(digest["first_suppressed"], timezone.utc).isoformat(),
+            "last_suppressed": datetime.fromtimestamp(digest["last_suppressed"], timezone.utc).isoformat(),
+            "by_reason": dict(digest["by_reason"]),
+            "by_priority": dict(digest["by_priority"]),
+            "samples": list(digest["samples"])
+        }
+
+    def take(self, device):
+        """Remove and return the digest for device (None if nothing was suppressed)."""
+        digest = self._digests.pop(device, None)
+        return self._export(device, digest) if digest is not None else None
+
+    def snapshot(self, limit: int = 100):
+        """Outstanding digests, most recently suppressed first."""
+        results = []
+        for device in reversed(self._digests):
+            results.append(self._export(device, self._digests[device]))
+            if len(results) >= limit:
+                break
+        return results
+
+
+class AdmissionController:
+    """
+    Token buckets + priority gate + digest, with outcome counters.
+
+    - rate / burst:     per-device bucket for limited_types (rate 0 = no bucket)
+    - max_concurrent:   alerts handled at once (0 = no gate)
+    """
+
+    def __init__(self, rate: float = 1.0, burst: float = 20, max_concurrent: int = 32,
+                 max_waiting: int = 1000, max_wait_seconds: float = 5.0,
+                 limited_types=("error_detected",), max_devices: int = 100_000):
+        self.buckets = DeviceTokenBuckets(rate, burst, max_devices) if rate > 0 else None
+        self.gate = PriorityGate(max_concurrent, max_waiting, max_wait_seconds) if max_concurrent > 0 else None
+        self.digest = SuppressedDigest(max_devices)
+        self.limited_types = frozenset(limited_types)
+        self.outcomes = {}  # (outcome, priority name) -> count
+
+    def _count(self, outcome, priority):
+        key = (outcome, PRIORITIES[priority])
+        self.outcomes[key] = self.outcomes.get(key, 0) + 1
+
+    def check_rate(self, device, event_type, priority, message=None):
+        """
+        Token bucket check. Returns (allowed, retry_after, suppressed) where
+        suppressed is the device's running count of refused alerts.
+        """
+        if self.buckets is None or event_type not in self.limited_types:
+            return True, 0.0, 0
+        allowed, retry_after = self.buckets.allow(device)
+        if allowed:
+            return True, 0.0, 0
+        self._count("rate_limited", priority)
+        return False, retry_after, self.digest.record(device, priority, "rate_limited", message)
+
+    async def acquire(self, device, priority, message=None):
+        """Wait for a handler slot. Returns "admitted", "shed" or "timeout"."""
+        outcome = "admitted" if self.gate is None else await self.gate.acquire(priority)
+        if outcome != "admitted":
+            self.digest.record(device, priority, outcome, message)
+        self._count(outcome, priority)
+        return outcome
+
+    def release(self):
+        if self.gate is not None:
+            self.gate.release()
+
+    def stats(self):
+        outcomes = {}
+        for (outcome, priority), count in self.outcomes.items():
+            outcomes.setdefault(outcome, {})[priority] = count
+        return {
+            "rate_limited_event_types": sorted(self.limited_types),
+            "bucket_rate_per_second": self.buckets.rate if self.buckets else None,
+            "bucket_burst": self.buckets.burst if self.buckets else None,
+            "tracked_devices": len(self.buckets) if self.buckets else 0,
+            "max_concurrent": self.gate.max_concurrent if self.gate else None,
+            "in_flight": self.gate.in_flight if self.gate else None,
+            "waiting": self.gate.waiting if self.gate else 0,
+            "devices_with_suppressed_alerts": len(self.digest),
+            "outcomes": outcomes
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying an AdmissionController to the alert routes.
+
+    classify(path, data) returns (device, event_type, priority, message).
+    Refused alerts get 429 (rate limited, with Retry-After) or 503 (shed).
+    """
+
+    def __init__(self, app, controller: AdmissionController, paths, classify):
+        self.app = app
+        self.controller = controller
+        self.paths = frozenset(paths)
+        self.classify = classify
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        try:
+            data = decode_payload(body)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            # Let the route report the bad body as usual
+            return await self.app(scope, replay_body(body), send)
+
+        device, event_type, priority, alert_message = self.classify(scope["path"], data)
+        controller = self.controller
+
+        allowed, retry_after, suppressed = controller.check_rate(device, event_type, priority, alert_message)
+        if not allowed:
+            return await respond(send, 429, {
+                "status": "rate_limited",
+                "device": device,
+                "detail": "Too many alerts from this device - summarized, not dropped",
+                "suppressed_count": suppressed
+            }, [(b"retry-after", str(max(1, round(retry_after))).encode())])
+
+        outcome = await controller.acquire(device, priority, alert_message)
+        if outcome != "admitted":
+            return await respond(send, 503, {
+                "status": outcome,
+                "device": device,
+                "detail": "Server overloaded - more important alerts were handled first"
+            }, [(b"retry-after", b"1")])
+
+        try:
+            if event_type in controller.limited_types:
+                suppressed = controller.digest.take(device)
+                if suppressed is not None:
+                    data["suppressed_alerts"] = suppressed
+                    body = json.dumps(data).encode()
+                    scope = dict(scope, headers=[
+                        (name, value) for name, value in scope["headers"] if name != b"content-length"
+                    ] + [(b"content-length", str(len(body)).encode())])
+            await self.app(scope, replay_body(body), send)
+        finally:
+            controller.release()
+
+
+def replay_body(body: bytes):
+    """A receive() that hands the already-read body to the next app."""
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return receive
+
+
+async def respond(send, status: int, payload: dict, extra_headers=()):
+    body = json.dumps(payload).encode()
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        *extra_headers
+    ]})
+    await send({"type": "http.response.body", "body": body})
+
+
+if __name__ == "__main__":
+    import random
+
+    # 1. Token bucket cost with 100k devices
+    buckets = DeviceTokenBuckets(rate=1.0, burst=20, max_devices=100_000)
+    rng = random.Random(2)
+    devices = [f"switch-{rng.randrange(100_000):05d}" for _ in range(1_000_000)]
+    started = time.perf_counter()
+    now = 0.0
+    for device in devices:
+        now += 0.00001
+        buckets.allow(device, now)
+    bucket_us = (time.perf_counter() - started) / len(devices) * 1e6
+
+    # 2. Overload: 2000 alerts arrive at once, 8 slots, 1 ms of work each
+    async def overload():
+        gate = PriorityGate(max_concurrent=8, max_waiting=5000, max_wait_seconds=30)
+        waits = {name: [] for name in PRIORITIES}
+
+        async def alert(priority):
+            arrived = time.perf_counter()
+            if await gate.acquire(priority) == "admitted":
+                waits[PRIORITIES[priority]].append(time.perf_counter() - arrived)
+                try:
+                    await asyncio.sleep(0.001)
+                finally:
+                    gate.release()
+
+        mix = [rng.choice([CRITICAL, INTERFACE, ERROR, INFORMATIONAL, INFORMATIONAL, INFORMATIONAL])
+               for _ in range(2000)]
+        await asyncio.gather(*(alert(priority) for priority in mix))
+        return waits
+
+    waits = asyncio.run(overload())
+
+    print("🚦 Admission Control Benchmark")
+    print("=" * 50)
+    print(f"Token bucket check: {bucket_us:.2f} µs per alert ({len(buckets):,} devices tracked)")
+    print("Overload (2,000 alerts, 8 slots) - wait before being handled:")
+    for name, values in waits.items():
+        values.sort()
+        print(f"  {name:<14} {len(values):5d} alerts   p50 {values[len(values) // 2] * 1e3:7.1f} ms   "
+              f"p99 {values[int(len(values) * 0.99)] * 1e3:7.1f} ms")
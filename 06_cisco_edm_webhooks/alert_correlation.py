@@ -0,0 +1,442 @@
+"""
+Section 06: Cross-Device Alert Correlation
+
+When an uplink dies, the devices on both ends - and everything behind them -
+fire /interface-alert, /error-alert and /cpu-alert within seconds. Handled one
+by one, that is N pages for one problem. CorrelationEngine groups those
+events into a single incident per root cause:
+
+- an event joins an open incident that already involves the same device, or
+  the far end of the same link, or a device adjacent to it in the topology
+- an incident stays open while events keep arriving within window_seconds
+  (a sliding window); after that it closes and the next event starts fresh
+- if one event touches two open incidents, they are merged into the older one
+- the root cause is the earliest event of the most telling type (a link going
+  down beats the errors and CPU spikes it causes)
+
+Lookups go through three indexes - device, (device, interface) and
+event_type - so each event costs a handful of dict operations no matter how
+many incidents are open. Open incidents live in an OrderedDict ordered by
+last activity, so expiry only looks at the oldest one. max_open_incidents
+and max_closed bound the memory.
+
+The topology file is optional JSON, either links between interfaces:
+
+    {"links": [{"device": "core-sw1", "interface": "Gi1/0/1",
+                "neighbor": "dist-sw1", "neighbor_interface": "Gi0/1"}]}
+
+or plain device adjacency: {"adjacency": {"core-sw1": ["dist-sw1", "dist-sw2"]}}
+
+Run this file directly for a throughput / memory benchmark:
+    python alert_correlation.py
+"""
+
+import itertools
+import json
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+
+# Lower wins when choosing an incident's root cause
+ROOT_CAUSE_PRIORITY = {
+    "interface_change": 0,
+    "error_detected": 1,
+    "low_memory": 2,
+    "high_cpu": 3,
+}
+DEFAULT_PRIORITY = 9
+
+# GigabitEthernet1/0/1 and Gi1/0/1 must hit the same index entry
+INTERFACE_NAME = re.compile(r"([A-Za-z-]+)\s*(\S*)")
+
+MEMBERS_SHOWN = 50  # Devices / interfaces listed per incident in API responses
+
+
+def normalize_interface(name):
+    """Short, lower-case interface name: GigabitEthernet1/0/1 -> gi1/0/1."""
+    if not name:
+        return None
+    match = INTERFACE_NAME.match(name.strip())
+    if match is None:
+        return name.strip().lower()
+    kind, number = match.groups()
+    return kind[:2].lower() + number.lower()
+
+
+def timestamp_text(seconds: float):
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat()
+
+
+class Topology:
+    """Device adjacency plus the far end of each known link."""
+
+    def __init__(self):
+        self.neighbors = {}  # device -> set of devices
+        self.peers = {}      # (device, interface) -> (neighbor, neighbor interface)
+
+    def __len__(self):
+        return len(self.neighbors)
+
+    def add_link(self, device, neighbor, interface=None, neighbor_interface=None):
+        self.neighbors.setdefault(device, set()).add(neighbor)
+        self.neighbors.setdefault(neighbor, set()).add(device)
+        if interface and neighbor_interface:
+            near = (device, normalize_interface(interface))
+            far = (neighbor, normalize_interface(neighbor_interface))
+            self.peers[near] = far
+            self.peers[far] = near
+
+    @classmethod
+    def from_dict(cls, data):
+        topology = cls()
+        for link in data.get("links", []):
+            topology.add_link(link["device"], link["neighbor"],
+                              link.get("interface"), link.get("neighbor_interface"))
+        for device, neighbors in data.get("adjacency", {}).items():
+            for neighbor in neighbors:
+                topology.add_link(device, neighbor)
+        return topology
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as topology_file:
+            return cls.from_dict(json.load(topology_file))
+
+
+class Incident:
+    """One group of correlated events."""
+
+    __slots__ = ("incident_id", "first_seen", "last_seen", "events", "event_types",
+                 "devices", "interfaces", "root", "merged")
+
+    def __init__(self, incident_id: str, now: float):
+        self.incident_id = incident_id
+        self.first_seen = now
+        self.last_seen = now
+        self.events = 0
+        self.event_types = {}
+        self.devices = set()
+        self.interfaces = set()  # (device, normalized interface)
+        self.root = None         # (priority, time, event_type, device, interface)
+        self.merged = 0          # Other incidents folded into this one
+
+    def add(self, event_type, device, interface_key, interface, now):
+        self.events += 1
+        self.last_seen = now
+        self.event_types[event_type] = self.event_types.get(event_type, 0) + 1
+        self.devices.add(device)
+        if interface_key is not None:
+            self.interfaces.add(interface_key)
+        candidate = (ROOT_CAUSE_PRIORITY.get(event_type, DEFAULT_PRIORITY), now, event_type, device, interface)
+        if self.root is None or candidate[:2] < self.root[:2]:
+            self.root = candidate
+
+    def absorb(self, other):
+        self.first_seen = min(self.first_seen, other.first_seen)
+        self.last_seen = max(self.last_seen, other.last_seen)
+        self.events += other.events
+        for event_type, count in other.event_types.items():
+            self.event_types[event_type] = self.event_types.get(event_type, 0) + count
+        self.devices |= other.devices
+        self.interfaces |= other.interfaces
+        if other.root[:2] < self.root[:2]:
+            self.root = other.root
+        self.merged += other.merged + 1
+
+    def summary(self):
+        """Short form returned with each alert."""
+        _priority, _when, event_type, device, interface = self.root
+        return {
+            "incident_id": self.incident_id,
+            "events": self.events,
+            "devices": len(self.devices),
+            "root_cause": {"event_type": event_type, "device": device, "interface": interface}
+        }
+
+    def as_dict(self, state: str = "open"):
+        _priority, when, event_type, device, interface = self.root
+        return {
+            "incident_id": self.incident_id,
+            "state": state,
+            "first_seen": timestamp_text(self.first_seen),
+            "last_seen": timestamp_text(self.last_seen),
+            "duration_seconds": round(self.last_seen - self.first_seen, 3),
+            "events": self.events,
+            "event_types": dict(self.event_types),
+            "device_count": len(self.devices),
+            "devices": sorted(self.devices)[:MEMBERS_SHOWN],
+            "interfaces": [f"{dev} {name}" for dev, name in sorted(self.interfaces)[:MEMBERS_SHOWN]],
+            "merged_incidents": self.merged,
+            "root_cause": {
+                "event_type": event_type,
+                "device": device,
+                "interface": interface,
+                "seen": timestamp_text(when)
+            }
+        }
+
+
+class CorrelationEngine:
+    """
+    Streaming correlator: feed it every alert, get back the incident it belongs to.
+
+    - window_seconds:     quiet time after which an incident closes
+    - storm_seconds:      without a device/link/topology match, also join a
+                          same-event_type incident active this recently
+                          (0 = off; useful when no topology file is loaded)
+    - max_open_incidents: hard cap; the least recently active incident is
+                          closed early when a new one would exceed it
+    - max_closed:         closed incidents kept for the API
+    """
+
+    def __init__(self, window_seconds: float = 60, topology: Topology = None, storm_seconds: float = 0,
+                 max_open_incidents: int = 10_000, max_closed: int = 1000, clock=time.time):
+        if window_seconds <= 0 or max_open_incidents < 1:
+            raise ValueError("window_seconds must be positive and max_open_incidents at least 1")
+        self.window_seconds = window_seconds
+        self.topology = topology or Topology()
+        self.storm_seconds = storm_seconds
+        self.max_open_incidents = max_open_incidents
+        self.clock = clock
+
+        self._open = OrderedDict()   # incident_id -> Incident, least recently active first
+        self._by_device = {}         # device -> Incident
+        self._by_interface = {}      # (device, interface) -> Incident
+        self._by_type = {}           # event_type -> {incident_id: Incident}
+        self._closed = deque(maxlen=max_closed)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+        self.events_seen = 0
+        self.incidents_opened = 0
+        self.incidents_merged = 0
+        self.incidents_closed = 0
+
+    def __len__(self):
+        return len(self._open)
+
+    def correlate(self, event_type: str, device: str, interface: str = None, now: float = None):
+        """
+        Add one event. Returns (incident, is_new) - is_new is True only for
+        the event that opened the incident, i.e. the one to page on.
+        """
+        now = self.clock() if now is None else now
+        interface_key = (device, normalize_interface(interface)) if interface else None
+        with self._lock:
+            self.events_seen += 1
+            self._expire(now)
+
+            matches = self._matches(event_type, device, interface_key, now)
+            if matches:
+                incident = matches[0]
+                for other in matches[1:]:
+                    self._merge(incident, other)
+                is_new = False
+            else:
+                incident = Incident(f"INC-{next(self._ids):06d}", now)
+                self._open[incident.incident_id] = incident
+                self.incidents_opened += 1
+                is_new = True
+                if len(self._open) > self.max_open_incidents:
+                    self._close(next(iter(self._open.values())))
+
+            incident.add(event_type, device, interface_key, interface, now)
+            self._open.move_to_end(incident.incident_id)
+            self._index(incident, event_type, device, interface_key)
+            return incident, is_new
+
+    def _matches(self, event_type, device, interface_key, now):
+        """Distinct open incidents this event belongs to, oldest first."""
+        found = []
+        candidates = [self._by_device.get(device)]
+        if interface_key is not None:
+            candidates.append(self._by_interface.get(interface_key))
+            peer = self.topology.peers.get(interface_key)
+            if peer is not None:
+                candidates.append(self._by_interface.get(peer))
+        for neighbor in self.topology.neighbors.get(device, ()):
+            candidates.append(self._by_device.get(neighbor))
+        for incident in candidates:
+            if incident is not None and incident not in found:
+                found.append(incident)
+
+        if not found and self.storm_seconds:
+            same_type = self._by_type.get(event_type)
+            if same_type:
+                latest = next(reversed(same_type.values()))
+                if now - latest.last_seen <= self.storm_seconds:
+                    found.append(latest)
+
+        found.sort(key=lambda incident: incident.first_seen)
+        return found
+
+    def _index(self, incident, event_type, device, interface_key):
+        self._by_device[device] = incident
+        if interface_key is not None:
+            self._by_interface[interface_key] = incident
+            peer = self.topology.peers.get(interface_key)
+            if peer is not None:
+                self._by_interface[peer] = incident
+        incidents = self._by_type.setdefault(event_type, {})
+        incidents.pop(incident.incident_id, None)
+        incidents[incident.incident_id] = incident  # Keep most recently active last
+
+    def _unindex(self, incident):
+        for device in incident.devices:
+            if self._by_device.get(device) is incident:
+                del self._by_device[device]
+        for interface_key in incident.interfaces:
+            for key in (interface_key, self.topology.peers.get(interface_key)):
+                if key is not None and self._by_interface.get(key) is incident:
+                    del self._by_interface[key]
+        for event_type in incident.event_types:
+            incidents = self._by_type.get(event_type)
+            if incidents is not None:
+                incidents.pop(incident.incident_id, None)
+                if not incidents:
+                    del self._by_type[event_type]
+
+    def _merge(self, survivor, other):
+        self._unindex(other)
+        del self._open[other.incident_id]
+        survivor.absorb(other)
+        for device in other.devices:
+            self._by_device[device] = survivor
+        for interface_key in other.interfaces:
+            self._by_interface[interface_key] = survivor
+            peer = self.topology.peers.get(interface_key)
+            if peer is not None:
+                self._by_interface[peer] = survivor
+        for event_type in other.event_types:
+            self._by_type.setdefault(event_type, {})[survivor.incident_id] = survivor
+        self.incidents_merged += 1
+
+    def _close(self, incident):
+        self._unindex(incident)
+        del self._open[incident.incident_id]
+        self._closed.append(incident.as_dict("closed"))
+        self.incidents_closed += 1
+
+    def _expire(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._open:
+            oldest = next(iter(self._open.values()))
+            if oldest.last_seen > cutoff:
+                break
+            self._close(oldest)
+
+    def incidents(self, state: str = "open", device: str = None, event_type: str = None, limit: int = 100):
+        """Open or recently closed incidents, newest activity first, optionally filtered."""
+        with self._lock:
+            self._expire(self.clock())
+            if state == "closed":
+                records = reversed(self._closed)
+                if device is not None:
+                    records = (record for record in records if device in record["devices"])
+                if event_type is not None:
+                    records = (record for record in records if event_type in record["event_types"])
+                return list(itertools.islice(records, limit))
+
+            if device is not None:
+                incident = self._by_device.get(device)
+                candidates = [incident] if incident is not None else []
+            elif event_type is not None:
+                candidates = reversed(list(self._by_type.get(event_type, {}).values()))
+            else:
+                candidates = reversed(self._open.values())
+            results = []
+            for incident in candidates:
+                if event_type is not None and event_type not in incident.event_types:
+                    continue
+                results.append(incident.as_dict())
+                if len(results) >= limit:
+                    break
+            return results
+
+    def get(self, incident_id: str):
+        with self._lock:
+            incident = self._open.get(incident_id)
+            if incident is not None:
+                return incident.as_dict()
+            for record in self._closed:
+                if record["incident_id"] == incident_id:
+                    return record
+        return None
+
+    def stats(self):
+        return {
+            "open_incidents": len(self._open),
+            "closed_incidents_kept": len(self._closed),
+            "window_seconds": self.window_seconds,
+            "storm_seconds": self.storm_seconds,
+            "topology_devices": len(self.topology),
+            "topology_links": len(self.topology.peers) // 2,
+            "indexed_devices": len(self._by_device),
+            "indexed_interfaces": len(self._by_interface),
+            "events_seen": self.events_seen,
+            "incidents_opened": self.incidents_opened,
+            "incidents_merged": self.incidents_merged,
+            "incidents_closed": self.incidents_closed
+        }
+
+
+if __name__ == "__main__":
+    import random
+    import tracemalloc
+
+    # A three-tier network: 20 core, 400 distribution, 8000 access switches
+    rng = random.Random(11)
+    topology = Topology()
+    cores = [f"core-{n:02d}" for n in range(20)]
+    distribution = [f"dist-{n:03d}" for n in range(400)]
+    access = [f"access-{n:04d}" for n in range(8000)]
+    for number, device in enumerate(distribution):
+        topology.add_link(cores[number % len(cores)], device, f"Te1/0/{number // len(cores) + 1}", "Te1/1/1")
+    for number, device in enumerate(access):
+        topology.add_link(distribution[number % len(distribution)], device,
+                          f"Gi1/0/{number // len(distribution) + 1}", "Gi1/1/1")
+
+    # Outages: every 0.25s a distribution uplink fails, and for the next second
+    # its access switches report errors, CPU spikes and interface changes
+    behind = {device: [] for device in distribution}
+    for number, device in enumerate(access):
+        behind[distribution[number % len(distribution)]].append(device)
+    events = []
+    outages = 0
+    while len(events) < 1_000_000:
+        started_at = 1_700_000_000.0 + outages * 0.25
+        dist = distribution[outages % len(distribution)]
+        events.append((started_at, "interface_change", dist, "Te1/1/1"))
+        for _ in range(rng.randint(20, 60)):
+            events.append((started_at + rng.random(), rng.choice(["error_detected", "high_cpu", "interface_change"]),
+                           rng.choice(behind[dist]), "Gi1/1/1"))
+        outages += 1
+    events.sort()
+
+    def run(engine):
+        for when, event_type, device, interface in events:
+            engine.correlate(event_type, device, interface, when)
+
+    engine = CorrelationEngine(window_seconds=2, topology=topology)
+    started = time.perf_counter()
+    run(engine)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    measured = CorrelationEngine(window_seconds=2, topology=topology)
+    run(measured)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = engine.stats()
+    print("🔗 Alert Correlation Benchmark")
+    print("=" * 50)
+    print(f"Topology:       {len(topology):,} devices, {stats['topology_links']:,} links")
+    print(f"Events:         {len(events):,}")
+    print(f"Throughput:     {len(events) / elapsed:,.0f} events/sec ({elapsed / len(events) * 1e6:.2f} µs/event)")
+    print(f"Outages:        {outages:,}")
+    print(f"Incidents:      {stats['incidents_opened']:,} opened, {stats['incidents_merged']:,} merged "
+          f"({len(events) / max(1, stats['incidents_opened'] - stats['incidents_merged']):,.0f} events per incident)")
+    print(f"Memory:         {current / 1024 / 1024:.1f} MiB held, {peak / 1024 / 1024:.1f} MiB peak")
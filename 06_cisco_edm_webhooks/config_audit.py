@@ -0,0 +1,251 @@
+"""
+Section 06: Configuration Change Audit Store
+
+Every /config-change alert ends up as one row in a SQLite database:
+
+    config_changes(id, received, device, changed_by, command, event_time, syslog_message)
+
+- WAL journal mode: readers never block the writer and the writer never
+  blocks readers, so audit queries can run during an alert storm
+- record() only puts the row on a queue; one background thread drains it and
+  inserts everything waiting in a single transaction (group commit), so
+  the request handlers never wait for disk
+- indexes on (device, received) and (changed_by, received) answer "changes on
+  device X between T1 and T2" with one index range scan - the cost depends on
+  the rows returned, not on how many million rows the table holds
+
+synchronous=NORMAL is used with WAL: a committed change survives a server
+crash; only an OS crash or power loss can lose the last few transactions.
+
+Run this file directly for an insert / query benchmark:
+    python config_audit.py --rows 1000000
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS config_changes (
+    id INTEGER PRIMARY KEY,
+    received REAL NOT NULL,
+    device TEXT NOT NULL,
+    changed_by TEXT,
+    command TEXT,
+    event_time TEXT,
+    syslog_message TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_config_changes_device_received ON config_changes (device, received);
+CREATE INDEX IF NOT EXISTS idx_config_changes_user_received ON config_changes (changed_by, received);
+"""
+INSERT = ("INSERT INTO config_changes (received, device, changed_by, command, event_time, syslog_message) "
+          "VALUES (?, ?, ?, ?, ?, ?)")
+COLUMNS = ("id", "received", "device", "changed_by", "command", "event_time", "syslog_message")
+
+_STOP = object()
+
+
+class ConfigAuditStore:
+    """
+    SQLite (WAL) audit trail with a background group-commit writer.
+
+    - batch_size:  most rows inserted per transaction
+    - max_pending: rows allowed to wait for the writer; record() returns
+                   False (and counts the row as dropped) beyond that rather
+                   than stall the request
+    """
+
+    def __init__(self, path, batch_size: int = 1000, max_pending: int = 100_000, clock=time.time):
+        self.path = str(path)
+        self.batch_size = batch_size
+        self.clock = clock
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._writer = None
+        self._readers = threading.local()
+
+        self.rows_recorded = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.transactions = 0
+        self.largest_batch = 0
+        self.write_errors = 0
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @property
+    def running(self):
+        return self._writer is not None
+
+    def start(self):
+        """Create the schema and start the writer thread."""
+        if self.running:
+            return
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+        self._writer = threading.Thread(target=self._write_loop, name="config-audit-writer", daemon=True)
+        self._writer.start()
+
+    def close(self):
+        """Write everything still queued, then stop the writer."""
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._writer = None
+
+    def record(self, device: str, changed_by: str = None, command: str = None,
+               event_time: str = None, syslog_message: str = None, received: float = None):
+        """Queue one change for the writer. Never blocks; False means the row was dropped."""
+        row = (self.clock() if received is None else received, device, changed_by, command,
+               event_time, syslog_message)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.rows_dropped += 1
+            return False
+        self.rows_recorded += 1
+        return True
+
+    def flush(self):
+        """Block until every row queued so far is committed."""
+        self._queue.join()
+
+    def _write_loop(self):
+        connection = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            # Whatever piled up while the last transaction ran goes into this one
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [row for row in batch if row is not _STOP]
+            try:
+                if rows:
+                    with connection:
+                        connection.executemany(INSERT, rows)
+                    self.rows_written += len(rows)
+                    self.transactions += 1
+                    self.largest_batch = max(self.largest_batch, len(rows))
+            except sqlite3.Error:
+                self.write_errors += 1
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(rows) != len(batch):
+                break
+        connection.close()
+
+    def _reader(self):
+        # sqlite3 connections are cheap to keep; one per request thread
+        connection = getattr(self._readers, "connection", None)
+        if connection is None:
+            connection = self._readers.connection = self._connect()
+        return connection
+
+    def query(self, device: str = None, changed_by: str = None, start: float = None, end: float = None,
+              limit: int = 100):
+        """
+        Changes for one device or one user (or both), newest first, optionally
+        between start and end (epoch seconds, inclusive).
+        """
+        if device is None and changed_by is None:
+            raise ValueError("query needs a device or a changed_by user")
+        column, value = ("device", device) if device is not None else ("changed_by", changed_by)
+        conditions = [f"{column} = ?"]
+        parameters = [value]
+        if start is not None:
+            conditions.append("received >= ?")
+            parameters.append(start)
+        if end is not None:
+            conditions.append("received <= ?")
+            parameters.append(end)
+        if device is not None and changed_by is not None:
+            conditions.append("changed_by = ?")
+            parameters.append(changed_by)
+        parameters.append(limit)
+
+        sql = (f"SELECT {', '.join(COLUMNS)} FROM config_changes WHERE {' AND '.join(conditions)} "
+               f"ORDER BY received DESC, id DESC LIMIT ?")
+        rows = self._reader().execute(sql, parameters).fetchall()
+        results = []
+        for row in rows:
+            change = dict(zip(COLUMNS, row))
+            change["received"] = datetime.fromtimestamp(change["received"], timezone.utc).isoformat()
+            results.append(change)
+        return results
+
+    def stats(self):
+        return {
+            "database": self.path,
+            "running": self.running,
+            "pending_rows": self._queue.qsize(),
+            "rows_recorded": self.rows_recorded,
+            "rows_written": self.rows_written,
+            "rows_dropped": self.rows_dropped,
+            "transactions": self.transactions,
+            "largest_batch": self.largest_batch,
+            "write_errors": self.write_errors
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import random
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Benchmark the config change audit store")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--devices", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(4)
+    users = [f"netops{n}" for n in range(50)]
+    base = 1_700_000_000.0
+    with tempfile.TemporaryDirectory() as directory:
+        store = ConfigAuditStore(os.path.join(directory, "audit.db"), max_pending=args.rows)
+        store.start()
+
+        calls = []
+        started = time.perf_counter()
+        for number in range(args.rows):
+            call_started = time.perf_counter()
+            store.record(f"switch-{rng.randrange(args.devices):05d}", rng.choice(users),
+                         f"interface GigabitEthernet1/0/{number % 48 + 1}", None,
+                         "%PARSER-5-CFGLOG_LOGGEDCMD: ...", received=base + number * 0.01)
+            calls.append(time.perf_counter() - call_started)
+        queued = time.perf_counter() - started
+        calls.sort()
+        store.flush()
+        committed = time.perf_counter() - started
+
+        span = args.rows * 0.01
+        timings = []
+        for _ in range(200):
+            device = f"switch-{rng.randrange(args.devices):05d}"
+            window_start = base + rng.random() * span * 0.9
+            query_started = time.perf_counter()
+            store.query(device=device, start=window_start, end=window_start + span * 0.1)
+            timings.append(time.perf_counter() - query_started)
+        timings.sort()
+        stats = store.stats()
+        store.close()
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+    print("🗄️  Config Audit Store Benchmark")
+    print("=" * 50)
+    print(f"Rows:              {args.rows:,} across {args.devices:,} devices")
+    print(f"record() calls:    {args.rows / queued:,.0f}/sec "
+          f"(p50 {calls[len(calls) // 2] * 1e6:.1f} µs, p99 {calls[int(len(calls) * 0.99)] * 1e6:.1f} µs)")
+    print(f"Committed:         {args.rows / committed:,.0f} rows/sec in {stats['transactions']:,} transactions "
+          f"(largest batch {stats['largest_batch']:,})")
+    print(f"Device+range query: p50 {timings[100] * 1e3:.2f} ms   p99 {timings[197] * 1e3:.2f} ms")
+    print(f"Database size:     {size / 1024 / 1024:.1f} MiB")
@@ -0,0 +1,207 @@
+"""
+Section 06: Per-Device CPU / Memory Time Series
+
+Keeps the last N samples of a metric for every device in fixed-size,
+array-backed ring buffers, so handle_cpu_alert and handle_memory_alert can
+look at the trend and not just one reading.
+
+Each RingSeries holds two preallocated arrays (values, timestamps) plus a
+sorted copy of the values - no dict or object per sample, and memory per
+device stops growing once the buffer is full. Rolling aggregates stay current
+on every append:
+- mean   from a running sum
+- min / max / p95 read straight from the sorted copy
+- trend  from two exponentially weighted moving averages (fast minus slow)
+
+Run this file directly for a memory / query-speed benchmark:
+    python device_timeseries.py
+"""
+
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+
+
+class RingSeries:
+    """Fixed-capacity ring buffer of (timestamp, value) with rolling aggregates."""
+
+    __slots__ = ("capacity", "values", "timestamps", "sorted_values", "head", "count",
+                 "total", "fast_average", "slow_average", "updates")
+
+    FAST_WEIGHT = 0.5
+    SLOW_WEIGHT = 0.1
+
+    def __init__(self, capacity: int = 120):
+        if capacity < 2:
+            raise ValueError("capacity must be at least 2")
+        self.capacity = capacity
+        self.values = array("d", bytes(8 * capacity))
+        self.timestamps = array("d", bytes(8 * capacity))
+        self.sorted_values = array("d")
+        self.head = 0  # Next slot to write
+        self.count = 0
+        self.total = 0.0
+        self.fast_average = 0.0
+        self.slow_average = 0.0
+        self.updates = 0
+
+    def append(self, value: float, timestamp: float):
+        if self.count == self.capacity:
+            evicted = self.values[self.head]
+            self.total -= evicted
+            del self.sorted_values[bisect_left(self.sorted_values, evicted)]
+        else:
+            self.count += 1
+
+        self.values[self.head] = value
+        self.timestamps[self.head] = timestamp
+        self.head = (self.head + 1) % self.capacity
+        self.total += value
+        insort(self.sorted_values, value)
+
+        if self.updates == 0:
+            self.fast_average = self.slow_average = value
+        else:
+            self.fast_average += self.FAST_WEIGHT * (value - self.fast_average)
+            self.slow_average += self.SLOW_WEIGHT * (value - self.slow_average)
+        self.updates += 1
+
+        # Re-sum now and then so floating point drift in the running total cannot build up
+        if self.updates % (self.capacity * 64) == 0:
+            self.total = sum(self.sorted_values)
+
+    @property
+    def latest(self):
+        return self.values[(self.head - 1) % self.capacity] if self.count else None
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def trend(self):
+        """Positive when recent samples run above the longer-term average."""
+        return self.fast_average - self.slow_average if self.count else 0.0
+
+    def percentile(self, fraction: float):
+        if not self.count:
+            return None
+        return self.sorted_values[min(self.count - 1, int(fraction * self.count))]
+
+    def samples(self):
+        """(timestamp, value) pairs, oldest first."""
+        start = (self.head - self.count) % self.capacity
+        return [
+            (self.timestamps[(start + offset) % self.capacity], self.values[(start + offset) % self.capacity])
+            for offset in range(self.count)
+        ]
+
+    def summary(self):
+        if not self.count:
+            return {"samples": 0}
+        return {
+            "samples": self.count,
+            "window_capacity": self.capacity,
+            "latest": self.latest,
+            "min": self.sorted_values[0],
+            "max": self.sorted_values[-1],
+            "mean": round(self.mean, 2),
+            "p95": self.percentile(0.95),
+            "trend": round(self.trend, 2),
+            "first_sample": self.timestamps[(self.head - self.count) % self.capacity],
+            "last_sample": self.timestamps[(self.head - 1) % self.capacity]
+        }
+
+
+class DeviceMetricStore:
+    """device name -> metric name -> RingSeries, shared by the alert handlers."""
+
+    def __init__(self, capacity: int = 120, clock=time.time):
+        self.capacity = capacity
+        self.clock = clock
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._series)
+
+    def record(self, device: str, metric: str, value: float, timestamp: float = None):
+        """
+        Append one sample and return the updated rolling summary. NaN or
+        infinity would poison the running sum and the sorted window, so
+        they raise ValueError.
+        """
+        if not math.isfinite(value):
+            raise ValueError(f"{metric} reading must be a finite number, got {value}")
+        timestamp = self.clock() if timestamp is None else timestamp
+        with self._lock:
+            metrics = self._series.get(device)
+            if metrics is None:
+                metrics = self._series[device] = {}
+            series = metrics.get(metric)
+            if series is None:
+                series = metrics[metric] = RingSeries(self.capacity)
+            series.append(value, timestamp)
+            return series.summary()
+
+    def get(self, device: str, metric: str):
+        """The series for (device, metric), or None if nothing was recorded yet."""
+        return self._series.get(device, {}).get(metric)
+
+    def snapshot(self, device: str, metric: str, include_samples: bool = False):
+        """Summary (and optionally raw samples) copied out under the lock."""
+        with self._lock:
+            series = self.get(device, metric)
+            if series is None:
+                return None
+            result = series.summary()
+            if include_samples:
+                result["sample_values"] = series.samples()
+            return result
+
+
+if __name__ == "__main__":
+    import random
+    import tracemalloc
+
+    devices = 20_000
+    capacity = 120
+    rng = random.Random(3)
+
+    now = 1_700_000_000.0
+    readings = [rng.uniform(5, 100) for _ in range(4096)]
+
+    def fill(store):
+        for sample in range(capacity):
+            for device in range(devices):
+                value = readings[(sample * devices + device) % len(readings)]
+                store.record(f"switch-{device:05d}", "cpu", value, now + sample * 60)
+
+    store = DeviceMetricStore(capacity=capacity)
+    started = time.perf_counter()
+    fill(store)
+    append_seconds = time.perf_counter() - started
+
+    # Second pass with tracemalloc on, just to measure memory
+    tracemalloc.start()
+    measured = DeviceMetricStore(capacity=capacity)
+    fill(measured)
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    queries = 100_000
+    names = [f"switch-{rng.randrange(devices):05d}" for _ in range(queries)]
+    started = time.perf_counter()
+    for name in names:
+        store.snapshot(name, "cpu")
+    query_seconds = time.perf_counter() - started
+
+    appends = devices * capacity
+    print("📈 Device Time Series Benchmark")
+    print("=" * 50)
+    print(f"Devices:           {devices:,} x {capacity} CPU samples")
+    print(f"Append cost:       {append_seconds / appends * 1e6:.2f} µs per sample")
+    print(f"Memory:            {current / 1024 / 1024:.1f} MiB ({current / devices:,.0f} bytes per device)")
+    print(f"Summary query:     {query_seconds / queries * 1e6:.2f} µs")
@@ -0,0 +1,220 @@
+"""
+Section 06: EDM Webhook Benchmark
+
+- Throughput of the one-POST-per-alert routes vs the /edm/batch NDJSON endpoint
+- p50/p99 acknowledgement latency under a burst, inline vs async (202) ingest
+
+The FastAPI app is driven in-process through httpx's ASGI transport,
+so no server or network is needed. The benchmark measures ingest, not
+admission control: the per-device /error-alert rate limit and the
+idempotency cache are off unless EDM_ERROR_RATE / EDM_IDEMPOTENCY_TTL_SECONDS
+are set. Any 429 (rate limited) or 503 (shed) answers are
+counted and reported rather than treated as failures.
+
+Run: python edm_benchmark.py --events 5000 --batch-size 500 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter
+
+import httpx
+
+# 5000 alerts from 50 devices is ~17 error alerts per device per pass - more than the
+# default burst of 20 allows over the passes below. Set before the app is imported
+os.environ.setdefault("EDM_ERROR_RATE", "0")
+# Every pass resends the same alerts: with the idempotency cache on, the inline burst
+# would time cached replays instead of the handlers
+os.environ.setdefault("EDM_IDEMPOTENCY_TTL_SECONDS", "0")
+
+from edm_queue import AsyncIngestMiddleware, IngestQueue
+from edm_webhook_server import ALERT_ROUTE_HANDLERS, app
+
+# Route used by each EDM applet (see edm_configurations.md)
+ALERT_ROUTES = {
+    "interface_change": "/interface-alert",
+    "high_cpu": "/cpu-alert",
+    "low_memory": "/memory-alert",
+    "config_change": "/config-change",
+    "error_detected": "/error-alert",
+    "health_check": "/health-check",
+}
+
+
+def build_alert(event_type: str, device: str, sequence: int):
+    """Build a payload shaped like the one the matching EDM applet sends."""
+    timestamp = f"2024-03-{(sequence % 28) + 1:02d}T10:{sequence % 60:02d}:00"
+    if event_type == "interface_change":
+        state = "down" if sequence % 2 else "up"
+        interface = f"GigabitEthernet1/0/{sequence % 48 + 1}"
+        return {
+            "event_type": event_type,
+            "device": device,
+            "interface": interface,
+            "timestamp": timestamp,
+            "raw_message": f"%LINK-3-UPDOWN: Interface {interface}, changed state to {state}"
+        }
+    if event_type == "high_cpu":
+        return {
+            "event_type": event_type,
+            "device": device,
+            "cpu_percent": str(80 + sequence % 20),
+            "timestamp": timestamp,
+            "threshold": "80"
+        }
+    if event_type == "low_memory":
+        return {
+            "event_type": event_type,
+            "device": device,
+            "memory_free_percent": str(5 + sequence % 15),
+            "timestamp": timestamp
+        }
+    if event_type == "config_change":
+        return {
+            "event_type": event_type,
+            "device": device,
+            "timestamp": timestamp,
+            "syslog_message": "%PARSER-5-CFGLOG_LOGGEDCMD: User:admin  logged command:interface Gi1/0/1"
+        }
+    if event_type == "error_detected":
+        return {
+            "event_type": event_type,
+            "device": device,
+            "timestamp": timestamp,
+            "error_message": "%PLATFORM-2-ERROR: Fan tray failure detected",
+            "severity": "high"
+        }
+    return {
+        "event_type": "health_check",
+        "device": device,
+        "timestamp": timestamp,
+        "status": "periodic_check",
+        "frequency": "every_4_hours"
+    }
+
+
+def build_alerts(count: int, devices: int = 50, seed: int = 42):
+    """Build a reproducible mix of alerts spread across many devices."""
+    rng = random.Random(seed)
+    event_types = list(ALERT_ROUTES)
+    return [
+        build_alert(rng.choice(event_types), f"switch-{rng.randrange(devices):03d}", sequence)
+        for sequence in range(count)
+    ]
+
+
+REFUSED_STATUSES = (429, 503)  # Rate limited / shed by admission control or a full queue
+
+
+def count_status(statuses: Counter, response: httpx.Response):
+    """Count one answer; anything other than success or a refusal is an error."""
+    statuses[response.status_code] += 1
+    if response.status_code not in (200, 202, *REFUSED_STATUSES):
+        raise RuntimeError(f"Unexpected status {response.status_code}: {response.text}")
+
+
+def describe_statuses(statuses: Counter):
+    return ", ".join(f"{count} x {status}" for status, count in sorted(statuses.items()))
+
+
+async def run_single_posts(client: httpx.AsyncClient, alerts):
+    """Send every alert as its own POST to its applet route; returns (seconds, status counts)."""
+    statuses = Counter()
+    started = time.perf_counter()
+    for alert in alerts:
+        response = await client.post(ALERT_ROUTES[alert["event_type"]], json=alert)
+        count_status(statuses, response)
+    return time.perf_counter() - started, statuses
+
+
+async def run_batches(client: httpx.AsyncClient, alerts, batch_size: int):
+    """Send alerts as NDJSON bodies of batch_size lines to /edm/batch."""
+    started = time.perf_counter()
+    for start in range(0, len(alerts), batch_size):
+        body = "\n".join(json.dumps(alert) for alert in alerts[start:start + batch_size])
+        response = await client.post(
+            "/edm/batch",
+            content=body,
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        response.raise_for_status()
+        if response.json()["failed"]:
+            raise RuntimeError(f"Batch reported failures: {response.json()}")
+    return time.perf_counter() - started
+
+
+async def run_burst(client: httpx.AsyncClient, alerts, concurrency: int):
+    """
+    Fire alerts with up to `concurrency` requests in flight; returns the
+    sorted ack latencies in ms and the status counts.
+    """
+    latencies = []
+    statuses = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(alert):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post(ALERT_ROUTES[alert["event_type"]], json=alert)
+            latencies.append((time.perf_counter() - started) * 1000)
+            count_status(statuses, response)
+
+    await asyncio.gather(*(post(alert) for alert in alerts))
+    return sorted(latencies), statuses
+
+
+def percentile(sorted_values, fraction: float):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def main(events: int, batch_size: int, concurrency: int):
+    alerts = build_alerts(events)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://edm.test") as client:
+        single_seconds, single_statuses = await run_single_posts(client, alerts)
+        batch_seconds = await run_batches(client, alerts, batch_size)
+        inline_latencies, inline_statuses = await run_burst(client, alerts, concurrency)
+
+    # Same app wrapped in the async ingest middleware (EDM_ASYNC_INGEST=1 mode)
+    queue = IngestQueue(maxsize=events, workers=4)
+    await queue.start()
+    async_app = AsyncIngestMiddleware(app, queue=queue, routes=ALERT_ROUTE_HANDLERS)
+    transport = httpx.ASGITransport(app=async_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://edm.test") as client:
+        async_latencies, async_statuses = await run_burst(client, alerts, concurrency)
+    await queue.stop()
+
+    single_rate = events / single_seconds
+    batch_rate = events / batch_seconds
+    print("⚡ EDM Ingest Benchmark")
+    print("=" * 50)
+    print(f"Alerts:              {events}")
+    print(f"Batch size:          {batch_size}")
+    print(f"One POST per alert:  {single_rate:10.0f} events/sec ({single_seconds:.2f}s)")
+    print(f"/edm/batch (NDJSON): {batch_rate:10.0f} events/sec ({batch_seconds:.2f}s)")
+    print(f"Speedup:             {batch_rate / single_rate:10.1f}x")
+    print()
+    print(f"Burst ack latency ({concurrency} in flight):")
+    print(f"  Inline processing: p50 {percentile(inline_latencies, 0.50):8.2f} ms   "
+          f"p99 {percentile(inline_latencies, 0.99):8.2f} ms")
+    print(f"  Async 202 ingest:  p50 {percentile(async_latencies, 0.50):8.2f} ms   "
+          f"p99 {percentile(async_latencies, 0.99):8.2f} ms")
+    print(f"  Async queue:       {queue.processed} processed, {queue.dropped + queue.rejected} dropped/rejected")
+    print()
+    print("Answers by HTTP status (429 = rate limited, 503 = shed):")
+    print(f"  One POST per alert: {describe_statuses(single_statuses)}")
+    print(f"  Inline burst:       {describe_statuses(inline_statuses)}")
+    print(f"  Async burst:        {describe_statuses(async_statuses)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark EDM alert ingest")
+    parser.add_argument("--events", type=int, default=5000, help="number of alerts to send")
+    parser.add_argument("--batch-size", type=int, default=500, help="alerts per /edm/batch request")
+    parser.add_argument("--concurrency", type=int, default=200, help="requests in flight during the burst test")
+    args = parser.parse_args()
+    asyncio.run(main(args.events, args.batch_size, args.concurrency))
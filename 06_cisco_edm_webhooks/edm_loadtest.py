@@ -0,0 +1,422 @@
+"""
+Section 06: EDM Load Test Suite
+
+Replays realistic EDM applet traffic (see edm_configurations.md) against the
+webhook server and records how each endpoint holds up:
+
+- throughput, p50 / p99 / p99.9 latency and error count per scenario
+- server RSS before and after each scenario (memory growth per endpoint)
+- results saved as JSON, and compared against an earlier run to flag regressions
+
+Two targets:
+- inprocess: the FastAPI app driven through httpx's ASGI transport (no sockets)
+- uvicorn:   a real uvicorn server started on a local port
+
+Requests are sent open-loop at --rate per second: every request has a
+scheduled send time and its latency is measured from that time, so a server
+that falls behind shows up as higher latency instead of a slower sender.
+--rate 0 sends as fast as --concurrency allows.
+
+Bodies use the applets' single-quote format ({'device':'sw1',...}) by default.
+
+Run:
+    python edm_loadtest.py --target inprocess --requests 2000 --rate 500
+    python edm_loadtest.py --target uvicorn --compare benchmark_results/<earlier run>.json
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+from edm_payload import edm_encode
+
+SECTION_DIR = Path(__file__).resolve().parent
+DEFAULT_RESULTS_DIR = SECTION_DIR / "benchmark_results"
+
+ERROR_MESSAGES = [
+    "%PLATFORM-2-ERROR: Fan tray 1 failure detected",
+    "%SYS-2-MALLOCFAIL: Memory allocation of 65536 bytes failed",
+    "%PLATFORM_ENV-1-FAN: Faulty fan detected in slot 2",
+    "%SYS-3-CPUHOG: Task is running for (2000)msecs, more than (2000)msecs",
+    "%ILPOWER-3-CONTROLLER_ERR: Controller error, Controller number 0",
+]
+CONFIG_COMMANDS = [
+    "interface GigabitEthernet1/0/{n}",
+    "description uplink-{n}",
+    "switchport access vlan {n}",
+    "no shutdown",
+    "ip route 10.{n}.0.0 255.255.0.0 192.0.2.1",
+]
+
+
+def event_time(sequence: int):
+    """$_event_pub_time style timestamp."""
+    return f"Mar  1 10:{sequence // 60 % 60:02d}:{sequence % 60:02d}.{sequence % 1000:03d}"
+
+
+# --- Payload builders: one per applet in edm_configurations.md -------------------
+
+def test_webhook_payload(rng, sequence, devices):
+    return {"event": "manual_test", "device": f"switch-{rng.randrange(devices):03d}",
+            "message": "EDM webhook test successful"}
+
+
+def interface_flap_payload(rng, sequence, devices):
+    # A handful of bad ports bouncing: each port alternates down/up
+    port = sequence % 16
+    interface = f"GigabitEthernet1/0/{port + 1}"
+    state = "down" if (sequence // 16) % 2 == 0 else "up"
+    return {
+        "event_type": "interface_change",
+        "device": f"switch-{port % max(1, devices // 10):03d}",
+        "interface": interface,
+        "timestamp": event_time(sequence),
+        "raw_message": f"%LINK-3-UPDOWN: Interface {interface}, changed state to {state}"
+    }
+
+
+def cpu_snmp_payload(rng, sequence, devices):
+    return {"event_type": "high_cpu", "device": f"switch-{rng.randrange(devices):03d}",
+            "cpu_percent": str(rng.randint(81, 100)), "timestamp": event_time(sequence), "threshold": "80"}
+
+
+def memory_snmp_payload(rng, sequence, devices):
+    return {"event_type": "low_memory", "device": f"switch-{rng.randrange(devices):03d}",
+            "memory_free_percent": str(rng.randint(2, 19)), "timestamp": event_time(sequence)}
+
+
+def config_change_payload(rng, sequence, devices):
+    command = rng.choice(CONFIG_COMMANDS).format(n=rng.randrange(1, 48))
+    return {
+        "event_type": "config_change",
+        "device": f"switch-{rng.randrange(devices):03d}",
+        "timestamp": event_time(sequence),
+        "syslog_message": f"%PARSER-5-CFGLOG_LOGGEDCMD: User:netops{rng.randrange(5)}  logged command:{command}"
+    }
+
+
+def error_storm_payload(rng, sequence, devices):
+    # Every device reporting at once - the worst case for the error route
+    return {"event_type": "error_detected", "device": f"switch-{sequence % devices:03d}",
+            "timestamp": event_time(sequence), "error_message": rng.choice(ERROR_MESSAGES), "severity": "high"}
+
+
+def business_hours_payload(rng, sequence, devices):
+    return {"event_type": "business_hours_alert", "device": f"switch-{rng.randrange(devices):03d}",
+            "hour": str(rng.randint(9, 17)), "message": "Critical alert during business hours"}
+
+
+def health_check_payload(rng, sequence, devices):
+    return {"event_type": "health_check", "device": f"switch-{sequence % devices:03d}",
+            "timestamp": event_time(sequence), "status": "periodic_check", "frequency": "every_4_hours"}
+
+
+# scenario name -> (route, payload builder)
+SCENARIOS = {
+    "test_webhook": ("/test-webhook", test_webhook_payload),
+    "interface_flap": ("/interface-alert", interface_flap_payload),
+    "cpu_snmp": ("/cpu-alert", cpu_snmp_payload),
+    "memory_snmp": ("/memory-alert", memory_snmp_payload),
+    "config_change": ("/config-change", config_change_payload),
+    "error_storm": ("/error-alert", error_storm_payload),
+    "business_hours": ("/business-alert", business_hours_payload),
+    "health_check": ("/health-check", health_check_payload),
+}
+
+
+def build_bodies(scenario: str, count: int, devices: int = 200, body_format: str = "edm", seed: int = 7):
+    """Pre-encode every request body so payload building is not part of the measurement."""
+    _route, builder = SCENARIOS[scenario]
+    rng = random.Random(f"{seed}-{scenario}")
+    encode = edm_encode if body_format == "edm" else json.dumps
+    return [encode(builder(rng, sequence, devices)).encode() for sequence in range(count)]
+
+
+# --- Memory -------------------------------------------------------------------
+
+def process_rss_kb(pid: int):
+    """Resident memory of one process in KiB (Linux /proc), or None when unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def process_tree_rss_kb(pid: int):
+    """RSS of a process plus its direct children (uvicorn --workers N)."""
+    total = process_rss_kb(pid)
+    if total is None:
+        return None
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                # Field 4 is the parent pid; the name in field 2 may contain spaces
+                parent = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        if parent == pid:
+            total += process_rss_kb(int(entry)) or 0
+    return total
+
+
+# --- Driving traffic ------------------------------------------------------------
+
+def percentile(sorted_values, fraction: float):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def drive(client: httpx.AsyncClient, route: str, bodies, rate: float, concurrency: int):
+    """
+    Send every body to route. Returns (elapsed seconds, sorted latencies in ms, status counts).
+
+    With rate > 0 request n is due at start + n / rate and its latency runs
+    from that moment; with rate 0 latency runs from when it got a slot.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = {}
+    headers = {"Content-Type": "application/json"}
+
+    async def send(body, due):
+        async with semaphore:
+            sent = due if due is not None else time.perf_counter()
+            try:
+                response = await client.post(route, content=body, headers=headers)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+        latencies.append((time.perf_counter() - sent) * 1000)
+        statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    tasks = []
+    for number, body in enumerate(bodies):
+        due = None
+        if rate > 0:
+            due = started + number / rate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(body, due)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return elapsed, latencies, statuses
+
+
+async def run_scenarios(client, scenarios, args, rss):
+    """Warm up, then drive each scenario in turn; rss() reads the server's memory."""
+    results = {}
+    for scenario in scenarios:
+        route, _builder = SCENARIOS[scenario]
+        bodies = build_bodies(scenario, args.requests + args.warmup, args.devices, args.format)
+        await drive(client, route, bodies[:args.warmup], 0, args.concurrency)
+
+        gc.collect()
+        rss_before = rss()
+        elapsed, latencies, statuses = await drive(client, route, bodies[args.warmup:], args.rate, args.concurrency)
+        gc.collect()
+        rss_after = rss()
+
+        errors = sum(count for status, count in statuses.items() if not (isinstance(status, int) and status < 400))
+        results[scenario] = {
+            "route": route,
+            "requests": len(latencies),
+            "target_rate": args.rate,
+            "throughput_rps": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 0.50), 3),
+            "p99_ms": round(percentile(latencies, 0.99), 3),
+            "p999_ms": round(percentile(latencies, 0.999), 3),
+            "max_ms": round(latencies[-1], 3),
+            "errors": errors,
+            "status_counts": {str(status): count for status, count in statuses.items()},
+            "rss_before_kb": rss_before,
+            "rss_after_kb": rss_after,
+            "rss_growth_kb": rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        }
+        print_result(scenario, results[scenario])
+    return results
+
+
+async def run_inprocess(scenarios, args):
+    from edm_webhook_server import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://edm.test") as client:
+            return await run_scenarios(client, scenarios, args, lambda: process_rss_kb(os.getpid()))
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+async def run_uvicorn(scenarios, args):
+    port = args.port or free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", args.app, "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=SECTION_DIR,
+    )
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as client:
+            await wait_until_ready(client, server)
+            return await run_scenarios(client, scenarios, args, lambda: process_tree_rss_kb(server.pid))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+async def wait_until_ready(client, server, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+        try:
+            if (await client.get("/webhook-status")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn did not start in time")
+
+
+# --- Results ----------------------------------------------------------------------
+
+def print_result(scenario, result):
+    growth = result["rss_growth_kb"]
+    print(f"  {scenario:<15} {result['throughput_rps']:>9.0f} req/s   "
+          f"p50 {result['p50_ms']:7.2f}   p99 {result['p99_ms']:7.2f}   p99.9 {result['p999_ms']:7.2f} ms   "
+          f"errors {result['errors']:<4} RSS {'+' if growth and growth > 0 else ''}{growth if growth is not None else '?'} KiB")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SECTION_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def save_results(results, args):
+    run = {
+        "started": args.started,
+        "target": args.target,
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "requests": args.requests, "rate": args.rate, "concurrency": args.concurrency,
+            "devices": args.devices, "format": args.format, "workers": args.workers
+        },
+        "scenarios": results
+    }
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / f"loadtest-{args.target}-{args.started.replace(':', '').replace('-', '')}.json"
+    path.write_text(json.dumps(run, indent=2))
+    return run, path
+
+
+def relative_change(after, before):
+    """after / before - 1, or None when the saved run measured 0 (nothing to compare with)."""
+    return after / before - 1 if before else None
+
+
+def format_change(change):
+    return f"{change:+7.1%}" if change is not None else "    n/a"
+
+
+def compare_results(run, baseline_path, tolerance: float):
+    """Print scenario-by-scenario changes against a saved run; returns the list of regressions."""
+    saved = json.loads(Path(baseline_path).read_text())
+    baseline = saved["scenarios"]
+    results = run["scenarios"]
+    regressions = []
+    print(f"\nCompared with {baseline_path} (tolerance {tolerance:.0%}):")
+    if saved.get("target") != run["target"] or saved.get("settings") != run["settings"]:
+        print("  ⚠️  Target or settings differ from that run - the numbers are not directly comparable")
+    for scenario, result in results.items():
+        before = baseline.get(scenario)
+        if before is None:
+            continue
+        throughput_change = relative_change(result["throughput_rps"], before["throughput_rps"])
+        p99_change = relative_change(result["p99_ms"], before["p99_ms"])
+        flags = []
+        if throughput_change is not None and throughput_change < -tolerance:
+            flags.append("throughput")
+        if p99_change is not None and p99_change > tolerance:
+            flags.append("p99")
+        if flags:
+            regressions.append((scenario, flags))
+        print(f"  {scenario:<15} throughput {format_change(throughput_change)}   p99 {format_change(p99_change)}"
+              f"   {'⚠️  REGRESSION: ' + ', '.join(flags) if flags else 'ok'}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay EDM applet traffic against the webhook server")
+    parser.add_argument("--target", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=100, help="unmeasured requests sent first")
+    parser.add_argument("--rate", type=float, default=500, help="requests/sec per scenario (0 = as fast as possible)")
+    parser.add_argument("--concurrency", type=int, default=64, help="maximum requests in flight")
+    parser.add_argument("--devices", type=int, default=200, help="distinct device names in the traffic")
+    parser.add_argument("--format", choices=["edm", "json"], default="edm", help="request body format")
+    parser.add_argument("--app", default="edm_webhook_server:app", help="uvicorn app to start (uvicorn target)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (uvicorn target)")
+    parser.add_argument("--port", type=int, default=0, help="port for uvicorn (default: any free port)")
+    parser.add_argument("--output-dir", default=str(DEFAULT_RESULTS_DIR), help="where to write the JSON results")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown before flagging")
+    args = parser.parse_args()
+    args.started = datetime.now().isoformat(timespec="seconds")
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    print("🏋️  EDM Load Test")
+    print("=" * 50)
+    print(f"Target: {args.target}   rate: {args.rate or 'max'} req/s   concurrency: {args.concurrency}   "
+          f"requests: {args.requests} per scenario")
+    runner = run_inprocess if args.target == "inprocess" else run_uvicorn
+    results = asyncio.run(runner(scenarios, args))
+
+    run, path = save_results(results, args)
+    print(f"\n💾 Results saved to {path}")
+
+    if args.compare:
+        regressions = compare_results(run, args.compare, args.tolerance)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
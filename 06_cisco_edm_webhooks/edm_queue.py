@@ -0,0 +1,203 @@
+"""
+Section 06: Asynchronous EDM Ingest Queue
+
+Lets the webhook server acknowledge an EDM applet right away (HTTP 202) and
+process the alert afterwards. The HTTP layer only validates the JSON body and
+puts it on a bounded in-process queue; a pool of asyncio workers runs the
+normal handle_* functions in the background, each on a worker thread so the
+event loop is never blocked by a handler.
+
+Why? The applet's `cli command "curl ..."` blocks until the server answers.
+During an alert storm, a fast acknowledgement keeps the devices responsive.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import time
+
+from edm_payload import decode_payload
+
+OVERFLOW_POLICIES = ("reject", "drop_oldest", "drop_newest")
+
+
+class IngestQueue:
+    """
+    Bounded queue of (event_id, handler, data) items plus the workers that drain it.
+
+    Overflow policies when the queue is full:
+    - reject:      refuse the new event (the client gets HTTP 503 and can retry)
+    - drop_oldest: evict the oldest queued event to make room for the new one
+    - drop_newest: acknowledge the new event but discard it
+    """
+
+    def __init__(self, maxsize: int = 10000, workers: int = 4, overflow: str = "reject"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got '{overflow}'")
+        if maxsize < 1 or workers < 1:
+            raise ValueError("maxsize and workers must both be at least 1")
+
+        self.maxsize = maxsize
+        self.worker_count = workers
+        self.overflow = overflow
+        self._queue = None
+        self._workers = []
+        self._ids = itertools.count(1)
+        self._id_prefix = f"EDM-{os.getpid()}"
+
+        self.accepted = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.max_wait_ms = 0.0
+
+    @property
+    def running(self):
+        return bool(self._workers)
+
+    @property
+    def depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(self, handler, data: dict):
+        """
+        Queue one event for background processing.
+
+        Returns (accepted, event_id). accepted is False only under the
+        'reject' policy when the queue is full.
+        """
+        if self._queue is None:
+            raise RuntimeError("IngestQueue.start() must be awaited before submitting events")
+
+        event_id = f"{self._id_prefix}-{next(self._ids)}"
+        item = (event_id, handler, data, time.perf_counter())
+
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            if self.overflow == "reject":
+                self.rejected += 1
+                return False, event_id
+            if self.overflow == "drop_newest":
+                self.dropped += 1
+                return True, event_id
+            # drop_oldest: make room by discarding the event that waited longest
+            self._queue.get_nowait()
+            self._queue.task_done()
+            self.dropped += 1
+            self._queue.put_nowait(item)
+
+        self.accepted += 1
+        return True, event_id
+
+    async def start(self):
+        """Create the queue and launch the worker pool (call from a running event loop)."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"edm-ingest-worker-{number}")
+            for number in range(self.worker_count)
+        ]
+
+    async def stop(self, drain: bool = True):
+        """Stop the workers, optionally finishing everything still queued first."""
+        if not self.running:
+            return
+        if drain:
+            await self._queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _worker(self):
+        while True:
+            event_id, handler, data, enqueued = await self._queue.get()
+            self.max_wait_ms = max(self.max_wait_ms, (time.perf_counter() - enqueued) * 1000)
+            try:
+                # The handlers are synchronous (inline mode runs them in FastAPI's
+                # threadpool too); on a thread the loop stays free to acknowledge
+                await asyncio.to_thread(handler, data)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+            finally:
+                self._queue.task_done()
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "queue_depth": self.depth,
+            "queue_capacity": self.maxsize,
+            "workers": self.worker_count,
+            "overflow_policy": self.overflow,
+            "accepted": self.accepted,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "max_queue_wait_ms": round(self.max_wait_ms, 3)
+        }
+
+
+class AsyncIngestMiddleware:
+    """
+    ASGI middleware that answers POSTs to the alert routes with 202 Accepted.
+
+    routes maps a URL path (e.g. "/cpu-alert") to the handler that should
+    process it. Requests to any other path pass straight through to the app.
+    """
+
+    def __init__(self, app, queue: IngestQueue, routes: dict):
+        self.app = app
+        self.queue = queue
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+        handler = self.routes.get(scope["path"])
+        if handler is None:
+            return await self.app(scope, receive, send)
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        try:
+            data = decode_payload(body)
+        except ValueError as e:
+            return await self._respond(send, 422, {"detail": f"Invalid JSON body: {e}"})
+        if not isinstance(data, dict):
+            return await self._respond(send, 422, {"detail": "Alert body must be a JSON object"})
+
+        accepted, event_id = self.queue.submit(handler, data)
+        if not accepted:
+            return await self._respond(
+                send, 503,
+                {"status": "rejected", "detail": "Ingest queue full - retry later", "queue_depth": self.queue.depth},
+                extra_headers=[(b"retry-after", b"1")]
+            )
+
+        return await self._respond(send, 202, {
+            "status": "accepted",
+            "event_id": event_id,
+            "queue_depth": self.queue.depth
+        })
+
+    @staticmethod
+    async def _respond(send, status: int, payload: dict, extra_headers=()):
+        body = json.dumps(payload).encode()
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *extra_headers
+        ]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
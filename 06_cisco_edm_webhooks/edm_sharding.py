@@ -0,0 +1,472 @@
+"""
+Section 06: Device-Affinity Sharding
+
+`uvicorn --workers 4` hands each request to whichever worker accepts it, so
+one device's alerts are spread over four processes. Everything the server
+keeps per device - flap incidents, CPU/memory windows, heartbeats, rate limit
+buckets, idempotency keys - then only sees part of the picture.
+
+This module is a small front end that fixes the routing instead:
+
+    EDM applets --HTTP--> front (uvicorn edm_sharding:app)
+                            | crc32(device) % shards
+                            v
+                  Unix socket per shard, many requests in flight
+                            v
+              shard worker processes, each running edm_webhook_server:app
+
+- the front only reads the body far enough to find `device`; it never runs
+  a handler, so one front process keeps several workers busy
+- a device always lands on the same worker, so per-device state is complete
+- /edm/batch is split by device, sent to the shards in parallel and the
+  results merged back into the original line order
+- GET /devices/{name}/... goes to that device's shard; other GETs go to
+  shard 0 unless ?shard=N picks another one. Every response carries an
+  X-EDM-Shard header, and GET /shards shows the workers
+- /metrics is summed over all shards (METRICS_MULTIPROC_DIR is set up
+  automatically); each shard writes its own event log subdirectory
+
+Frames on the Unix socket are length-prefixed: a fixed struct header, then
+method, path, query, headers and body as raw bytes - no JSON on the hot path.
+
+Run:
+    EDM_SHARDS=4 uvicorn edm_sharding:app --host 0.0.0.0 --port 8000
+    python edm_sharding.py --shards 1,2,4     # scaling + consistency benchmark
+"""
+
+import asyncio
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+
+from edm_payload import decode_payload
+
+# request id, method, path, query, headers and body lengths
+REQUEST = struct.Struct("!IBHHII")
+# request id, status, headers and body lengths
+RESPONSE = struct.Struct("!IHII")
+
+SHARD_HEADER = b"x-edm-shard"
+
+
+def shard_of(device, shards: int):
+    """Stable shard number for a device - the same in every process and on every run."""
+    return zlib.crc32(str(device).encode()) % shards
+
+
+def encode_headers(headers):
+    return b"\r\n".join(name + b": " + value for name, value in headers)
+
+
+def decode_headers(block: bytes):
+    if not block:
+        return []
+    return [tuple(line.split(b": ", 1)) for line in block.split(b"\r\n")]
+
+
+# --- Shard worker -------------------------------------------------------------------
+
+async def call_app(app, method: str, path: str, query: bytes, headers, body: bytes):
+    """Run one request through an ASGI app in this process. Returns (status, headers, body)."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query, "root_path": "", "headers": headers,
+        "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 0), "state": {}
+    }
+    body_sent = False
+    never = asyncio.Event()
+    status = 500
+    response_headers = []
+    chunks = []
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await never.wait()  # The "client" stays connected until the response is done
+
+    async def send(message):
+        nonlocal status, response_headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers = list(message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, response_headers, b"".join(chunks)
+
+
+async def serve_shard(app, socket_path: str):
+    """Serve framed requests on socket_path until the front disconnects."""
+    done = asyncio.Event()
+
+    async def handle(reader, writer):
+        tasks = set()
+
+        async def run(request_id, method, path, query, headers, body):
+            try:
+                status, response_headers, response_body = await call_app(app, method, path, query, headers, body)
+            except Exception as exc:
+                status, response_headers = 500, [(b"content-type", b"application/json")]
+                response_body = json.dumps({"detail": f"Shard error: {exc}"}).encode()
+            block = encode_headers(response_headers)
+            writer.write(RESPONSE.pack(request_id, status, len(block), len(response_body)) + block + response_body)
+
+        try:
+            while True:
+                request_id, *lengths = REQUEST.unpack(await reader.readexactly(REQUEST.size))
+                payload = await reader.readexactly(sum(lengths))
+                parts = []
+                offset = 0
+                for length in lengths:
+                    parts.append(payload[offset:offset + length])
+                    offset += length
+                method, path, query, headers, body = parts
+                task = asyncio.create_task(run(request_id, method.decode(), path.decode(), query,
+                                               decode_headers(headers), body))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        writer.close()
+        done.set()
+
+    lifespan = getattr(getattr(app, "router", None), "lifespan_context", None)
+    if lifespan is not None:
+        async with lifespan(app):
+            server = await asyncio.start_unix_server(handle, socket_path)
+            async with server:
+                await done.wait()
+    else:
+        server = await asyncio.start_unix_server(handle, socket_path)
+        async with server:
+            await done.wait()
+
+
+def run_shard(index: int, socket_path: str, app_path: str, environment: dict):
+    """Entry point of a shard worker process."""
+    os.environ.update(environment)
+    os.environ["EDM_SHARD_INDEX"] = str(index)
+    module_name, _, attribute = app_path.partition(":")
+    app = getattr(importlib.import_module(module_name), attribute or "app")
+    asyncio.run(serve_shard(app, socket_path))
+
+
+# --- Front ------------------------------------------------------------------------------
+
+class ShardConnection:
+    """The front's end of one Unix socket: many requests in flight, matched by id."""
+
+    def __init__(self, index: int, socket_path: str, process):
+        self.index = index
+        self.socket_path = socket_path
+        self.process = process
+        self.reader = None
+        self.writer = None
+        self.reader_task = None
+        self.pending = {}  # request id -> Future
+        self.requests = 0
+        self.failed = 0
+
+    async def connect(self, timeout: float = 60.0):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            try:
+                self.reader, self.writer = await asyncio.open_unix_connection(self.socket_path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if not self.process.is_alive() or asyncio.get_running_loop().time() > deadline:
+                    raise RuntimeError(f"Shard {self.index} did not start (exit code {self.process.exitcode})")
+                await asyncio.sleep(0.05)
+        self.reader_task = asyncio.create_task(self._read_responses())
+
+    async def _read_responses(self):
+        try:
+            while True:
+                request_id, status, headers_length, body_length = RESPONSE.unpack(
+                    await self.reader.readexactly(RESPONSE.size))
+                payload = await self.reader.readexactly(headers_length + body_length)
+                future = self.pending.pop(request_id, None)
+                if future is not None and not future.done():
+                    future.set_result((status, decode_headers(payload[:headers_length]), payload[headers_length:]))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        # Worker gone: fail whatever was still waiting for it
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError(f"Shard {self.index} closed its connection"))
+        self.pending.clear()
+
+    async def request(self, request_id: int, method: str, path: str, query: bytes, headers, body: bytes):
+        if self.reader_task is None or self.reader_task.done():
+            raise ConnectionError(f"Shard {self.index} is not running")
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        method, path, block = method.encode(), path.encode(), encode_headers(headers)
+        self.writer.write(REQUEST.pack(request_id, len(method), len(path), len(query), len(block), len(body))
+                          + method + path + query + block + body)
+        await self.writer.drain()
+        self.requests += 1
+        return await future
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.reader_task is not None:
+            await asyncio.gather(self.reader_task, return_exceptions=True)
+
+    def stats(self):
+        return {
+            "shard": self.index,
+            "pid": self.process.pid,
+            "alive": self.process.is_alive(),
+            "requests": self.requests,
+            "in_flight": len(self.pending),
+            "failed": self.failed
+        }
+
+
+class ShardedFront:
+    """
+    ASGI app that forwards every request to the shard owning its device.
+    Its lifespan starts and stops the shard worker processes.
+    """
+
+    def __init__(self, shards: int = None, app_path: str = "edm_webhook_server:app"):
+        self.shards = shards or os.cpu_count() or 1
+        self.app_path = app_path
+        self.connections = []
+        self._ids = itertools.count(1)
+        self._temp_dirs = []
+
+    async def startup(self):
+        socket_dir = tempfile.mkdtemp(prefix="edm-shards-")
+        self._temp_dirs.append(socket_dir)
+        environment = {}
+        if not os.getenv("METRICS_MULTIPROC_DIR"):
+            environment["METRICS_MULTIPROC_DIR"] = os.path.join(socket_dir, "metrics")
+            os.makedirs(environment["METRICS_MULTIPROC_DIR"])
+
+        context = multiprocessing.get_context("spawn")
+        for index in range(self.shards):
+            shard_environment = dict(environment)
+            if os.getenv("EDM_EVENT_LOG_DIR"):
+                # One writer per directory: each shard keeps its own segments
+                shard_environment["EDM_EVENT_LOG_DIR"] = os.path.join(os.environ["EDM_EVENT_LOG_DIR"], f"shard-{index}")
+            socket_path = os.path.join(socket_dir, f"shard-{index}.sock")
+            process = context.Process(target=run_shard, name=f"edm-shard-{index}",
+                                      args=(index, socket_path, self.app_path, shard_environment), daemon=True)
+            process.start()
+            self.connections.append(ShardConnection(index, socket_path, process))
+        await asyncio.gather(*(connection.connect() for connection in self.connections))
+
+    async def shutdown(self):
+        # Closing the socket tells each worker to finish in-flight requests and run its shutdown
+        for connection in self.connections:
+            await connection.close()
+        for connection in self.connections:
+            await asyncio.to_thread(connection.process.join, 30)
+            if connection.process.is_alive():
+                connection.process.terminate()
+        self.connections = []
+        for directory in self._temp_dirs:
+            shutil.rmtree(directory, ignore_errors=True)
+        self._temp_dirs = []
+
+    def route(self, method: str, path: str, query: bytes, body: bytes):
+        """Shard number for a request that is not a batch."""
+        if method == "POST":
+            try:
+                data = decode_payload(body)
+            except ValueError:
+                data = None
+            if isinstance(data, dict) and data.get("device") is not None:
+                return shard_of(data["device"], self.shards)
+        elif path.startswith("/devices/"):
+            return shard_of(path.split("/")[2], self.shards)
+        for parameter in query.split(b"&"):
+            name, _, value = parameter.partition(b"=")
+            if name == b"shard" and value.isdigit():
+                return int(value) % self.shards
+        return 0
+
+    async def forward(self, shard: int, method: str, path: str, query: bytes, headers, body: bytes):
+        connection = self.connections[shard]
+        try:
+            return await connection.request(next(self._ids), method, path, query, headers, body)
+        except ConnectionError as exc:
+            connection.failed += 1
+            return 503, [(b"content-type", b"application/json")], json.dumps({"detail": str(exc)}).encode()
+
+    async def forward_batch(self, query: bytes, headers, body: bytes):
+        """Split an NDJSON batch by device, run the pieces on their shards and merge the results."""
+        pieces = {}  # shard -> (original line numbers, lines)
+        for line_number, line in enumerate(body.split(b"\n"), start=1):
+            if not line.strip():
+                continue
+            try:
+                alert = decode_payload(line)
+                shard = shard_of(alert["device"], self.shards) if isinstance(alert, dict) and "device" in alert else 0
+            except ValueError:
+                shard = 0  # Shard 0 reports the bad line
+            numbers, lines = pieces.setdefault(shard, ([], []))
+            numbers.append(line_number)
+            lines.append(line)
+
+        responses = await asyncio.gather(*(
+            self.forward(shard, "POST", "/edm/batch", query, headers, b"\n".join(lines))
+            for shard, (_numbers, lines) in pieces.items()
+        ))
+        results = []
+        processing_ms = 0.0
+        for (numbers, _lines), (status, _headers, response_body) in zip(pieces.values(), responses):
+            if status != 200:
+                return status, _headers, response_body
+            piece = json.loads(response_body)
+            processing_ms = max(processing_ms, piece["processing_ms"])
+            for result in piece["results"]:
+                result["line"] = numbers[result["line"] - 1]
+                results.append(result)
+        results.sort(key=lambda result: result["line"])
+        processed = sum(1 for result in results if result["status"] == "processed")
+        rate_limited = sum(1 for result in results if result["status"] == "rate_limited")
+        merged = json.dumps({
+            "webhook_handler": "EDM Batch Processed",
+            "total_alerts": len(results),
+            "processed": processed,
+            "rate_limited": rate_limited,
+            "failed": len(results) - processed - rate_limited,
+            "processing_ms": processing_ms,
+            "shards_used": sorted(pieces),
+            "results": results
+        }).encode()
+        return 200, [(b"content-type", b"application/json")], merged
+
+    def stats(self):
+        return {"shards": self.shards, "app": self.app_path,
+                "workers": [connection.stats() for connection in self.connections]}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+
+        method, path, query = scope["method"], scope["path"], scope["query_string"]
+        if path == "/shards" and method == "GET":
+            return await respond(send, 200, [(b"content-type", b"application/json")],
+                                 json.dumps(self.stats()).encode(), None)
+
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+        headers = [(name, value) for name, value in scope["headers"] if name != b"content-length"]
+
+        if method == "POST" and path == "/edm/batch":
+            status, response_headers, response_body = await self.forward_batch(query, headers, body)
+            return await respond(send, status, response_headers, response_body, None)
+        shard = self.route(method, path, query, body)
+        status, response_headers, response_body = await self.forward(shard, method, path, query, headers, body)
+        await respond(send, status, response_headers, response_body, shard)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as exc:
+                    await send({"type": "lifespan.startup.failed", "message": str(exc)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+async def respond(send, status: int, headers, body: bytes, shard):
+    headers = [(name, value) for name, value in headers if name != b"content-length"]
+    headers.append((b"content-length", str(len(body)).encode()))
+    if shard is not None:
+        headers.append((SHARD_HEADER, str(shard).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+app = ShardedFront(
+    shards=int(os.getenv("EDM_SHARDS", "0")) or None,
+    app_path=os.getenv("EDM_SHARD_APP", "edm_webhook_server:app"),
+)
+
+
+if __name__ == "__main__":
+    import argparse
+    import subprocess
+    import sys
+
+    import httpx
+
+    from edm_loadtest import SECTION_DIR, build_bodies, drive, free_port, wait_until_ready
+
+    parser = argparse.ArgumentParser(description="Throughput and per-device consistency: shards vs uvicorn workers")
+    parser.add_argument("--shards", default="1,2,4", help="comma-separated process counts to try")
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--devices", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    bodies = build_bodies("cpu_snmp", args.requests, args.devices, "json")
+    sent_per_device = {}
+    for body in bodies:
+        device = json.loads(body)["device"]
+        sent_per_device[device] = sent_per_device.get(device, 0) + 1
+
+    async def measure(command, environment):
+        port = free_port()
+        server = subprocess.Popen([*command, "--port", str(port)], cwd=SECTION_DIR,
+                                  env={**os.environ, "EDM_AUDIT_DB": "", **environment})
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+                await wait_until_ready(client, server, timeout=60)
+                elapsed, _latencies, statuses = await drive(client, "/cpu-alert", bodies, 0, args.concurrency)
+                # Does each device's CPU window hold every reading it sent?
+                consistent = 0
+                for device, sent in sent_per_device.items():
+                    response = await client.get(f"/devices/{device}/cpu")
+                    if response.status_code == 200 and response.json()["samples"] == sent:
+                        consistent += 1
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+        errors = sum(count for status, count in statuses.items() if status != 200)
+        return len(bodies) / elapsed, errors, consistent
+
+    uvicorn = [sys.executable, "-m", "uvicorn", "--host", "127.0.0.1", "--log-level", "warning"]
+    print("🧩 Device-Affinity Sharding Benchmark")
+    print("=" * 60)
+    print(f"{args.requests:,} /cpu-alert requests from {args.devices} devices, {os.cpu_count()} CPU(s) available")
+    for count in (int(value) for value in args.shards.split(",")):
+        for label, command, environment in (
+            ("sharded", [*uvicorn, "edm_sharding:app"], {"EDM_SHARDS": str(count)}),
+            ("uvicorn --workers", [*uvicorn, "edm_webhook_server:app", "--workers", str(count)], {}),
+        ):
+            rps, errors, consistent = asyncio.run(measure(command, environment))
+            print(f"{count} x {label:<18} {rps:>7,.0f} req/s  errors {errors:<4} "
+                  f"devices with complete state {consistent}/{len(sent_per_device)}")
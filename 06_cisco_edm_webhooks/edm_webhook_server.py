@@ -1,46 +1,259 @@
 """
 Section 06: Cisco EDM Webhook Handler Server
 
-TODO: Create webhook endpoints that receive and process alerts from Cisco EDM applets!
+Webhook endpoints that receive and process alerts from Cisco EDM applets!
 This server completes the event-driven automation loop.
 
-Hint: EDM applets send JSON data - make sure your endpoints can handle the expected formats!
+Hint: EDM applets send {'key':'value'} bodies with single quotes - edm_payload.py
+decodes those as well as strict JSON.
 """
 
-# TODO: Import required modules for webhook handling
-# Hint: from fastapi import FastAPI, Request
-# TODO: Import any other modules (datetime, logging, etc.)
+import asyncio
+import json
+import math
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
 
-# TODO: Create your FastAPI application for EDM webhook handling
-# Hint: Add a title about EDM webhook processing
+from fastapi import FastAPI, HTTPException, Request, WebSocket
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
+from admission_control import CRITICAL, ERROR, INFORMATIONAL, INTERFACE, AdmissionController, AdmissionMiddleware
+from alert_correlation import CorrelationEngine, Topology
+from alert_stream import AlertBroadcaster, parse_filters
+from config_audit import ConfigAuditStore
+from device_timeseries import DeviceMetricStore
+from edm_payload import EDMPayloadRoute, decode_payload
+from edm_queue import AsyncIngestMiddleware, IngestQueue
+from edm_registry import EventRegistry, UnknownEventType, load_plugins
+from event_log import EventLog, EventLogMiddleware
+from event_store import EventStore
+from flap_suppression import FlapSuppressor
+from heartbeat_tracker import HeartbeatTracker, parse_frequency
+from idempotency import IdempotencyCache, IdempotencyMiddleware, SQLiteBacking, fingerprint
+from notifier import Notifier, load_destinations
+from prometheus_metrics import CONTENT_TYPE, EventMetrics, HTTPMetrics, MetricsMiddleware, MetricsRegistry
+from syslog_classifier import SyslogClassifier
+from syslog_receiver import SyslogReceiver
 
-# TODO: Create a basic test webhook endpoint for EDM testing
-# Hint: @app.post("/test-webhook")
+# event_type -> handler table; routes, /edm/events and /webhook-status are built from it
+registry = EventRegistry()
+
+# Opt-in async mode: acknowledge alerts with 202 and process them in the background
+# Example: EDM_ASYNC_INGEST=1 EDM_QUEUE_WORKERS=8 uvicorn edm_webhook_server:app
+ASYNC_INGEST = os.getenv("EDM_ASYNC_INGEST", "0") == "1"
+ingest_queue = IngestQueue(
+    maxsize=int(os.getenv("EDM_QUEUE_SIZE", "10000")),
+    workers=int(os.getenv("EDM_QUEUE_WORKERS", "4")),
+    overflow=os.getenv("EDM_QUEUE_OVERFLOW", "reject"),
+)
+
+# Collapse repeated UP/DOWN transitions of one port into a single incident
+flap_suppressor = FlapSuppressor(
+    ttl_seconds=float(os.getenv("EDM_FLAP_TTL_SECONDS", "300")),
+    max_entries=int(os.getenv("EDM_FLAP_MAX_INTERFACES", "100000")),
+)
+# Shared %FACILITY-SEVERITY-MNEMONIC classifier; EDM_SYSLOG_RULES points at a JSON rule file
+SYSLOG_RULES_FILE = os.getenv("EDM_SYSLOG_RULES")
+syslog_classifier = SyslogClassifier()
+if SYSLOG_RULES_FILE:
+    syslog_classifier.load_rules_file(SYSLOG_RULES_FILE)
+# Syslog severity level (0 = emergency ... 7 = debug) -> alert severity
+SYSLOG_SEVERITY_LEVELS = {0: "CRITICAL", 1: "CRITICAL", 2: "CRITICAL", 3: "HIGH", 4: "MEDIUM"}
+
+# Group alerts from related devices into one incident per root cause;
+# EDM_TOPOLOGY_FILE (JSON links / adjacency) lets it relate neighbouring devices
+TOPOLOGY_FILE = os.getenv("EDM_TOPOLOGY_FILE")
+correlator = CorrelationEngine(
+    window_seconds=float(os.getenv("EDM_CORRELATION_WINDOW_SECONDS", "60")),
+    topology=Topology.from_file(TOPOLOGY_FILE) if TOPOLOGY_FILE else None,
+    storm_seconds=float(os.getenv("EDM_CORRELATION_STORM_SECONDS", "0")),
+    max_open_incidents=int(os.getenv("EDM_CORRELATION_MAX_INCIDENTS", "10000")),
+)
+
+# Rolling window of the last N CPU / memory readings per device
+device_metrics = DeviceMetricStore(capacity=int(os.getenv("EDM_METRIC_WINDOW", "120")))
+TREND_MIN_SAMPLES = 5  # Readings needed before the window's mean is trusted
+
+# Expected /health-check heartbeats on a timer wheel; a device is missing once it is
+# EDM_HEARTBEAT_GRACE intervals overdue (the applet's 'frequency' sets its interval)
+heartbeats = HeartbeatTracker(
+    interval=float(os.getenv("EDM_HEARTBEAT_INTERVAL_SECONDS", str(4 * 3600))),
+    grace=float(os.getenv("EDM_HEARTBEAT_GRACE", "1.5")),
+    tick_seconds=float(os.getenv("EDM_HEARTBEAT_TICK_SECONDS", "10")),
+)
+
+# Durable webhook history: set EDM_EVENT_LOG_DIR to capture every alert body
+EVENT_LOG_DIR = os.getenv("EDM_EVENT_LOG_DIR")
+event_log = EventLog(
+    EVENT_LOG_DIR,
+    fsync=os.getenv("EDM_EVENT_LOG_FSYNC", "interval"),
+    fsync_interval=float(os.getenv("EDM_EVENT_LOG_FSYNC_INTERVAL", "1.0")),
+    max_segment_bytes=int(os.getenv("EDM_EVENT_LOG_SEGMENT_MB", "64")) * 1024 * 1024,
+    max_segment_seconds=float(os.getenv("EDM_EVENT_LOG_SEGMENT_SECONDS", "3600")),
+) if EVENT_LOG_DIR else None
+
+# SQLite (WAL) audit trail of every /config-change: set EDM_AUDIT_DB to a database file
+AUDIT_DB = os.getenv("EDM_AUDIT_DB")
+config_audit = ConfigAuditStore(AUDIT_DB) if AUDIT_DB else None
+
+# Error-alert storms: a per-device token bucket on /error-alert (EDM_ERROR_RATE=0
+# turns it off) and a cap on alerts handled at once, critical/interface first
+# (EDM_MAX_CONCURRENT_ALERTS=0 turns it off). Refused alerts are summarized per device
+admission = AdmissionController(
+    rate=float(os.getenv("EDM_ERROR_RATE", "1")),
+    burst=float(os.getenv("EDM_ERROR_BURST", "20")),
+    max_concurrent=int(os.getenv("EDM_MAX_CONCURRENT_ALERTS", "32")),
+    max_waiting=int(os.getenv("EDM_MAX_WAITING_ALERTS", "1000")),
+    max_wait_seconds=float(os.getenv("EDM_MAX_ALERT_WAIT_SECONDS", "5")),
+)
+
+# Answer curl retries with the first response instead of handling the alert twice;
+# EDM_IDEMPOTENCY_TTL_SECONDS=0 turns it off, EDM_IDEMPOTENCY_DB shares it between workers
+IDEMPOTENCY_TTL = float(os.getenv("EDM_IDEMPOTENCY_TTL_SECONDS", "3600"))
+IDEMPOTENCY_DB = os.getenv("EDM_IDEMPOTENCY_DB")
+idempotency = IdempotencyCache(
+    ttl_seconds=IDEMPOTENCY_TTL,
+    max_entries=int(os.getenv("EDM_IDEMPOTENCY_MAX_ENTRIES", "100000")),
+    backing=SQLiteBacking(IDEMPOTENCY_DB) if IDEMPOTENCY_DB else None,
+) if IDEMPOTENCY_TTL > 0 else None
+
+# Downstream webhooks (chat, paging, ticketing) for alerts that promise a notification:
+# EDM_NOTIFY_URLS=https://a,https://b or EDM_NOTIFY_CONFIG=destinations.json
+notifier = Notifier(
+    load_destinations(os.getenv("EDM_NOTIFY_URLS"), os.getenv("EDM_NOTIFY_CONFIG")),
+    batch_size=int(os.getenv("EDM_NOTIFY_BATCH_SIZE", "100")),
+    flush_interval=float(os.getenv("EDM_NOTIFY_FLUSH_SECONDS", "0.5")),
+    max_retries=int(os.getenv("EDM_NOTIFY_MAX_RETRIES", "5")),
+    dead_letter_path=os.getenv("EDM_NOTIFY_DEAD_LETTER"),
+)
+
+# Queryable history of every processed alert in compact columns (~24 bytes each);
+# past EDM_HISTORY_MAX_EVENTS the oldest tenth is spilled to EDM_HISTORY_SPILL_DIR (or dropped)
+event_store = EventStore(
+    max_events=int(os.getenv("EDM_HISTORY_MAX_EVENTS", "10000000")),
+    spill_dir=os.getenv("EDM_HISTORY_SPILL_DIR"),
+)
+registry.listeners.append(event_store.record)
+
+# Live feed of processed alerts for NOC dashboards at /stream (SSE) and /stream/ws;
+# each client buffers at most EDM_STREAM_BUFFER alerts before losing the oldest
+alert_stream = AlertBroadcaster(
+    buffer_size=int(os.getenv("EDM_STREAM_BUFFER", "256")),
+    max_subscribers=int(os.getenv("EDM_STREAM_MAX_CLIENTS", "10000")),
+)
+registry.listeners.append(alert_stream.publish)
+STREAM_KEEPALIVE_SECONDS = 15
+
+# Prometheus metrics at /metrics. With several uvicorn workers, point
+# METRICS_MULTIPROC_DIR at a shared directory so /metrics adds them all up
+metrics = MetricsRegistry(multiprocess_dir=os.getenv("METRICS_MULTIPROC_DIR"))
+http_metrics = HTTPMetrics(metrics)
+registry.observer = EventMetrics(metrics)
+metrics.gauge("edm_ingest_queue_depth", "Alerts waiting in the async ingest queue",
+              function=lambda: ingest_queue.depth)
+metrics.counter("edm_ingest_queue_events_total", "Async ingest queue events by outcome", ("outcome",),
+                function=lambda: {(outcome,): getattr(ingest_queue, outcome)
+                                  for outcome in ("accepted", "processed", "failed", "dropped", "rejected")})
+metrics.gauge("edm_open_incidents", "Correlated incidents currently open",
+              function=lambda: len(correlator))
+metrics.gauge("edm_flap_tracked_interfaces", "Interfaces with an open flap incident",
+              function=lambda: flap_suppressor.stats()["tracked_interfaces"])
+metrics.gauge("edm_heartbeat_missing_devices", "Devices overdue for a /health-check heartbeat",
+              function=lambda: heartbeats.stats()["missing_devices"])
+metrics.counter("edm_admission_total", "Alert admission decisions by outcome and priority",
+                ("outcome", "priority"), function=lambda: dict(admission.outcomes))
+metrics.gauge("edm_admission_waiting", "Alerts waiting for a handler slot",
+              function=lambda: admission.stats()["waiting"])
+metrics.gauge("edm_history_events", "Processed alerts held in the in-memory history",
+              function=lambda: len(event_store))
+metrics.gauge("edm_stream_subscribers", "Dashboards connected to the live alert stream",
+              function=lambda: len(alert_stream))
+metrics.counter("edm_stream_alerts_total", "Live alert stream frames by outcome", ("outcome",),
+                function=lambda: {("published",): alert_stream.published,
+                                  ("delivered",): alert_stream.deliveries,
+                                  ("dropped",): alert_stream.dropped})
+metrics.counter("edm_notifications_total", "Outbound notification events by destination and outcome",
+                ("destination", "outcome"),
+                function=lambda: {(destination.name, outcome): getattr(destination, outcome)
+                                  for destination in notifier.destinations
+                                  for outcome in ("delivered", "dead_lettered", "dropped")})
+if idempotency is not None:
+    metrics.counter("edm_idempotency_total", "Alert deliveries by idempotency outcome", ("outcome",),
+                    function=lambda: {(outcome,): getattr(idempotency, outcome)
+                                      for outcome in ("hits", "misses", "coalesced")})
+if config_audit is not None:
+    metrics.gauge("edm_config_audit_pending_rows", "Config changes waiting for the audit writer",
+                  function=lambda: config_audit.stats()["pending_rows"])
+if event_log is not None:
+    metrics.gauge("edm_event_log_pending_records", "Logged alerts not yet written to disk",
+                  function=lambda: event_log.stats()["pending_records"])
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers with the server and drain them on shutdown."""
+    metrics.start()
+    alert_stream.bind(asyncio.get_running_loop())
+    if config_audit is not None:
+        config_audit.start()
+    if event_log is not None:
+        event_log.start()
+    await notifier.start()
+    if ASYNC_INGEST or syslog_receiver is not None:
+        await ingest_queue.start()
+    if syslog_receiver is not None:
+        await syslog_receiver.start()
+    yield
+    if syslog_receiver is not None:
+        await syslog_receiver.stop()
+    await ingest_queue.stop()
+    await notifier.stop()
+    if event_log is not None:
+        event_log.close()
+    if config_audit is not None:
+        config_audit.close()
+    if idempotency is not None and idempotency.backing is not None:
+        idempotency.backing.close()
+    metrics.stop()
+
+
+app = FastAPI(
+    title="Cisco EDM Webhook Handler",
+    description="Receives and processes alerts sent by Cisco EDM applets",
+    version="1.0.0",
+    lifespan=lifespan,
+)
+# Route bodies accept strict JSON and the applets' {'key':'value'} dialect
+app.router.route_class = EDMPayloadRoute
+
+
+@registry.register("manual_test", path="/test-webhook", description="Manual EDM applet testing")
 def handle_test_webhook(webhook_data: dict):
     """
-    TODO: Handle test webhooks from EDM applets
+    Handle test webhooks from EDM applets
     
     This endpoint receives manual test triggers from your EDM_WEBHOOK_TEST applet.
     Use this to verify your EDM-to-webhook communication is working.
     """
     
-    # TODO: Process the test webhook data
     return {
         "webhook_handler": "EDM Test Webhook Received",
-        "received_data": "TODO: Return webhook_data", 
-        "device_source": "TODO: Extract device name from webhook_data",
+        "received_data": webhook_data,
+        "device_source": webhook_data.get("device", "unknown"),
         "event_type": "test_event",
         "status": "success",
         "message": "EDM webhook communication verified! 🎉"
     }
 
 
-# TODO: Create interface alert webhook handler
-# Hint: @app.post("/interface-alert")
+@registry.register("interface_change", path="/interface-alert",
+                   description="Interface status change notifications")
 def handle_interface_alert(interface_data: dict):
     """
-    TODO: Handle interface status change alerts from EDM
+    Handle interface status change alerts from EDM
     
     Expected data from INTERFACE_STATUS_WEBHOOK applet:
     {
@@ -54,18 +267,26 @@ def handle_interface_alert(interface_data: dict):
     Process the interface change and take appropriate action!
     """
     
-    # TODO: Extract interface information
-    device_name = "TODO: Get from interface_data"
-    interface_name = "TODO: Get from interface_data" 
-    event_timestamp = "TODO: Get from interface_data"
+    device_name = interface_data.get("device", "unknown")
+    interface_name = interface_data.get("interface", "unknown")
+    event_timestamp = interface_data.get("timestamp", "")
     
-    # TODO: Determine interface status from raw message
-    raw_message = interface_data.get("raw_message", "")
-    if "down" in raw_message.lower():
+    # Determine interface status from the %LINK-3-UPDOWN style syslog message
+    raw_message = str(interface_data.get("raw_message") or "")
+    syslog = syslog_classifier.classify(raw_message)
+    link_state = syslog.state if syslog is not None else None
+    if interface_name == "unknown" and syslog is not None and syslog.interface:
+        interface_name = syslog.interface
+    
+    if link_state == "down":
         interface_status = "DOWN"
         severity = "HIGH"
         action_needed = "Investigate interface failure immediately"
-    elif "up" in raw_message.lower():
+    elif link_state == "administratively down":
+        interface_status = "DOWN"
+        severity = "MEDIUM"
+        action_needed = "Interface shut down by an administrator - confirm the change was planned"
+    elif link_state == "up":
         interface_status = "UP" 
         severity = "INFO"
         action_needed = "Interface recovery - monitor for stability"
@@ -74,8 +295,24 @@ def handle_interface_alert(interface_data: dict):
         severity = "MEDIUM"
         action_needed = "Review interface status"
     
-    # TODO: Return processed alert information
-    return {
+    # Repeated transitions on the same port join the open incident instead
+    # of being treated as a fresh alert every time
+    incident, is_new_incident = flap_suppressor.record(device_name, interface_name, interface_status)
+    flapping = incident.transitions >= flap_suppressor.flap_threshold
+    if flapping:
+        severity = "HIGH"
+        action_needed = "Interface is flapping - check cabling, optics and the far end"
+    
+    correlation = correlate("interface_change", device_name,
+                            interface_name if interface_name != "unknown" else None)
+    if not is_new_incident:
+        next_steps = "Suppressed - folded into the open incident for this interface"
+    elif not correlation["new_incident"]:
+        next_steps = f"Suppressed - part of correlated incident {correlation['incident_id']}"
+    else:
+        next_steps = "Alert logged and team notified"
+    
+    result = {
         "webhook_handler": "Interface Alert Processed",
         "device": device_name,
         "interface": interface_name,
@@ -84,15 +321,43 @@ def handle_interface_alert(interface_data: dict):
         "timestamp": event_timestamp,
         "recommended_action": action_needed,
         "alert_processed": True,
-        "next_steps": "Alert logged and team notified"
+        "flapping": flapping,
+        "incident": incident.as_dict(flap_suppressor.flap_threshold),
+        "syslog": syslog.as_dict() if syslog is not None else None,
+        "correlation": correlation,
+        "next_steps": next_steps
     }
+    # Only the first alert of an incident goes out; the rest were suppressed above
+    result["notified"] = notifier.notify("interface_change", result) if next_steps.endswith("notified") else []
+    return result
+
+
+def correlate(event_type: str, device_name: str, interface_name: str = None):
+    """Attach an alert to its correlated incident. Only a new incident should page or open a ticket."""
+    incident, is_new = correlator.correlate(event_type, device_name, interface_name)
+    return {**incident.summary(), "new_incident": is_new}
+
 
+def metric_reading(value, field: str):
+    """An EDM reading ("85") as a float; HTTP 400 when it isn't a finite number."""
+    try:
+        reading = float(value)
+    except (TypeError, ValueError):
+        reading = None
+    if reading is None or not math.isfinite(reading):
+        raise HTTPException(status_code=400, detail=f"{field} must be a number, got {value!r}")
+    return reading
 
-# TODO: Create CPU alert webhook handler 
-# Hint: @app.post("/cpu-alert")
+
+def escalate(severity: str):
+    """Raise a severity one step (used when the trend makes things look worse)."""
+    return {"INFO": "MEDIUM", "MEDIUM": "HIGH", "HIGH": "CRITICAL"}.get(severity, severity)
+
+
+@registry.register("high_cpu", path="/cpu-alert", description="High CPU utilization alerts")
 def handle_cpu_alert(cpu_data: dict):
     """
-    TODO: Handle high CPU utilization alerts from EDM
+    Handle high CPU utilization alerts from EDM
     
     Expected data from CPU_HIGH_WEBHOOK applet:
     {
@@ -104,13 +369,13 @@ def handle_cpu_alert(cpu_data: dict):
     }
     """
     
-    # TODO: Extract CPU information
-    device_name = "TODO: Get from cpu_data"
-    cpu_percent = "TODO: Get from cpu_data"
+    device_name = cpu_data.get("device", "unknown")
+    cpu_percent = cpu_data.get("cpu_percent", "")
     threshold = cpu_data.get("threshold", "80")
     
-    # TODO: Determine severity based on CPU level
-    cpu_value = float(cpu_percent) if cpu_percent else 0
+    # Determine severity based on CPU level
+    cpu_value = metric_reading(cpu_percent, "cpu_percent") if cpu_percent else 0
+    cpu_trend = device_metrics.record(device_name, "cpu", cpu_value)
     
     if cpu_value >= 95:
         severity = "CRITICAL" 
@@ -122,6 +387,15 @@ def handle_cpu_alert(cpu_data: dict):
         severity = "MEDIUM"
         action = "Monitor CPU trends - consider preventive maintenance"
     
+    # Look past the single reading: sustained load or a sharp climb is worse
+    # than one spike at the same level
+    if cpu_trend["samples"] >= TREND_MIN_SAMPLES and cpu_trend["mean"] >= 85:
+        severity = escalate(severity)
+        action = f"Sustained high CPU (window mean {cpu_trend['mean']}%) - " + action
+    elif cpu_trend["trend"] >= 10:
+        severity = escalate(severity)
+        action = "CPU climbing quickly - " + action
+    
     return {
         "webhook_handler": "CPU Alert Processed",
         "device": device_name,
@@ -129,16 +403,17 @@ def handle_cpu_alert(cpu_data: dict):
         "threshold_exceeded": f"{threshold}%",
         "severity": severity,
         "recommended_action": action,
-        "alert_id": f"CPU-{device_name}-{cpu_percent}",
+        "cpu_trend": cpu_trend,
+        "correlation": correlate("high_cpu", device_name),
+        "alert_id": f"CPU-{device_name}-{fingerprint(device_name, cpu_data.get('timestamp'), cpu_percent)}",
         "status": "processed"
     }
 
 
-# TODO: Create memory alert webhook handler
-# Hint: @app.post("/memory-alert") 
+@registry.register("low_memory", path="/memory-alert", description="Low memory warnings")
 def handle_memory_alert(memory_data: dict):
     """
-    TODO: Handle low memory alerts from EDM
+    Handle low memory alerts from EDM
     
     Expected data from MEMORY_WARNING_WEBHOOK applet:
     {
@@ -149,84 +424,142 @@ def handle_memory_alert(memory_data: dict):
     }
     """
     
-    # TODO: Process memory alert data
-    device_name = "TODO: Get from memory_data"
+    device_name = memory_data.get("device", "unknown")
     memory_free = memory_data.get("memory_free_percent", "unknown")
     
-    # TODO: Determine appropriate response
+    # No reading in the alert is fine; a reading that isn't a number is a bad request
+    free_value = metric_reading(memory_free, "memory_free_percent") if "memory_free_percent" in memory_data else None
+    
+    severity = "MEDIUM"
+    memory_trend = None
+    if free_value is not None:
+        memory_trend = device_metrics.record(device_name, "memory_free", free_value)
+        if free_value <= 5:
+            severity = "CRITICAL"
+        elif free_value <= 10:
+            severity = "HIGH"
+        # Free memory draining steadily points at a leak, not a one-off spike
+        if memory_trend["trend"] <= -5 or (
+                memory_trend["samples"] >= TREND_MIN_SAMPLES and memory_trend["mean"] <= 10):
+            severity = escalate(severity)
+    
     return {
         "webhook_handler": "Memory Alert Processed", 
         "device": device_name,
         "memory_free": f"{memory_free}%",
+        "severity": severity,
+        "memory_trend": memory_trend,
+        "correlation": correlate("low_memory", device_name),
         "status": "low_memory_detected",
         "recommended_action": "Review memory-intensive processes and consider cleanup",
         "alert_processed": True
     }
 
 
-# TODO: Create configuration change webhook handler
-# Hint: @app.post("/config-change")
+@registry.register("config_change", path="/config-change",
+                   description="Configuration change audit logging")
 def handle_config_change(config_data: dict):
     """
-    TODO: Handle configuration change notifications from EDM
+    Handle configuration change notifications from EDM
     
     Log configuration changes for audit and compliance purposes.
     """
     
-    # TODO: Extract configuration change information
-    device_name = "TODO: Get from config_data"
+    device_name = config_data.get("device", "unknown")
     change_timestamp = config_data.get("timestamp", "unknown")
-    syslog_message = config_data.get("syslog_message", "")
+    syslog_message = str(config_data.get("syslog_message") or "")
     
-    return {
+    # %PARSER-5-CFGLOG_LOGGEDCMD carries who typed what
+    syslog = syslog_classifier.classify(syslog_message)
+    details = (syslog.details or {}) if syslog is not None else {}
+    changed_by = syslog.user if syslog is not None else None
+    command = details.get("command")
+    
+    # Queued for the background writer - the request never waits for the disk
+    logged = config_audit is not None and config_audit.record(
+        device_name, changed_by, command, change_timestamp, syslog_message)
+    
+    result = {
         "webhook_handler": "Configuration Change Logged",
         "device": device_name,
         "change_time": change_timestamp,
         "change_details": syslog_message,
-        "compliance_logged": True,
-        "audit_trail": "Configuration change recorded for compliance review"
+        "changed_by": changed_by,
+        "command": command,
+        "syslog": syslog.as_dict() if syslog is not None else None,
+        "compliance_logged": logged,
+        "audit_trail": (
+            "Configuration change recorded for compliance review" if logged
+            else "NOT recorded - audit store disabled or backlogged"
+        )
     }
+    # Only to destinations that list config_change, e.g. the Section 05 server's
+    # /device/cache/invalidate, so cached show output of this device is dropped
+    result["notified"] = notifier.notify("config_change", result, explicit=True)
+    return result
 
 
-# TODO: Create error pattern webhook handler
-# Hint: @app.post("/error-alert")
+@registry.register("error_detected", path="/error-alert", description="Critical error pattern detection")
 def handle_error_alert(error_data: dict):
     """
-    TODO: Handle critical error pattern alerts from EDM
+    Handle critical error pattern alerts from EDM
     
     Process error/critical/alert syslog messages caught by EDM pattern matching.
     """
     
-    # TODO: Process error alert
-    device_name = "TODO: Get from error_data"
-    error_message = error_data.get("error_message", "")
-    error_timestamp = error_data.get("timestamp", "")
+    device_name = error_data.get("device", "unknown")
+    error_message = str(error_data.get("error_message") or "")
+    error_timestamp = str(error_data.get("timestamp") or "")
     
-    return {
+    # Use the syslog severity level when the message carries a mnemonic tag
+    syslog = syslog_classifier.classify(error_message)
+    severity = "HIGH"
+    if syslog is not None:
+        severity = SYSLOG_SEVERITY_LEVELS.get(syslog.severity, "LOW")
+    
+    # One ticket per correlated incident, not one per device reporting it
+    correlation = correlate("error_detected", device_name, syslog.interface if syslog is not None else None)
+    new_incident = correlation["new_incident"]
+    
+    # Set by the admission middleware when earlier alerts from this device were rate limited
+    suppressed_alerts = error_data.get("suppressed_alerts")
+    
+    result = {
         "webhook_handler": "Error Alert Processed",
         "device": device_name,
         "error_detected": error_message,
         "timestamp": error_timestamp,
-        "severity": "HIGH",
-        "action_taken": "Error logged and escalated to operations team",
-        "ticket_created": "AUTO-ERROR-" + device_name + "-" + error_timestamp[:10]
+        "severity": severity,
+        "syslog": syslog.as_dict() if syslog is not None else None,
+        "correlation": correlation,
+        "action_taken": (
+            "Error logged and escalated to operations team" if new_incident
+            else f"Added to open incident {correlation['incident_id']}"
+        ),
+        # Same alert -> same ticket ID, different errors on the same day -> different IDs
+        "ticket_created": (
+            f"AUTO-ERROR-{device_name}-{error_timestamp[:10]}-"
+            f"{fingerprint(device_name, error_timestamp, error_message)}" if new_incident else None
+        ),
+        "suppressed_alerts": suppressed_alerts
     }
+    result["notified"] = notifier.notify("error_detected", result) if new_incident else []
+    return result
 
 
-# TODO: Create business hours alert handler
-# Hint: @app.post("/business-alert")
+@registry.register("business_hours_alert", path="/business-alert",
+                   description="Business hours priority alerts")
 def handle_business_hours_alert(business_data: dict):
     """
-    TODO: Handle alerts that only trigger during business hours
+    Handle alerts that only trigger during business hours
     
     These are high-priority alerts that need immediate attention during work hours.
     """
     
-    # TODO: Process business hours alert
-    device_name = "TODO: Get from business_data"
+    device_name = business_data.get("device", "unknown")
     alert_hour = business_data.get("hour", "unknown")
     
-    return {
+    result = {
         "webhook_handler": "Business Hours Alert",
         "device": device_name, 
         "alert_time": f"{alert_hour}:xx (business hours)",
@@ -234,74 +567,679 @@ def handle_business_hours_alert(business_data: dict):
         "escalation": "Alert sent to on-call engineer",
         "business_impact": "Potential impact during business hours - immediate response required"
     }
+    result["notified"] = notifier.notify("business_hours_alert", result)
+    if not result["notified"]:
+        configured = any(destination.wants("business_hours_alert") for destination in notifier.destinations)
+        result["escalation"] = ("Not sent - every notification queue is full" if configured
+                                else "No notification destinations configured - set EDM_NOTIFY_URLS")
+    return result
 
 
-# TODO: Create health check webhook handler
-# Hint: @app.post("/health-check")
+@registry.register("health_check", path="/health-check", description="Periodic device health monitoring")
 def handle_health_check(health_data: dict):
     """
-    TODO: Handle periodic health check webhooks from EDM
+    Handle periodic health check webhooks from EDM
     
     Process regular health status reports from devices.
     """
     
-    # TODO: Process health check data
-    device_name = "TODO: Get from health_data"
+    device_name = health_data.get("device", "unknown")
     check_timestamp = health_data.get("timestamp", "")
     
+    # Reschedule this device's deadline; it shows up in /edm/missing-devices if it goes quiet
+    heartbeat = heartbeats.beat(device_name, parse_frequency(health_data.get("frequency")))
+    
     return {
         "webhook_handler": "Health Check Received",
         "device": device_name,
         "check_time": check_timestamp,
-        "health_status": "received",
+        "health_status": "recovered" if heartbeat["recovered"] else "received",
+        "heartbeat": heartbeat,
         "monitoring": "Device health data logged for trend analysis",
         "next_check": "Scheduled automatically by EDM applet"
     }
 
 
-# TODO: Create a comprehensive webhook status endpoint
-# Hint: @app.get("/webhook-status")
-def get_webhook_status():
+# Event types from plugin modules (EDM_PLUGINS=module_a,module_b), then one thin
+# alias route per registered path - /interface-alert, /cpu-alert, ...
+LOADED_PLUGINS = load_plugins(registry, os.getenv("EDM_PLUGINS", "").split(","))
+registry.mount(app)
+
+
+@app.post("/edm/events")
+def handle_edm_event(alert_data: dict):
     """
-    TODO: Provide status of your webhook handling system
+    Single ingest route for every EDM alert - dispatched by its event_type
     
-    Show which EDM webhook endpoints are available and their purposes.
+    Example: {"event_type": "high_cpu", "device": "core-sw1", "cpu_percent": "91"}
+    """
+    event_type = registry.event_type_of(alert_data)
+    try:
+        return registry.dispatch(event_type, alert_data)
+    except UnknownEventType:
+        raise HTTPException(
+            status_code=422,
+            detail=f"No handler for event_type '{event_type}' - known types: {sorted(registry.status())}"
+        )
+
+
+@app.get("/webhook-status")
+def get_webhook_status():
     """
+    Provide status of your webhook handling system
     
+    Generated from the event registry: every event type with its route,
+    purpose, how many alerts it handled and how long they took.
+    """
+    event_types = registry.status()
     webhook_endpoints = {
-        "test-webhook": "Manual EDM applet testing", 
-        "interface-alert": "Interface status change notifications",
-        "cpu-alert": "High CPU utilization alerts", 
-        "memory-alert": "Low memory warnings",
-        "config-change": "Configuration change audit logging",
-        "error-alert": "Critical error pattern detection",
-        "business-alert": "Business hours priority alerts",
-        "health-check": "Periodic device health monitoring"
+        event["route"].lstrip("/"): event["description"]
+        for event in event_types.values()
+        if event["route"]
     }
+    webhook_endpoints["edm/events"] = "Any alert, dispatched by event_type"
+    webhook_endpoints["edm/batch"] = "Bulk newline-delimited alert ingest"
     
     return {
         "webhook_server": "EDM Alert Handler",
         "status": "operational", 
         "available_endpoints": webhook_endpoints,
         "total_endpoints": len(webhook_endpoints),
+        "event_types": event_types,
+        "total_alerts_handled": sum(event["count"] for event in event_types.values()),
+        "plugins": LOADED_PLUGINS,
         "edm_integration": "Ready to receive Cisco EDM applet webhooks",
         "documentation": "See edm_configurations.md for applet configurations"
     }
 
 
+# Batch ingest: a relay (or a busy device) can POST many alerts at once as
+# newline-delimited JSON (NDJSON) - one alert object per line, mixed event
+# types allowed. Each line is dispatched through the registry like /edm/events.
+def process_batch_line(line: bytes, line_number: int, rate_limit: bool = True):
+    """
+    Decode one NDJSON line and hand it to the matching alert handler.
+    
+    Never raises - a bad line becomes an error entry so the rest of the
+    batch keeps flowing. rate_limit=False skips admission, as replay does.
+    """
+    try:
+        alert = decode_payload(line)
+    except ValueError as e:
+        return {"line": line_number, "status": "invalid", "error": f"Invalid JSON: {e}"}
+    
+    if not isinstance(alert, dict):
+        return {"line": line_number, "status": "invalid", "error": "Alert must be a JSON object"}
+    
+    # Same per-device rate limit as /error-alert, so a batch is no way around it
+    device, event_type, priority, message = classify_alert("", alert)
+    allowed, retry_after, suppressed = (
+        admission.check_rate(device, event_type, priority, message) if rate_limit else (True, 0.0, 0)
+    )
+    if not allowed:
+        return {
+            "line": line_number,
+            "status": "rate_limited",
+            "event_type": event_type,
+            "device": device,
+            "retry_after": round(retry_after, 3),
+            "suppressed_count": suppressed
+        }
+    if rate_limit and event_type in admission.limited_types:
+        suppressed_alerts = admission.digest.take(device)
+        if suppressed_alerts is not None:
+            alert["suppressed_alerts"] = suppressed_alerts
+    
+    try:
+        result = registry.dispatch(event_type, alert)
+    except UnknownEventType:
+        return {
+            "line": line_number,
+            "status": "unsupported",
+            "event_type": event_type,
+            "error": f"No handler for event_type '{event_type}'"
+        }
+    except Exception as e:
+        return {"line": line_number, "status": "failed", "event_type": event_type, "error": str(e)}
+    
+    return {"line": line_number, "status": "processed", "event_type": event_type, "result": result}
+
+
+@app.post("/edm/batch")
+async def handle_edm_batch(request: Request):
+    """
+    Handle a batch of newline-delimited EDM alerts in a single POST
+    
+    Example body (Content-Type: application/x-ndjson):
+    {"event_type": "interface_change", "device": "core-sw1", "interface": "Gi1/0/1", ...}
+    {"event_type": "high_cpu", "device": "core-sw1", "cpu_percent": "91", ...}
+    
+    The body is streamed, so lines are processed as they arrive instead of
+    waiting for (and buffering) the whole request.
+    """
+    started = time.perf_counter()
+    results = []
+    pending = b""
+    line_number = 0
+    
+    async for chunk in request.stream():
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()  # Last piece may be an incomplete line
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                results.append(process_batch_line(line, line_number))
+    
+    if pending.strip():
+        line_number += 1
+        results.append(process_batch_line(pending, line_number))
+    
+    processed = sum(1 for result in results if result["status"] == "processed")
+    rate_limited = sum(1 for result in results if result["status"] == "rate_limited")
+    
+    return {
+        "webhook_handler": "EDM Batch Processed",
+        "total_alerts": len(results),
+        "processed": processed,
+        "rate_limited": rate_limited,
+        "failed": len(results) - processed - rate_limited,
+        "processing_ms": round((time.perf_counter() - started) * 1000, 3),
+        "results": results
+    }
+
+
+def get_device_series(device_name: str, metric: str, samples: bool):
+    series = device_metrics.snapshot(device_name, metric, include_samples=samples)
+    if series is None:
+        raise HTTPException(status_code=404, detail=f"No {metric} readings for device '{device_name}'")
+    return {"device": device_name, "metric": metric, **series}
+
+
+@app.get("/devices/{device_name}/cpu")
+def get_device_cpu(device_name: str, samples: bool = False):
+    """
+    Rolling CPU statistics for one device (min/max/mean/p95/trend).
+    
+    Add ?samples=true to include the raw (timestamp, value) window.
+    """
+    return get_device_series(device_name, "cpu", samples)
+
+
+@app.get("/devices/{device_name}/memory")
+def get_device_memory(device_name: str, samples: bool = False):
+    """
+    Rolling free-memory statistics for one device (min/max/mean/p95/trend).
+    """
+    return get_device_series(device_name, "memory_free", samples)
+
+
+def query_config_changes(device: str = None, user: str = None, start: str = None, end: str = None,
+                         limit: int = 100):
+    if config_audit is None:
+        raise HTTPException(status_code=503, detail="Audit store disabled - set EDM_AUDIT_DB")
+    changes = config_audit.query(device=device, changed_by=user, start=parse_replay_time(start),
+                                 end=parse_replay_time(end), limit=max(1, min(limit, 1000)))
+    return {"device": device, "user": user, "start": start, "end": end, "count": len(changes), "changes": changes}
+
+
+@app.get("/devices/{device_name}/config-changes")
+def get_device_config_changes(device_name: str, start: str = None, end: str = None, user: str = None,
+                              limit: int = 100):
+    """
+    Audited configuration changes on one device, newest first.
+    
+    start / end take epoch seconds or ISO-8601; limit is capped at 1000.
+    """
+    return query_config_changes(device_name, user, start, end, limit)
+
+
+@app.get("/edm/config-changes")
+def get_user_config_changes(user: str, start: str = None, end: str = None, limit: int = 100):
+    """
+    Audited configuration changes made by one user, newest first.
+    """
+    return query_config_changes(None, user, start, end, limit)
+
+
+@app.get("/edm/config-audit")
+def get_config_audit_status():
+    """
+    Audit store status: rows written, writer backlog and transaction counts.
+    """
+    if config_audit is None:
+        return {"config_audit": "disabled", "hint": "Set EDM_AUDIT_DB to a database file"}
+    return config_audit.stats()
+
+
+@app.post("/edm/syslog-rules/reload")
+def reload_syslog_rules(reload_request: dict = None):
+    """
+    Swap in a new syslog rule table without restarting the server
+    
+    Send {"rules": [...]} (same shape as DEFAULT_RULES in syslog_classifier.py),
+    or an empty body to re-read the EDM_SYSLOG_RULES file.
+    """
+    rules = (reload_request or {}).get("rules")
+    try:
+        if rules is not None:
+            syslog_classifier.load_rules(rules)
+        elif SYSLOG_RULES_FILE:
+            syslog_classifier.load_rules_file(SYSLOG_RULES_FILE)
+        else:
+            raise HTTPException(status_code=422, detail="Send 'rules' or set EDM_SYSLOG_RULES")
+    except (KeyError, TypeError, ValueError, OSError, re.error) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid rule set: {e}")
+    
+    return {
+        "webhook_handler": "Syslog Rules Reloaded",
+        "source": "request" if rules is not None else SYSLOG_RULES_FILE,
+        "rules_loaded": syslog_classifier.rule_count,
+        "status": "success"
+    }
+
+
+@app.get("/edm/flaps")
+def get_interface_flaps(limit: int = 100):
+    """
+    List interfaces that are currently flapping, most recently active first.
+    """
+    return {
+        "flapping_interfaces": flap_suppressor.flapping(limit),
+        **flap_suppressor.stats()
+    }
+
+
+@app.get("/edm/incidents")
+def get_incidents(state: str = "open", device: str = None, event_type: str = None, limit: int = 100):
+    """
+    Correlated incidents, most recently active first.
+    
+    state is "open" or "closed" (recently closed ones are kept for review);
+    filter with device= or event_type=.
+    """
+    if state not in ("open", "closed"):
+        raise HTTPException(status_code=422, detail="state must be 'open' or 'closed'")
+    return {
+        "incidents": correlator.incidents(state, device=device, event_type=event_type, limit=limit),
+        **correlator.stats()
+    }
+
+
+@app.get("/edm/incidents/{incident_id}")
+def get_incident(incident_id: str):
+    """
+    One correlated incident: devices, event counts and the root cause.
+    """
+    incident = correlator.get(incident_id)
+    if incident is None:
+        raise HTTPException(status_code=404, detail=f"Incident {incident_id} not found")
+    return incident
+
+
+@app.get("/edm/queue")
+def get_ingest_queue_status():
+    """
+    Show the async ingest queue: depth, overflow policy and event counters.
+    """
+    return {
+        "async_ingest": ASYNC_INGEST,
+        **ingest_queue.stats()
+    }
+
+
+@app.get("/edm/missing-devices")
+def get_missing_devices(limit: int = 100):
+    """
+    Devices that stopped sending their periodic /health-check, longest missing first.
+    """
+    return {
+        **heartbeats.stats(),
+        "missing": heartbeats.missing(limit)
+    }
+
+
+@app.delete("/devices/{device_name}/heartbeat")
+def forget_device_heartbeat(device_name: str):
+    """
+    Stop expecting health checks from a device (e.g. decommissioned).
+    """
+    if not heartbeats.forget(device_name):
+        raise HTTPException(status_code=404, detail=f"No heartbeat tracked for {device_name}")
+    return {"device": device_name, "heartbeat": "no longer tracked"}
+
+
+@app.get("/edm/notifications")
+def get_notification_status():
+    """
+    Show outbound notification destinations with their queue and delivery counters.
+    """
+    return notifier.stats()
+
+
+@app.get("/edm/idempotency")
+def get_idempotency_status():
+    """
+    Show how many retried deliveries were answered from the idempotency cache.
+    """
+    if idempotency is None:
+        return {"idempotency": "disabled", "hint": "Set EDM_IDEMPOTENCY_TTL_SECONDS above 0 to enable"}
+    return idempotency.stats()
+
+
+@app.get("/edm/admission")
+def get_admission_status(limit: int = 100):
+    """
+    Show rate limiter / concurrency gate state and the per-device digests of
+    alerts refused since that device's last admitted error alert.
+    """
+    return {
+        **admission.stats(),
+        "suppressed": admission.digest.snapshot(limit)
+    }
+
+
+def history_filters(device: str, event_type: str, severity: str, interface: str):
+    # Comma-separated values, like the /stream filters
+    return {field: value.split(",") if value else None for field, value in
+            (("device", device), ("event_type", event_type), ("severity", severity and severity.upper()),
+             ("interface", interface))}
+
+
+@app.get("/edm/history")
+def get_alert_history(device: str = None, event_type: str = None, severity: str = None, interface: str = None,
+                      start: str = None, end: str = None, limit: int = 100):
+    """
+    Count and list processed alerts from the history (spill files included), newest last.
+    Filters take comma-separated values; start/end are ISO-8601 times.
+    """
+    filters = history_filters(device, event_type, severity, interface)
+    matching, events = event_store.latest(max(1, min(limit, 1000)), parse_replay_time(start),
+                                          parse_replay_time(end), **filters)
+    return {
+        "matching": matching,
+        "events": events,
+        "history": event_store.stats()
+    }
+
+
+@app.get("/edm/history/hourly")
+def get_alert_history_hourly(device: str = None, event_type: str = None, severity: str = None,
+                             interface: str = None, start: str = None, end: str = None):
+    """
+    Alerts per device per hour: {device: {"2024-03-01T10:00Z": count}}.
+    """
+    return event_store.counts_per_device_per_hour(parse_replay_time(start), parse_replay_time(end),
+                                                  **history_filters(device, event_type, severity, interface))
+
+
+@app.get("/edm/history/top-interfaces")
+def get_noisiest_interfaces(limit: int = 10, device: str = None, start: str = None, end: str = None):
+    """
+    The ports with the most interface_change alerts.
+    """
+    return event_store.top_interfaces(max(1, min(limit, 1000)), parse_replay_time(start), parse_replay_time(end),
+                                      device=device.split(",") if device else None)
+
+
+@app.get("/stream")
+async def stream_alerts(device: str = None, event_type: str = None, severity: str = None):
+    """
+    Server-Sent Events feed of processed alerts. Filters take comma-separated
+    values, e.g. /stream?device=core-sw-01,core-sw-02&severity=HIGH,CRITICAL
+    """
+    subscriber = alert_stream.subscribe(parse_filters(device, event_type, severity), kind="sse")
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Too many stream clients",
+                            headers={"Retry-After": str(STREAM_KEEPALIVE_SECONDS)})
+
+    async def frames():
+        try:
+            yield b"retry: 5000\n: connected\n\n"
+            while True:
+                try:
+                    batch = await asyncio.wait_for(subscriber.next_frames(), STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"  # Keeps proxies from closing an idle connection
+                    continue
+                dropped = subscriber.take_drop_notice()
+                notice = [f"event: dropped\ndata: {{\"dropped\": {dropped}}}\n\n".encode()] if dropped else []
+                # Everything buffered goes out in one write
+                yield b"".join(notice + [sse for sse, _text in batch])
+        finally:
+            alert_stream.unsubscribe(subscriber)
+
+    return StreamingResponse(frames(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.websocket("/stream/ws")
+async def stream_alerts_websocket(websocket: WebSocket, device: str = None, event_type: str = None,
+                                  severity: str = None):
+    """
+    WebSocket feed of processed alerts: one JSON text message per alert, same
+    filters as /stream. Lost alerts are announced as {"dropped": n}.
+    """
+    subscriber = alert_stream.subscribe(parse_filters(device, event_type, severity), kind="ws")
+    if subscriber is None:
+        await websocket.close(code=1013)  # Try again later
+        return
+    await websocket.accept()
+
+    async def watch_client():
+        # Dashboards only listen - wait for the close so an idle client is noticed too
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        except Exception:
+            pass
+        subscriber.close()
+
+    watcher = asyncio.create_task(watch_client())
+    try:
+        while True:
+            batch = await subscriber.next_frames()
+            if subscriber.closed:
+                break
+            dropped = subscriber.take_drop_notice()
+            if dropped:
+                await websocket.send_text(f'{{"dropped": {dropped}}}')
+            for _sse, text in batch:
+                await websocket.send_text(text)
+    except Exception:
+        pass  # Client went away mid-send
+    finally:
+        watcher.cancel()
+        alert_stream.unsubscribe(subscriber)
+
+
+@app.get("/edm/stream")
+def get_alert_stream_status(limit: int = 50):
+    """
+    Show connected stream clients with their filters, buffered and dropped alerts.
+    """
+    return alert_stream.stats(limit)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Prometheus scrape endpoint: alert counts, handler latency histograms,
+    in-flight requests and queue depths.
+    """
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
+
+
+# URL path -> callable(data) for every single-alert route
+ALERT_ROUTE_HANDLERS = {**registry.route_handlers(), "/edm/events": registry.dispatch_payload}
+ROUTE_EVENT_TYPES = registry.route_event_types()
+
+
+def classify_alert(path: str, data: dict):
+    """
+    (device, event_type, priority, message) for the admission middleware.
+    Error alerts are ranked by their syslog severity: 0-2 critical, 3 error.
+    """
+    event_type = ROUTE_EVENT_TYPES.get(path) or registry.event_type_of(data)
+    device = str(data.get("device", "unknown"))
+    message = data.get("error_message") or data.get("message")
+    if event_type == "interface_change":
+        return device, event_type, INTERFACE, message
+    if event_type == "error_detected":
+        syslog = syslog_classifier.classify(str(message or ""))
+        if syslog is not None:
+            priority = CRITICAL if syslog.severity <= 2 else ERROR if syslog.severity == 3 else INFORMATIONAL
+        else:
+            priority = CRITICAL if "CRITICAL" in str(message or "") else ERROR
+        return device, event_type, priority, message
+    if event_type in ("high_cpu", "low_memory"):
+        return device, event_type, ERROR, message
+    return device, event_type, INFORMATIONAL, message
+
+
+def ingest_syslog(event_type: str, data: dict):
+    """
+    Feed an event from the syslog receiver into the ingest queue, behind the
+    same per-device rate limit as /error-alert. Returns False if it was refused.
+    """
+    device, event_type, priority, message = classify_alert("", data)
+    allowed, _retry_after, _suppressed = admission.check_rate(device, event_type, priority, message)
+    if not allowed:
+        return False
+    if event_log is not None:
+        # Logged as an /edm/events body, so /edm/replay can feed it back too
+        event_log.append("/edm/events", json.dumps(data).encode())
+    accepted, _event_id = ingest_queue.submit(registry.dispatch_payload, data)
+    return accepted
+
+
+# Raw syslog straight from the devices (logging host <server> transport udp port 5514)
+# as a lighter alternative to one EDM applet + curl per event
+SYSLOG_UDP_PORT = os.getenv("EDM_SYSLOG_UDP_PORT")
+SYSLOG_TCP_PORT = os.getenv("EDM_SYSLOG_TCP_PORT")
+syslog_receiver = SyslogReceiver(
+    ingest_syslog,
+    syslog_classifier,
+    host=os.getenv("EDM_SYSLOG_HOST", "0.0.0.0"),
+    udp_port=int(SYSLOG_UDP_PORT) if SYSLOG_UDP_PORT else None,
+    tcp_port=int(SYSLOG_TCP_PORT) if SYSLOG_TCP_PORT else None,
+) if SYSLOG_UDP_PORT or SYSLOG_TCP_PORT else None
+if syslog_receiver is not None:
+    metrics.counter("edm_syslog_messages_total", "Syslog messages received by outcome", ("outcome",),
+                    function=lambda: {(outcome,): getattr(syslog_receiver, outcome)
+                                      for outcome in ("forwarded", "ignored", "invalid", "rejected")})
+
+
+@app.get("/edm/syslog-receiver")
+def get_syslog_receiver_status():
+    """
+    Show the UDP/TCP syslog listener and its message counters.
+    """
+    if syslog_receiver is None:
+        return {"syslog_receiver": "disabled", "hint": "Set EDM_SYSLOG_UDP_PORT and/or EDM_SYSLOG_TCP_PORT"}
+    return syslog_receiver.stats()
+
+
+def parse_replay_time(value):
+    """Accept epoch seconds or an ISO-8601 string; None means unbounded."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Invalid time '{value}' - use epoch seconds or ISO-8601")
+
+
+@app.post("/edm/replay")
+def replay_event_log(replay_request: dict):
+    """
+    Feed logged alerts from a time range back through the handlers
+    
+    Expected input:
+    {
+        "start": "2024-03-01T10:00:00",
+        "end": "2024-03-01T11:00:00",
+        "dry_run": false
+    }
+    
+    With dry_run the matching alerts are only counted.
+    """
+    if event_log is None:
+        raise HTTPException(status_code=409, detail="Event log disabled - set EDM_EVENT_LOG_DIR")
+    
+    start = parse_replay_time(replay_request.get("start"))
+    end = parse_replay_time(replay_request.get("end"))
+    dry_run = bool(replay_request.get("dry_run", False))
+    
+    replayed_by_route = {}
+    failed = 0
+    for _timestamp, route, body in event_log.replay(start, end):
+        replayed_by_route[route] = replayed_by_route.get(route, 0) + 1
+        if dry_run:
+            continue
+        if route == "/edm/batch":
+            for line_number, line in enumerate(body.split(b"\n"), start=1):
+                if line.strip() and process_batch_line(line, line_number, rate_limit=False)["status"] != "processed":
+                    failed += 1
+            continue
+        try:
+            ALERT_ROUTE_HANDLERS[route](decode_payload(body))
+        except Exception:
+            failed += 1
+    
+    return {
+        "webhook_handler": "Event Log Replay",
+        "start": replay_request.get("start"),
+        "end": replay_request.get("end"),
+        "dry_run": dry_run,
+        "records_replayed": sum(replayed_by_route.values()),
+        "records_by_route": replayed_by_route,
+        "failed": failed
+    }
+
+
+@app.get("/edm/event-log")
+def get_event_log_status():
+    """
+    Show event log segments, fsync policy and write counters.
+    """
+    if event_log is None:
+        return {"event_log": "disabled", "hint": "Set EDM_EVENT_LOG_DIR to enable"}
+    return event_log.stats()
+
+
+# In async mode the single-alert routes are answered by the middleware with 202
+# and handled by the queue workers - the handlers themselves stay unchanged
+if ASYNC_INGEST:
+    app.add_middleware(AsyncIngestMiddleware, queue=ingest_queue, routes=ALERT_ROUTE_HANDLERS)
+
+# Outside the async middleware, so a storm is refused before it reaches the queue
+app.add_middleware(AdmissionMiddleware, controller=admission, paths=ALERT_ROUTE_HANDLERS,
+                   classify=classify_alert)
+
+# Outside admission control: a retry of an alert already handled is answered from the
+# cache without spending the device's rate limit tokens
+if idempotency is not None:
+    app.add_middleware(IdempotencyMiddleware, cache=idempotency, paths=[*ALERT_ROUTE_HANDLERS, "/edm/batch"])
+
+# Added after the async middleware so it wraps it and logs alerts in both modes
+if event_log is not None:
+    app.add_middleware(EventLogMiddleware, log=event_log, paths=[*ALERT_ROUTE_HANDLERS, "/edm/batch"])
+
+# Outermost of all, so /metrics also times the 202 answers from async mode
+app.add_middleware(MetricsMiddleware, metrics=http_metrics, extra_paths=ALERT_ROUTE_HANDLERS)
+
+
 # TODO (Optional): Add logging and monitoring for webhook activities
 # Ideas:
 # - Log all incoming webhooks to a file
-# - Count webhook types received 
 # - Track device activity patterns
-# - Store webhook history for analysis
 
 
 if __name__ == "__main__":
     print("⚡ Cisco EDM Webhook Handler Server")
     print("=" * 50)
     print("To run this server:")
-    print("1. Complete all TODO items above") 
+    print("1. Review the handlers above and customize the responses")
     print("2. Run: uvicorn edm_webhook_server:app --reload --host 0.0.0.0 --port 8000")
     print("3. Configure EDM applets to point to this server")
     print("4. Visit: http://localhost:8000/docs")
@@ -315,7 +1253,34 @@ if __name__ == "__main__":
     print("  POST /error-alert      - Error pattern alerts")
     print("  POST /business-alert   - Business hours alerts")
     print("  POST /health-check     - Periodic health monitoring")
+    print("  POST /edm/events       - Any alert, dispatched by event_type")
+    print("  POST /edm/batch        - Bulk NDJSON alerts (mixed types)")
+    print("  GET  /devices/{name}/cpu    - Rolling CPU stats for a device")
+    print("  GET  /devices/{name}/memory - Rolling memory stats for a device")
+    print("  GET  /devices/{name}/config-changes - Audited config changes for a device")
+    print("  GET  /edm/config-changes?user=      - Audited config changes by a user")
+    print("  GET  /stream           - Live alerts (SSE), ?device=&event_type=&severity=")
+    print("  WS   /stream/ws        - Live alerts over WebSocket, same filters")
+    print("  GET  /edm/stream       - Connected stream clients")
+    print("  GET  /edm/history      - Processed alert history (filters, time range)")
+    print("  GET  /edm/history/hourly         - Alerts per device per hour")
+    print("  GET  /edm/history/top-interfaces - Noisiest interfaces")
+    print("  GET  /edm/flaps        - Currently flapping interfaces")
+    print("  GET  /edm/missing-devices   - Devices that stopped sending health checks")
+    print("  GET  /edm/incidents    - Correlated incidents (one per root cause)")
+    print("  POST /edm/syslog-rules/reload - Reload the syslog classifier rules")
+    print("  GET  /edm/queue        - Async ingest queue status")
+    print("  GET  /edm/syslog-receiver - Raw syslog listener (EDM_SYSLOG_UDP_PORT)")
+    print("  GET  /edm/admission    - Rate limits, load shedding and suppressed alerts")
+    print("  GET  /edm/idempotency  - Retried deliveries answered from cache")
+    print("  GET  /edm/notifications - Outbound webhook delivery status")
+    print("  POST /edm/replay       - Replay logged alerts for a time range")
+    print("  GET  /edm/event-log    - Event log status")
     print("  GET  /webhook-status   - Webhook system status")
+    print("  GET  /metrics          - Prometheus metrics")
+    print()
+    print("Async mode (202 Accepted + background workers):")
+    print("  EDM_ASYNC_INGEST=1 EDM_QUEUE_WORKERS=4 EDM_QUEUE_SIZE=10000 EDM_QUEUE_OVERFLOW=reject")
     print()
     print("📋 Next Steps:")
     print("1. Deploy EDM applets from edm_configurations.md")
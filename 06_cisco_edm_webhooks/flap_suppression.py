@@ -0,0 +1,181 @@
+"""
+Section 06: Interface Flap Suppression
+
+A flapping port fires the INTERFACE_STATUS_WEBHOOK applet dozens of times a
+minute. FlapSuppressor collapses those repeated UP/DOWN transitions for the
+same (device, interface) into one incident with a counter and first/last
+timestamps, so notification and logging happen once per incident instead of
+once per syslog line.
+
+Every call is O(1): entries live in an OrderedDict ordered by last activity,
+so expiry only ever looks at the oldest entry and the size cap evicts from
+the same end.
+
+FastAPI runs plain `def` handlers in a threadpool, so updates take a lock.
+
+Run this file directly for a quick benchmark: python flap_suppression.py
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+class FlapIncident:
+    """One ongoing incident for a single (device, interface) pair."""
+
+    __slots__ = ("device", "interface", "first_seen", "last_seen", "transitions", "last_status")
+
+    def __init__(self, device: str, interface: str, status: str, now: float):
+        self.device = device
+        self.interface = interface
+        self.first_seen = now
+        self.last_seen = now
+        self.transitions = 1
+        self.last_status = status
+
+    def as_dict(self, flap_threshold: int):
+        return {
+            "device": self.device,
+            "interface": self.interface,
+            "transitions": self.transitions,
+            "flapping": self.transitions >= flap_threshold,
+            "last_status": self.last_status,
+            "first_seen": datetime.fromtimestamp(self.first_seen, timezone.utc).isoformat(),
+            "last_seen": datetime.fromtimestamp(self.last_seen, timezone.utc).isoformat()
+        }
+
+
+class FlapSuppressor:
+    """
+    TTL-expiring, size-bounded incident table keyed on (device, interface).
+
+    - ttl_seconds:   quiet time after which an incident closes and the next
+                     transition starts a fresh one
+    - max_entries:   hard cap on tracked interfaces; the least recently active
+                     incident is evicted when a new one would exceed it
+    - flap_threshold: transitions within one incident before it is reported
+                     as flapping
+    """
+
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 100_000,
+                 flap_threshold: int = 3, clock=time.time):
+        if ttl_seconds <= 0 or max_entries < 1:
+            raise ValueError("ttl_seconds must be positive and max_entries at least 1")
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.flap_threshold = flap_threshold
+        self.clock = clock
+        self._incidents = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.events_seen = 0
+        self.events_suppressed = 0
+        self.incidents_opened = 0
+        self.incidents_evicted = 0
+
+    def __len__(self):
+        return len(self._incidents)
+
+    def record(self, device: str, interface: str, status: str, now: float = None):
+        """
+        Record one interface transition.
+
+        Returns (incident, is_new). is_new is True only for the first event of
+        an incident - that is the one that should trigger downstream work.
+        """
+        now = self.clock() if now is None else now
+        key = (device, interface)
+        with self._lock:
+            self.events_seen += 1
+            self._expire(now)
+
+            incident = self._incidents.get(key)
+            if incident is not None:
+                incident.transitions += 1
+                incident.last_seen = now
+                incident.last_status = status
+                self._incidents.move_to_end(key)
+                self.events_suppressed += 1
+                return incident, False
+
+            incident = FlapIncident(device, interface, status, now)
+            self._incidents[key] = incident
+            self.incidents_opened += 1
+            if len(self._incidents) > self.max_entries:
+                self._incidents.popitem(last=False)
+                self.incidents_evicted += 1
+            return incident, True
+
+    def _expire(self, now: float):
+        # Oldest activity is always at the front, so stop at the first live entry
+        cutoff = now - self.ttl_seconds
+        incidents = self._incidents
+        while incidents:
+            oldest = next(iter(incidents.values()))
+            if oldest.last_seen > cutoff:
+                break
+            incidents.popitem(last=False)
+
+    def flapping(self, limit: int = 100):
+        """Currently flapping interfaces, most recently active first."""
+        results = []
+        with self._lock:
+            self._expire(self.clock())
+            for incident in reversed(self._incidents.values()):
+                if incident.transitions >= self.flap_threshold:
+                    results.append(incident.as_dict(self.flap_threshold))
+                    if len(results) >= limit:
+                        break
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tracked_interfaces": len(self._incidents),
+                "max_interfaces": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "flap_threshold": self.flap_threshold,
+                "events_seen": self.events_seen,
+                "events_suppressed": self.events_suppressed,
+                "incidents_opened": self.incidents_opened,
+                "incidents_evicted": self.incidents_evicted
+            }
+
+
+if __name__ == "__main__":
+    import random
+    import tracemalloc
+
+    interfaces = 100_000
+    events = 1_000_000
+    rng = random.Random(7)
+    keys = [(f"switch-{n // 48:04d}", f"GigabitEthernet1/0/{n % 48 + 1}") for n in range(interfaces)]
+    stream = [keys[rng.randrange(interfaces)] for _ in range(events)]
+
+    def replay(suppressor):
+        now = 1_700_000_000.0
+        for number, (device, interface) in enumerate(stream):
+            suppressor.record(device, interface, "DOWN" if number % 2 else "UP", now + number * 0.001)
+
+    suppressor = FlapSuppressor(ttl_seconds=300, max_entries=interfaces)
+    started = time.perf_counter()
+    replay(suppressor)
+    elapsed = time.perf_counter() - started
+
+    # Second pass with tracemalloc on, just to measure the table size
+    tracemalloc.start()
+    measured = FlapSuppressor(ttl_seconds=300, max_entries=interfaces)
+    replay(measured)
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print("🔁 Flap Suppression Benchmark")
+    print("=" * 50)
+    print(f"Events:              {events:,} across {interfaces:,} interfaces")
+    print(f"Per-event cost:      {elapsed / events * 1e9:,.0f} ns")
+    print(f"Incidents opened:    {suppressor.incidents_opened:,}")
+    print(f"Events suppressed:   {suppressor.events_suppressed:,}")
+    print(f"Table memory:        {current / 1024 / 1024:,.1f} MiB "
+          f"({current / max(len(measured), 1):,.0f} bytes per interface)")
@@ -0,0 +1,260 @@
+"""
+Section 06: Heartbeat Tracker (Hashed Timer Wheel)
+
+The HEALTH_CHECK_WEBHOOK applet posts to /health-check on a timer (every 4
+hours in edm_configurations.md). A device that stops posting is the one to
+worry about - it may be down, unreachable or have lost its applets.
+
+HeartbeatTracker notices this without a task per device and without ever
+scanning the whole fleet:
+
+- time is cut into ticks (tick_seconds) and the wheel has `slots` buckets;
+  a device whose next heartbeat is due at tick T sits in bucket T % slots
+- a heartbeat moves the device to its new bucket: two O(1) dict operations
+- advancing the clock visits only the buckets for the ticks that passed;
+  devices whose deadline has come are moved to the missing list. A deadline
+  more than one revolution away simply stays in its bucket for another round
+- the wheel advances lazily whenever it is used, so no background task or
+  timer is needed either
+
+A device is missing once it is `grace` intervals overdue (1.5 x 4 hours by
+default). It drops off the missing list as soon as it reports again.
+
+FastAPI runs plain `def` handlers in a threadpool, so updates take a lock.
+
+Run this file directly for a benchmark: python heartbeat_tracker.py
+"""
+
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+FREQUENCY = re.compile(r"every_(\d+)_(second|minute|hour|day)s?$")
+UNIT_SECONDS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_frequency(value):
+    """
+    Heartbeat interval in seconds from the applet's 'frequency' field
+    ('every_4_hours', 'every_15_minutes') or a number. None if unrecognized.
+    """
+    if isinstance(value, (int, float)) and value > 0:
+        return float(value)
+    match = FREQUENCY.match(str(value or "").strip().lower())
+    if match is None:
+        return None
+    return int(match.group(1)) * UNIT_SECONDS[match.group(2)]
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class Heartbeat:
+    """Last heartbeat and next deadline for one device."""
+
+    __slots__ = ("last_seen", "interval", "deadline_tick")
+
+    def __init__(self, last_seen: float, interval: float, deadline_tick: int):
+        self.last_seen = last_seen
+        self.interval = interval
+        self.deadline_tick = deadline_tick
+
+
+class HeartbeatTracker:
+    """
+    Hashed timer wheel of expected heartbeats.
+
+    - interval:      default seconds between heartbeats (per-device values
+                     passed to beat() take precedence)
+    - grace:         intervals a device may be overdue before it is missing
+    - tick_seconds:  wheel resolution - how late a missing device may be noticed
+    - slots:         buckets in the wheel; slots x tick_seconds should cover the
+                     usual deadline so devices need only one round
+    """
+
+    def __init__(self, interval: float = 4 * 3600, grace: float = 1.5, tick_seconds: float = 10,
+                 slots: int = 4096, clock=time.time):
+        self.interval = interval
+        self.grace = grace
+        self.tick_seconds = tick_seconds
+        self.clock = clock
+        self._slots = [{} for _ in range(slots)]
+        self._devices = {}  # device -> Heartbeat, for devices still reporting on time
+        self._missing = {}  # device -> Heartbeat, in the order they went missing
+        self._missing_since = {}  # device -> epoch seconds
+        self._tick = int(clock() // tick_seconds)
+        self._lock = threading.Lock()
+
+        self.heartbeats = 0
+        self.expired = 0
+        self.recovered = 0
+
+    def __len__(self):
+        return len(self._devices) + len(self._missing)
+
+    def beat(self, device: str, interval: float = None, now: float = None):
+        """
+        Record a heartbeat. Returns the device's status: next expected time and
+        whether it had been missing.
+        """
+        now = self.clock() if now is None else now
+        interval = interval or self.interval
+        deadline = now + interval * self.grace
+        deadline_tick = int(deadline // self.tick_seconds) + 1
+        with self._lock:
+            self._advance(now)
+            self.heartbeats += 1
+            entry = self._devices.get(device)
+            was_missing_since = None
+            if entry is not None:
+                self._slots[entry.deadline_tick % len(self._slots)].pop(device, None)
+                entry.last_seen, entry.interval, entry.deadline_tick = now, interval, deadline_tick
+            else:
+                entry = self._missing.pop(device, None)
+                if entry is not None:
+                    was_missing_since = self._missing_since.pop(device)
+                    self.recovered += 1
+                    entry.last_seen, entry.interval, entry.deadline_tick = now, interval, deadline_tick
+                else:
+                    entry = Heartbeat(now, interval, deadline_tick)
+                self._devices[device] = entry
+            self._slots[deadline_tick % len(self._slots)][device] = None
+        return {
+            "next_expected": _iso(now + interval),
+            "missing_after": _iso(deadline),
+            "recovered": was_missing_since is not None,
+            "was_missing_since": _iso(was_missing_since) if was_missing_since is not None else None
+        }
+
+    def forget(self, device: str):
+        """Stop tracking a device (e.g. decommissioned). False if it was not tracked."""
+        with self._lock:
+            entry = self._devices.pop(device, None)
+            if entry is not None:
+                self._slots[entry.deadline_tick % len(self._slots)].pop(device, None)
+                return True
+            self._missing_since.pop(device, None)
+            return self._missing.pop(device, None) is not None
+
+    def advance(self, now: float = None):
+        """Move the wheel up to now. Returns the number of devices that went missing."""
+        with self._lock:
+            return self._advance(self.clock() if now is None else now)
+
+    def _advance(self, now: float):
+        target = int(now // self.tick_seconds)
+        if target <= self._tick:
+            return 0
+        # After one full revolution every bucket has been looked at once
+        first = max(self._tick + 1, target - len(self._slots) + 1)
+        expired = 0
+        for tick in range(first, target + 1):
+            bucket = self._slots[tick % len(self._slots)]
+            if not bucket:
+                continue
+            due = [device for device in bucket if self._devices[device].deadline_tick <= target]
+            for device in due:
+                del bucket[device]
+                entry = self._devices.pop(device)
+                self._missing[device] = entry
+                self._missing_since[device] = entry.deadline_tick * self.tick_seconds
+            expired += len(due)
+        self._tick = target
+        self.expired += expired
+        return expired
+
+    def missing(self, limit: int = 100):
+        """Devices overdue for a heartbeat, longest missing first."""
+        with self._lock:
+            self._advance(self.clock())
+            results = []
+            for device, entry in self._missing.items():
+                results.append({
+                    "device": device,
+                    "last_seen": _iso(entry.last_seen),
+                    "expected_interval_seconds": entry.interval,
+                    "missing_since": _iso(self._missing_since[device])
+                })
+                if len(results) >= limit:
+                    break
+            return results
+
+    def stats(self):
+        with self._lock:
+            self._advance(self.clock())
+            return {
+                "tracked_devices": len(self._devices) + len(self._missing),
+                "reporting_devices": len(self._devices),
+                "missing_devices": len(self._missing),
+                "default_interval_seconds": self.interval,
+                "grace_intervals": self.grace,
+                "tick_seconds": self.tick_seconds,
+                "wheel_slots": len(self._slots),
+                "heartbeats": self.heartbeats,
+                "expired": self.expired,
+                "recovered": self.recovered
+            }
+
+
+if __name__ == "__main__":
+    import bisect
+    import random
+    import tracemalloc
+
+    devices = 100_000
+    interval = 4 * 3600
+    rng = random.Random(6)
+    base = 1_700_000_000.0
+    clock = [base]
+
+    # Devices check in spread over one interval, like cron jobs on unsynced clocks
+    schedule = sorted((rng.random() * interval, f"switch-{number:06d}") for number in range(devices))
+    offsets = [offset for offset, _name in schedule]
+
+    # Memory on its own pass - tracemalloc slows every allocation down
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sized = HeartbeatTracker(interval=interval, clock=lambda: base)
+    for offset, name in schedule:
+        sized.beat(name, now=base + offset)
+    per_device = (tracemalloc.get_traced_memory()[0] - before) / devices
+    tracemalloc.stop()
+    del sized
+
+    tracker = HeartbeatTracker(interval=interval, clock=lambda: clock[0])
+    started = time.perf_counter()
+    for offset, name in schedule:
+        tracker.beat(name, now=base + offset)
+    beat_us = (time.perf_counter() - started) / devices * 1e6
+
+    # Two more intervals, tick by tick: every device checks in on schedule except 1% gone silent
+    silent = set(rng.sample([name for _offset, name in schedule], devices // 100))
+    tick = tracker.tick_seconds
+    tick_costs = []
+    for step in range(1, int(2 * interval / tick) + 1):
+        elapsed = interval + step * tick
+        clock[0] = base + elapsed
+        tick_started = time.perf_counter()
+        tracker.advance()
+        tick_costs.append(time.perf_counter() - tick_started)
+        # Heartbeats scheduled during this tick
+        first = bisect.bisect_left(offsets, (elapsed - tick) % interval)
+        last = bisect.bisect_left(offsets, elapsed % interval)
+        due = schedule[first:last] if first <= last else schedule[first:] + schedule[:last]
+        for _offset, name in due:
+            if name not in silent:
+                tracker.beat(name)
+    stats = tracker.stats()
+    tick_costs.sort()
+
+    print("💓 Heartbeat Tracker Benchmark")
+    print("=" * 50)
+    print(f"Devices tracked:   {devices:,} (heartbeat every {interval // 3600} h)")
+    print(f"beat():            {beat_us:.2f} µs per heartbeat")
+    print(f"Memory:            {per_device:.0f} bytes per tracked device")
+    print(f"Tick ({tick:.0f} s):       p50 {tick_costs[len(tick_costs) // 2] * 1e6:.1f} µs   "
+          f"p99 {tick_costs[int(len(tick_costs) * 0.99)] * 1e6:.1f} µs   "
+          f"max {tick_costs[-1] * 1e6:.1f} µs over {len(tick_costs):,} ticks")
+    print(f"Missing devices:   {stats['missing_devices']:,} found ({len(silent):,} went silent)")
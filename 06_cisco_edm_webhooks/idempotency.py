@@ -0,0 +1,340 @@
+"""
+Section 06: Idempotent Webhook Delivery
+
+EDM applets retry their curl when the server is slow or the connection drops,
+so the same alert can arrive two or three times. Without protection every copy
+opens its own ticket and notifies the team again.
+
+IdempotencyMiddleware answers a repeated delivery with the response of the
+first one, without running the handler again:
+
+- the key is a BLAKE2b hash of the route and the raw body (a retry sends the
+  same bytes), or of an `Idempotency-Key` header when the sender provides one
+- responses live in an OrderedDict in arrival order: lookup is one dict get,
+  and expiry (ttl_seconds) and the size cap (max_entries) both remove from
+  the oldest end, so memory stays bounded however long the storm lasts
+- a copy that arrives while the first is still being handled waits for it
+  instead of running in parallel. If the first was refused (not 2xx), the
+  waiting copies are handled one after another
+- only 2xx responses are kept: a 429/503/500 answer must let the retry
+  through
+- optional SQLite backing (EDM_IDEMPOTENCY_DB) lets several uvicorn workers,
+  and the next server start, recognize a delivery too
+
+Everything in memory is touched from the event loop only, so no locks are
+needed.
+
+Run this file directly for a benchmark: python idempotency.py
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+
+KEY_HEADER = b"idempotency-key"
+REPLAY_HEADER = (b"idempotent-replay", b"true")
+
+
+def fingerprint(*parts, length: int = 8):
+    """Short stable hash of alert fields - the same alert always gets the same ID."""
+    return hashlib.blake2b("\x1f".join(str(part) for part in parts).encode(),
+                           digest_size=length // 2).hexdigest().upper()
+
+
+class CachedResponse:
+    """Status, headers and body of the first response to one delivery."""
+
+    __slots__ = ("expires", "status", "headers", "body")
+
+    def __init__(self, expires: float, status: int, headers, body: bytes):
+        self.expires = expires
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+class SQLiteBacking:
+    """Shared store of responses in SQLite (WAL), keyed by delivery hash."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS deliveries (
+        key BLOB PRIMARY KEY,
+        expires REAL NOT NULL,
+        status INTEGER NOT NULL,
+        headers TEXT NOT NULL,
+        body BLOB NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_deliveries_expires ON deliveries (expires);
+    """
+    PURGE_EVERY = 1000  # Writes between deletes of expired rows
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(self.SCHEMA)
+        self._writes = 0
+
+    def get(self, key: bytes, now: float):
+        row = self._connection.execute(
+            "SELECT expires, status, headers, body FROM deliveries WHERE key = ? AND expires > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        expires, status, headers, body = row
+        return CachedResponse(expires, status, [(name.encode(), value.encode())
+                                                for name, value in json.loads(headers)], body)
+
+    def put(self, key: bytes, response: CachedResponse, now: float):
+        headers = json.dumps([(name.decode(), value.decode()) for name, value in response.headers])
+        with self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO deliveries VALUES (?, ?, ?, ?, ?)",
+                                     (key, response.expires, response.status, headers, response.body))
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                self._connection.execute("DELETE FROM deliveries WHERE expires <= ?", (now,))
+
+    def close(self):
+        self._connection.close()
+
+
+class IdempotencyCache:
+    """
+    Bounded TTL index of delivery hash -> first response.
+
+    - ttl_seconds:     how long a retry is recognized
+    - max_entries:     oldest entries are evicted beyond this
+    - max_body_bytes:  larger responses are not kept (the handler simply runs again)
+    - backing:         optional SQLiteBacking consulted on a memory miss
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 100_000, max_body_bytes: int = 64 * 1024,
+                 backing: SQLiteBacking = None, clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_body_bytes = max_body_bytes
+        self.backing = backing
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> CachedResponse, oldest first
+        self._pending = {}             # key -> Future set when the first delivery finishes
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stored = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(path: str, body: bytes, idempotency_key: bytes = None):
+        digest = hashlib.blake2b(path.encode(), digest_size=16)
+        digest.update(b"\0")
+        digest.update(idempotency_key if idempotency_key else body)
+        return digest.digest()
+
+    def _expire(self, now: float):
+        entries = self._entries
+        while entries:
+            oldest = next(iter(entries.values()))
+            if oldest.expires > now:
+                break
+            entries.popitem(last=False)
+            self.evicted += 1
+
+    def get(self, key: bytes):
+        now = self.clock()
+        self._expire(now)
+        response = self._entries.get(key)
+        if response is None and self.backing is not None:
+            response = self.backing.get(key, now)
+            if response is not None:
+                self._remember(key, response)
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return response
+
+    def put(self, key: bytes, status: int, headers, body: bytes):
+        if len(body) > self.max_body_bytes:
+            return None
+        now = self.clock()
+        response = CachedResponse(now + self.ttl_seconds, status, headers, body)
+        self._remember(key, response)
+        if self.backing is not None:
+            self.backing.put(key, response, now)
+        self.stored += 1
+        return response
+
+    def _remember(self, key, response):
+        self._entries.pop(key, None)
+        self._entries[key] = response
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    def stats(self):
+        self._expire(self.clock())
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "in_progress": len(self._pending),
+            "persistent_backing": self.backing.path if self.backing is not None else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "stored": self.stored,
+            "evicted": self.evicted
+        }
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware that replays the first response to a repeated POST on `paths`.
+    Replayed responses carry an `Idempotent-Replay: true` header.
+    """
+
+    def __init__(self, app, cache: IdempotencyCache, paths):
+        self.app = app
+        self.cache = cache
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        cache = self.cache
+        header_key = next((value for name, value in scope["headers"] if name == KEY_HEADER), None)
+        key = cache.key(scope["path"], body, header_key)
+
+        response = None
+        pending = cache._pending.get(key)
+        while pending is not None:
+            # Same delivery still being handled - wait for its answer
+            cache.coalesced += 1
+            response = await asyncio.shield(pending)
+            if response is not None:
+                break
+            # That copy got a 429/500, which isn't kept: handle this one unless
+            # another waiting copy got there first
+            pending = cache._pending.get(key)
+        else:
+            response = cache.get(key)
+        if response is not None:
+            return await replay(send, response)
+
+        future = asyncio.get_running_loop().create_future()
+        cache._pending[key] = future
+        status = None
+        headers = []
+        response_chunks = []
+
+        async def capture_send(message):
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [(name, value) for name, value in message.get("headers", [])
+                           if name != b"content-length"]
+            elif message["type"] == "http.response.body":
+                response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        response = None
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            if status is not None and 200 <= status < 300:
+                response = cache.put(key, status, headers, b"".join(response_chunks))
+        finally:
+            if cache._pending.get(key) is future:
+                del cache._pending[key]
+            future.set_result(response)
+
+
+async def replay(send, response: CachedResponse):
+    await send({"type": "http.response.start", "status": response.status, "headers": [
+        *response.headers,
+        (b"content-length", str(len(response.body)).encode()),
+        REPLAY_HEADER
+    ]})
+    await send({"type": "http.response.body", "body": response.body})
+
+
+if __name__ == "__main__":
+    import os
+    import random
+    import tempfile
+    import tracemalloc
+
+    deliveries = 500_000
+    rng = random.Random(8)
+    bodies = [json.dumps({"event_type": "error_detected", "device": f"switch-{rng.randrange(20_000):05d}",
+                          "error_message": f"%SYS-3-CPUHOG: Task ran for {rng.randrange(9999)}ms",
+                          "timestamp": f"2024-03-01T10:{number % 60:02d}:00"}).encode()
+              for number in range(deliveries)]
+    headers = [(b"content-type", b"application/json")]
+    response = b'{"webhook_handler":"Error Alert Processed","status":"processed"}'
+
+    print("🔁 Idempotency Cache Benchmark")
+    print("=" * 50)
+    def run(cache):
+        for number, body in enumerate(bodies):
+            key = cache.key("/error-alert", body)
+            if cache.get(key) is None:
+                cache.put(key, 200, headers, response)
+            # One in five deliveries is a curl retry of one of the last few hundred alerts
+            if rng.random() < 0.2:
+                cache.get(cache.key("/error-alert", bodies[max(0, number - rng.randrange(1, 500))]))
+
+    for max_entries in (10_000, 100_000):
+        cache = IdempotencyCache(max_entries=max_entries)
+        started = time.perf_counter()
+        run(cache)
+        per_delivery = (time.perf_counter() - started) / deliveries * 1e6
+        hit_rate = cache.hits / (cache.hits + cache.misses)
+        del cache
+        # Memory on its own pass - tracemalloc slows every allocation down
+        tracemalloc.start()
+        cache = IdempotencyCache(max_entries=max_entries)
+        run(cache)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"max_entries {max_entries:>7,}: {per_delivery:.2f} µs per delivery, hit rate {hit_rate:.1%}, "
+              f"{memory / 1024 / 1024:.1f} MiB")
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = IdempotencyCache(backing=SQLiteBacking(os.path.join(directory, "idempotency.db")))
+        count = 20_000
+        started = time.perf_counter()
+        for body in bodies[:count]:
+            cache.put(cache.key("/error-alert", body), 200, headers, response)
+        put_us = (time.perf_counter() - started) / count * 1e6
+        fresh = IdempotencyCache(backing=cache.backing)  # e.g. another worker process
+        started = time.perf_counter()
+        found = sum(fresh.get(fresh.key("/error-alert", body)) is not None for body in bodies[:count])
+        get_us = (time.perf_counter() - started) / count * 1e6
+        cache.backing.close()
+    print(f"SQLite backing:  put {put_us:.1f} µs, cold get {get_us:.1f} µs ({found:,}/{count:,} found)")
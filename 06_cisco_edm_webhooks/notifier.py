@@ -0,0 +1,366 @@
+"""
+Section 06: Outbound Notifications
+
+Handlers promise "team notified" - this module keeps that promise without
+slowing the webhook down. notify() only serializes the event once and appends
+the bytes to a queue per destination; everything else happens in the
+background on the event loop:
+
+- one sender task per destination takes up to batch_size events at a time
+  (or whatever arrived within flush_interval) and POSTs them as one request:
+  {"source": "edm-webhook-server", "events": [...]}
+- all destinations share one pooled httpx.AsyncClient, so connections are
+  reused across batches
+- failed batches (connection errors, 408/429/5xx) are retried with full
+  jitter exponential backoff: sleep random(0, min(cap, base * 2^attempt))
+- a batch that still fails - or gets a 4xx that retrying won't fix - is
+  appended to a dead-letter file (JSON lines) for later inspection/replay
+- each destination queue is bounded (max_pending); beyond that new events
+  are counted as dropped rather than growing memory during an outage
+
+Destinations come from EDM_NOTIFY_URLS (comma-separated) or EDM_NOTIFY_CONFIG,
+a JSON file like:
+    [{"name": "noc", "url": "https://noc.example.com/hooks/edm",
+      "event_types": ["interface_change", "error_detected"],
+      "headers": {"Authorization": "Bearer ..."}}]
+
+Run this file directly for a throughput benchmark against a local receiver:
+    python notifier.py
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import httpx
+
+RETRY_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class Destination:
+    """One downstream webhook and its pending events."""
+
+    def __init__(self, name: str, url: str, event_types=None, headers=None):
+        self.name = name
+        self.url = url
+        self.event_types = frozenset(event_types) if event_types else None  # None = every event type
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+        self.pending = deque()
+        self.wakeup = None
+        self.wakeup_requested = False
+        self.task = None
+
+        self.queued = 0
+        self.delivered = 0
+        self.batches = 0
+        self.retries = 0
+        self.dead_lettered = 0
+        self.dropped = 0
+        self.last_error = None
+
+    def wants(self, event_type: str, explicit: bool = False):
+        if self.event_types is None:
+            return not explicit
+        return event_type in self.event_types
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "url": self.url,
+            "event_types": sorted(self.event_types) if self.event_types else "all",
+            "pending": len(self.pending),
+            "queued": self.queued,
+            "delivered": self.delivered,
+            "batches": self.batches,
+            "retries": self.retries,
+            "dead_lettered": self.dead_lettered,
+            "dropped": self.dropped,
+            "last_error": self.last_error
+        }
+
+
+def load_destinations(urls: str = None, config_file: str = None):
+    """Destinations from a comma-separated URL list and/or a JSON config file."""
+    destinations = []
+    for url in filter(None, (url.strip() for url in (urls or "").split(","))):
+        parts = urlsplit(url)
+        destinations.append(Destination(parts.netloc + parts.path, url))
+    if config_file:
+        with open(config_file) as handle:
+            for entry in json.load(handle):
+                destinations.append(Destination(entry.get("name") or entry["url"], entry["url"],
+                                                entry.get("event_types"), entry.get("headers")))
+    return destinations
+
+
+class Notifier:
+    """
+    Batched, retried delivery of events to downstream webhooks.
+
+    - batch_size:      most events per POST
+    - flush_interval:  longest an event waits for its batch to fill up
+    - max_retries:     retries per batch before it goes to the dead-letter file
+    - max_pending:     events queued per destination before new ones are dropped
+    - max_connections: size of the shared pool; httpx gets slower with many
+                       connections busy at once, so a small pool serves many
+                       destinations better than one connection each
+    """
+
+    def __init__(self, destinations, batch_size: int = 100, flush_interval: float = 0.5,
+                 max_retries: int = 5, backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 max_pending: int = 10_000, timeout: float = 10.0, max_connections: int = 20,
+                 dead_letter_path: str = None, source: str = "edm-webhook-server"):
+        self.destinations = list(destinations)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.dead_letter_path = dead_letter_path
+        self._prefix = b'{"source":' + json.dumps(source).encode() + b',"events":['
+        self._client = None
+        self._loop = None
+        self._stopping = False
+        self._dead_letter_lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._client is not None
+
+    def notify(self, event_type: str, event: dict, explicit: bool = False):
+        """
+        Queue an event for every destination that wants it. Never blocks;
+        returns the names of the destinations that queued it - not those whose
+        queue was full. explicit=True skips destinations taking every event
+        type - only ones listing it get it.
+        """
+        targets = [destination for destination in self.destinations if destination.wants(event_type, explicit)]
+        if not targets:
+            return []
+        body = json.dumps({"event_type": event_type, **event}, default=str).encode()
+        queued = []
+        for destination in targets:
+            if len(destination.pending) >= self.max_pending:
+                destination.dropped += 1
+                continue
+            destination.pending.append(body)
+            destination.queued += 1
+            queued.append(destination.name)
+            # Wake the sender early only once a full batch is waiting
+            if len(destination.pending) >= self.batch_size and not destination.wakeup_requested:
+                destination.wakeup_requested = True
+                if self._loop is not None:
+                    self._loop.call_soon_threadsafe(destination.wakeup.set)
+        return queued
+
+    async def start(self):
+        if self.running or not self.destinations:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._stopping = False
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+        )
+        for destination in self.destinations:
+            destination.wakeup = asyncio.Event()
+            destination.task = asyncio.create_task(self._sender(destination))
+
+    async def stop(self, drain_seconds: float = 10.0):
+        """Send what is queued (for up to drain_seconds), dead-letter the rest."""
+        if not self.running:
+            return
+        self._stopping = True
+        for destination in self.destinations:
+            destination.wakeup.set()
+        tasks = [destination.task for destination in self.destinations]
+        _done, unfinished = await asyncio.wait(tasks, timeout=drain_seconds)
+        for task in unfinished:
+            task.cancel()
+        await asyncio.gather(*unfinished, return_exceptions=True)
+        for destination in self.destinations:
+            if destination.pending:
+                batch = list(destination.pending)
+                destination.pending.clear()
+                await self._dead_letter(destination, batch, "server shutdown")
+        await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+    async def _sender(self, destination: Destination):
+        while True:
+            if len(destination.pending) < self.batch_size and not self._stopping:
+                try:
+                    await asyncio.wait_for(destination.wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            destination.wakeup.clear()
+            destination.wakeup_requested = False
+            while destination.pending:
+                batch = [destination.pending.popleft()
+                         for _ in range(min(self.batch_size, len(destination.pending)))]
+                await self._deliver(destination, batch)
+            if self._stopping:
+                return
+
+    async def _deliver(self, destination: Destination, batch):
+        body = self._prefix + b",".join(batch) + b"]}"
+        error = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self._client.post(destination.url, content=body, headers=destination.headers)
+                if response.status_code < 300:
+                    destination.delivered += len(batch)
+                    destination.batches += 1
+                    return True
+                error = f"HTTP {response.status_code}"
+                if response.status_code not in RETRY_STATUSES:
+                    break
+            except httpx.HTTPError as exc:
+                error = f"{type(exc).__name__}: {exc}"
+            if attempt == self.max_retries or self._stopping:
+                break
+            destination.retries += 1
+            await asyncio.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+        destination.last_error = error
+        await self._dead_letter(destination, batch, error)
+        return False
+
+    async def _dead_letter(self, destination: Destination, batch, error: str):
+        destination.dead_lettered += len(batch)
+        if not self.dead_letter_path:
+            return
+        record = json.dumps({
+            "failed_at": time.time(),
+            "destination": destination.name,
+            "url": destination.url,
+            "error": error,
+            "events": [json.loads(event) for event in batch]
+        }) + "\n"
+        await asyncio.to_thread(self._append_dead_letter, record)
+
+    def _append_dead_letter(self, record: str):
+        with self._dead_letter_lock, open(self.dead_letter_path, "a") as handle:
+            handle.write(record)
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval,
+            "max_retries": self.max_retries,
+            "dead_letter_file": self.dead_letter_path,
+            "destinations": [destination.stats() for destination in self.destinations]
+        }
+
+
+async def serve_receiver(host: str = "127.0.0.1", port: int = 0, started=None):
+    """
+    Tiny keep-alive HTTP server that stands in for downstream webhooks:
+    200 for any POST, 503 for paths containing '/fail'. Prints the bound
+    port when `started` is None, otherwise puts it on that queue.
+    """
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                length = 0
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                await reader.readexactly(length)
+                status = b"503 Service Unavailable" if "/fail" in request_line else b"200 OK"
+                writer.write(b"HTTP/1.1 " + status + b"\r\nContent-Length: 2\r\n\r\nok")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port, backlog=1024)
+    bound = server.sockets[0].getsockname()[1]
+    if started is None:
+        print(f"Receiver listening on http://{host}:{bound}")
+    else:
+        started.put(bound)
+    async with server:
+        await server.serve_forever()
+
+
+def _receiver_process(started):
+    asyncio.run(serve_receiver(started=started))
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    import os
+    import tempfile
+
+    # The receiver runs in its own process so it doesn't compete for our event loop
+    started = multiprocessing.Queue()
+    receiver = multiprocessing.Process(target=_receiver_process, args=(started,), daemon=True)
+    receiver.start()
+    port = started.get(timeout=10)
+    event = {"device": "core-sw1", "interface": "GigabitEthernet1/0/1", "status": "DOWN",
+             "severity": "HIGH", "recommended_action": "Investigate interface failure immediately"}
+    events = 50_000
+
+    async def run(destination_count):
+        # Each destination subscribes to its own event type, so every event goes to exactly one
+        destinations = [Destination(f"hook-{number}", f"http://127.0.0.1:{port}/hook/{number}",
+                                    event_types=[f"type-{number}"])
+                        for number in range(destination_count)]
+        notifier = Notifier(destinations, batch_size=200, flush_interval=0.05, max_pending=events)
+        await notifier.start()
+        started_at = time.perf_counter()
+        notify_seconds = 0.0
+        for number in range(events):
+            call_started = time.perf_counter()
+            notifier.notify(f"type-{number % destination_count}", event)
+            notify_seconds += time.perf_counter() - call_started
+            if number % 1000 == 0:
+                await asyncio.sleep(0)
+        while sum(destination.delivered for destination in destinations) < events:
+            await asyncio.sleep(0.005)
+        elapsed = time.perf_counter() - started_at
+        batches = sum(destination.batches for destination in destinations)
+        await notifier.stop()
+        return notify_seconds / events * 1e6, events / elapsed, batches
+
+    async def run_failing(dead_letter_path):
+        destination = Destination("flaky", f"http://127.0.0.1:{port}/fail")
+        notifier = Notifier([destination], batch_size=50, flush_interval=0.01, max_retries=3,
+                            backoff_base=0.01, dead_letter_path=dead_letter_path)
+        await notifier.start()
+        for _ in range(200):
+            notifier.notify("error_detected", event)
+        while destination.dead_lettered < 200:
+            await asyncio.sleep(0.01)
+        await notifier.stop()
+        return destination
+
+    print("📣 Outbound Notifier Benchmark")
+    print("=" * 50)
+    print(f"{events:,} events, batches of up to 200, one shared connection pool")
+    for destination_count in (1, 10, 100):
+        notify_us, throughput, batches = asyncio.run(run(destination_count))
+        print(f"{destination_count:>3} destination(s): {throughput:>9,.0f} events/sec delivered "
+              f"in {batches:,} POSTs, notify() {notify_us:.2f} µs")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "dead_letter.jsonl")
+        flaky = asyncio.run(run_failing(path))
+        with open(path) as handle:
+            lines = sum(1 for _ in handle)
+    print(f"Always-503 destination: {flaky.retries} retries, {flaky.dead_lettered} events dead-lettered "
+          f"({lines} batch records)")
+    receiver.terminate()
@@ -0,0 +1,469 @@
+"""
+Section 06: Prometheus Metrics
+
+Counters, gauges and latency histograms for the webhook servers, served in
+the Prometheus text format at /metrics:
+
+    edm_events_total{event_type="high_cpu",device="core-sw1"} 42
+    edm_handler_duration_seconds_bucket{event_type="high_cpu",le="0.0002"} 40
+
+Recording is cheap: a histogram observation is one bisect over a fixed bucket
+table plus two additions under an uncontended lock - no allocation once a
+label set has been seen. All formatting happens at scrape time.
+
+Latency buckets are log-linear: 1, 2, 3 ... 9 x every power of ten from 10µs
+to 10s, so resolution stays around 10% whether a handler takes 15µs or 1.5s.
+
+Several uvicorn workers? Set METRICS_MULTIPROC_DIR to a shared directory.
+Each worker writes its snapshot there (every second and on every scrape), and
+/metrics - whichever worker answers - adds the live workers' snapshots
+together. A worker removes its file when it stops; the file of a worker that
+died is removed by the next scrape, and one not rewritten for
+STALE_SNAPSHOT_INTERVALS write intervals (its PID now belongs to some other
+process) is ignored. Totals drop when a worker goes, which Prometheus's rate()
+reads as a counter reset.
+
+Run this file directly to measure the per-request cost:
+    python prometheus_metrics.py
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+STALE_SNAPSHOT_INTERVALS = 30
+
+# 1-9 x 10^-5 ... 1-9 x 10^1 seconds, then 100s
+LATENCY_BUCKETS = tuple(
+    round(multiplier * 10.0 ** exponent, 6) for exponent in range(-5, 2) for multiplier in range(1, 10)
+) + (100.0,)
+
+# Label value used once a metric has max_series label sets, so a flood of new
+# device names cannot grow memory without bound
+OVERFLOW_LABEL = "_other"
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names, values, extra=""):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    Shared label handling: one entry per label-value tuple, capped at max_series.
+
+    Counters and gauges can also be read from a function at scrape time
+    (function=), returning a number or {label tuple: number} - handy for
+    values other objects already keep, like a queue's depth.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), function=None, max_series: int = 2000):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self.max_series = max_series
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        """labels as stored - folded into the overflow series once the cap is reached (caller holds the lock)."""
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        if len(self._series) >= self.max_series:
+            return (OVERFLOW_LABEL,) * len(self.labelnames)
+        return tuple(str(value) for value in labels)
+
+    def samples(self):
+        """[[label values, value], ...] - JSON friendly, used for snapshots and merging."""
+        if self.function is not None:
+            value = self.function()
+            if isinstance(value, dict):
+                return [[list(labels), number] for labels, number in value.items()]
+            return [[[], value]]
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._series.items()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            try:
+                self._series[labels] += amount
+            except KeyError:
+                key = self._key(labels)
+                self._series[key] = self._series.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, labels=()):
+        with self._lock:
+            key = labels if labels in self._series else self._key(labels)
+            self._series[key] = value
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            try:
+                self._series[labels] += amount
+            except KeyError:
+                key = self._key(labels)
+                self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+
+class Histogram(Metric):
+    """Fixed-bucket histogram; each series is [per-bucket counts (+Inf last), sum]."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, **kwargs):
+        super().__init__(name, documentation, labelnames, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, labels=()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                key = self._key(labels)
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            return [[list(labels), [list(counts), total]] for labels, (counts, total) in self._series.items()]
+
+
+class MetricsRegistry:
+    """Holds this process's metrics and renders them - merged across workers when configured."""
+
+    def __init__(self, multiprocess_dir: str = None, write_interval: float = 1.0):
+        self.multiprocess_dir = multiprocess_dir
+        self.write_interval = write_interval
+        self._metrics = {}
+        self._writer = None
+        self._stop = threading.Event()
+        if multiprocess_dir:
+            os.makedirs(multiprocess_dir, exist_ok=True)
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=(), function=None, **kwargs):
+        return self._add(Counter(name, documentation, labelnames, function=function, **kwargs))
+
+    def gauge(self, name, documentation, labelnames=(), function=None, **kwargs):
+        return self._add(Gauge(name, documentation, labelnames, function=function, **kwargs))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, **kwargs):
+        return self._add(Histogram(name, documentation, labelnames, buckets=buckets, **kwargs))
+
+    def collect(self):
+        """{name: {kind, help, labelnames, buckets?, samples}} for this process."""
+        snapshot = {}
+        for metric in self._metrics.values():
+            entry = {
+                "kind": metric.kind,
+                "help": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "samples": metric.samples()
+            }
+            if metric.kind == "histogram":
+                entry["buckets"] = list(metric.buckets)
+            snapshot[metric.name] = entry
+        return snapshot
+
+    # --- multi-worker support -------------------------------------------------
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(self.multiprocess_dir, f"metrics-{os.getpid()}.json")
+
+    def write_snapshot(self):
+        """Atomically replace this worker's snapshot file."""
+        if not self.multiprocess_dir:
+            return
+        snapshot = self.collect()
+        temporary = f"{self.snapshot_path}.tmp"
+        with open(temporary, "w") as snapshot_file:
+            json.dump({"pid": os.getpid(), "written": time.time(), "metrics": snapshot}, snapshot_file)
+        os.replace(temporary, self.snapshot_path)
+
+    def start(self):
+        """Begin writing snapshots in the background (no-op in single-process mode)."""
+        if not self.multiprocess_dir or self._writer is not None:
+            return
+        self._stop.clear()
+        self._writer = threading.Thread(target=self._write_loop, name="metrics-snapshot-writer", daemon=True)
+        self._writer.start()
+
+    def stop(self):
+        if self._writer is None:
+            return
+        self._stop.set()
+        self._writer.join()
+        self._writer = None
+        try:
+            os.remove(self.snapshot_path)
+        except OSError:
+            pass
+
+    def _write_loop(self):
+        while not self._stop.wait(self.write_interval):
+            try:
+                self.write_snapshot()
+            except OSError:
+                pass  # Try again on the next tick
+
+    def _worker_snapshots(self):
+        """Metrics of every live worker in the shared directory; dead workers' snapshots are removed."""
+        snapshots = []
+        written_after = time.time() - STALE_SNAPSHOT_INTERVALS * self.write_interval
+        for file_name in os.listdir(self.multiprocess_dir):
+            if not (file_name.startswith("metrics-") and file_name.endswith(".json")):
+                continue
+            path = os.path.join(self.multiprocess_dir, file_name)
+            try:
+                with open(path) as snapshot_file:
+                    snapshot = json.load(snapshot_file)
+            except (OSError, ValueError):
+                continue  # Being replaced right now, or truncated by a crash
+            if not process_alive(snapshot["pid"]):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # Another worker's scrape got there first
+                continue
+            if snapshot["written"] >= written_after:
+                snapshots.append(snapshot["metrics"])
+        return snapshots
+
+    def merged(self):
+        """This process's metrics, or the sum over every worker in multiprocess mode."""
+        if not self.multiprocess_dir:
+            return self.collect()
+        self.write_snapshot()
+        return merge_snapshots(self._worker_snapshots())
+
+    def render(self):
+        return render_text(self.merged())
+
+
+def process_alive(pid: int):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge_snapshots(snapshots):
+    """Sum every series across workers' snapshots."""
+    merged = {}
+    for metrics in snapshots:
+        for name, entry in metrics.items():
+            target = merged.get(name)
+            if target is None:
+                target = merged[name] = {key: value for key, value in entry.items() if key != "samples"}
+                target["series"] = {}
+            series = target["series"]
+            for labels, value in entry["samples"]:
+                key = tuple(labels)
+                if entry["kind"] == "histogram":
+                    counts, total = value
+                    current = series.get(key)
+                    if current is None:
+                        series[key] = [list(counts), total]
+                    else:
+                        current[0] = [a + b for a, b in zip(current[0], counts)]
+                        current[1] += total
+                else:
+                    series[key] = series.get(key, 0) + value
+
+    for entry in merged.values():
+        entry["samples"] = [[list(labels), value] for labels, value in entry.pop("series").items()]
+    return merged
+
+
+def render_text(snapshot):
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name, entry in snapshot.items():
+        labelnames = entry["labelnames"]
+        lines.append(f"# HELP {name} {entry['help']}")
+        lines.append(f"# TYPE {name} {entry['kind']}")
+        if entry["kind"] != "histogram":
+            for labels, value in entry["samples"]:
+                lines.append(f"{name}{format_labels(labelnames, labels)} {format_value(value)}")
+            continue
+
+        bounds = [*entry["buckets"], float("inf")]
+        for labels, (counts, total) in entry["samples"]:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = f'le="{format_value(float(bound))}"'
+                lines.append(f"{name}_bucket{format_labels(labelnames, labels, le)} {cumulative}")
+            label_text = format_labels(labelnames, labels)
+            lines.append(f"{name}_sum{label_text} {format_value(float(total))}")
+            lines.append(f"{name}_count{label_text} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+class HTTPMetrics:
+    """The standard per-route HTTP metrics, registered on a MetricsRegistry."""
+
+    def __init__(self, registry: MetricsRegistry, prefix: str = "http"):
+        self.requests = registry.counter(
+            f"{prefix}_requests_total", "HTTP requests by method, route and status code",
+            ("method", "route", "status"))
+        self.duration = registry.histogram(
+            f"{prefix}_request_duration_seconds", "HTTP request latency by route", ("route",))
+        self.in_flight = registry.gauge(
+            f"{prefix}_requests_in_flight", "HTTP requests currently being served")
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing every HTTP request.
+
+    Requests are labelled with the route template (/devices/{name}/cpu, not
+    the raw URL) so label cardinality stays fixed. Paths in extra_paths are
+    used as labels even when a middleware answers before routing happens
+    (the 202 async ingest mode). Anything else becomes "unmatched".
+    """
+
+    def __init__(self, app, metrics: HTTPMetrics, extra_paths=()):
+        self.app = app
+        self.metrics = metrics
+        self.extra_paths = frozenset(extra_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.metrics.in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.metrics.in_flight.dec()
+            route = scope.get("route")
+            if route is not None:
+                label = getattr(route, "path", "unmatched")
+            else:
+                label = scope["path"] if scope["path"] in self.extra_paths else "unmatched"
+            self.metrics.requests.inc((scope["method"], label, str(status)))
+            self.metrics.duration.observe(elapsed, (label,))
+
+
+class EventMetrics:
+    """
+    EventRegistry observer: alert counts by event type and device, handler
+    latency and in-flight handlers by event type.
+
+        registry.observer = EventMetrics(metrics)
+    """
+
+    def __init__(self, registry: MetricsRegistry, prefix: str = "edm"):
+        self.events = registry.counter(
+            f"{prefix}_events_total", "Alerts handled by event type and device", ("event_type", "device"))
+        self.errors = registry.counter(
+            f"{prefix}_event_errors_total", "Alerts whose handler raised, by event type", ("event_type",))
+        self.duration = registry.histogram(
+            f"{prefix}_handler_duration_seconds", "Handler latency by event type", ("event_type",))
+        self.in_flight = registry.gauge(
+            f"{prefix}_handlers_in_flight", "Handlers currently running, by event type", ("event_type",))
+
+    def dispatch_started(self, event_type):
+        self.in_flight.inc((event_type,))
+
+    def dispatch_finished(self, event_type, data, seconds, failed):
+        labels = (event_type,)
+        self.in_flight.dec(labels)
+        device = data.get("device", "unknown")
+        self.events.inc((event_type, device if isinstance(device, str) else str(device)))
+        self.duration.observe(seconds, labels)
+        if failed:
+            self.errors.inc(labels)
+
+
+if __name__ == "__main__":
+    import random
+
+    registry = MetricsRegistry()
+    events = registry.counter("bench_events_total", "Benchmark events", ("event_type", "device"))
+    latency = registry.histogram("bench_duration_seconds", "Benchmark latency", ("event_type",))
+    in_flight = registry.gauge("bench_in_flight", "Benchmark in-flight", ("event_type",))
+
+    rng = random.Random(9)
+    types = ["interface_change", "high_cpu", "low_memory", "config_change", "error_detected"]
+    labels = [(rng.choice(types), f"switch-{rng.randrange(500):03d}") for _ in range(4096)]
+    durations = [rng.lognormvariate(-8, 1.5) for _ in range(4096)]
+    requests = 500_000
+
+    started = time.perf_counter()
+    for number in range(requests):
+        event_type, device = labels[number & 4095]
+        in_flight.inc((event_type,))
+        events.inc((event_type, device))
+        latency.observe(durations[number & 4095], (event_type,))
+        in_flight.dec((event_type,))
+    per_request = (time.perf_counter() - started) / requests * 1e6
+
+    started = time.perf_counter()
+    text = registry.render()
+    render_ms = (time.perf_counter() - started) * 1000
+
+    # Four workers' snapshots added together, as /metrics does with METRICS_MULTIPROC_DIR
+    merged = merge_snapshots([registry.collect() for _ in range(4)])
+    total = sum(value for _labels, value in merged["bench_events_total"]["samples"])
+
+    print("📊 Prometheus Metrics Benchmark")
+    print("=" * 50)
+    print(f"Requests recorded:   {requests:,} (counter + histogram + in-flight gauge)")
+    print(f"Cost per request:    {per_request:.2f} µs")
+    print(f"Scrape render:       {render_ms:.1f} ms for {len(text.splitlines()):,} lines")
+    print(f"4-worker merge:      {total:,} events (expected {requests * 4:,})")
@@ -0,0 +1,213 @@
+"""
+Section 06: Syslog Mnemonic Classifier
+
+Cisco syslog messages carry a %FACILITY-SEVERITY-MNEMONIC tag:
+
+    %LINK-3-UPDOWN: Interface GigabitEthernet1/0/1, changed state to down
+    %PARSER-5-CFGLOG_LOGGEDCMD: User:admin  logged command:no shutdown
+
+SyslogClassifier pulls that tag out with one precompiled pattern, looks the
+(FACILITY, MNEMONIC) pair up in a rule table (a dict - O(1)), and runs only that
+rule's detail pattern, starting where the tag ended. Nothing is lowercased,
+sliced or copied per call.
+
+The rule table is plain data (DEFAULT_RULES, or a JSON file with the same
+shape), compiled once and swapped in with a single assignment, so rules can
+be reloaded while the server is running.
+
+Run this file directly for a 1M-line benchmark: python syslog_classifier.py
+"""
+
+import json
+import re
+from typing import NamedTuple
+
+# %FACILITY-SEVERITY-MNEMONIC: (facility parts start with a letter, so the
+# numeric severity can never be mistaken for part of the facility)
+MNEMONIC_TAG = re.compile(r"%([A-Z][A-Z0-9_]*(?:-[A-Z][A-Z0-9_]*)*)-([0-7])-([A-Z0-9_]+)\s*:?\s*")
+
+SEVERITY_NAMES = ("emergency", "alert", "critical", "error", "warning", "notice", "informational", "debug")
+
+# Each rule: which tags it matches, what they mean, and an optional detail
+# pattern whose named groups (interface, state, user, command, ...) are extracted
+DEFAULT_RULES = [
+    {
+        "tags": ["LINK-UPDOWN", "LINK-CHANGED", "LINEPROTO-UPDOWN"],
+        "category": "interface",
+        "event_type": "interface_change",
+        "pattern": (r"(?:Line protocol on )?Interface (?P<interface>[^,\s]+), "
+                    r"changed state to (?P<state>administratively down|down|up)")
+    },
+    {
+        "tags": ["PARSER-CFGLOG_LOGGEDCMD"],
+        "category": "config",
+        "event_type": "config_change",
+        "pattern": r"User:\s*(?P<user>\S+)\s+logged command:\s*(?P<command>.*)"
+    },
+    {
+        "tags": ["SYS-CONFIG_I"],
+        "category": "config",
+        "event_type": "config_change",
+        "pattern": r"Configured from (?P<source>\S+) by (?P<user>\S+)"
+    },
+    {
+        "tags": ["SEC_LOGIN-LOGIN_FAILED", "SEC_LOGIN-LOGIN_SUCCESS"],
+        "category": "security",
+        "event_type": "error_detected",
+        "pattern": r"\[user: (?P<user>[^\]]*)\]"
+    },
+    {
+        "tags": ["OSPF-ADJCHG"],
+        "category": "routing",
+        "event_type": "error_detected",
+        "pattern": r"Nbr (?P<neighbor>\S+) on (?P<interface>\S+) from \S+ to (?P<state>[A-Z_]+)"
+    },
+    {
+        "tags": ["BGP-ADJCHANGE"],
+        "category": "routing",
+        "event_type": "error_detected",
+        "pattern": r"neighbor (?P<neighbor>\S+)(?: vpn vrf \S+)? (?P<state>Up|Down)"
+    },
+    {
+        "tags": ["SYS-RELOAD", "SYS-RESTART", "PLATFORM-ERROR", "PLATFORM_ENV-FAN", "ENVIRONMENTAL-FAN"],
+        "category": "error",
+        "event_type": "error_detected",
+        "pattern": None
+    },
+]
+
+
+class SyslogEvent(NamedTuple):
+    """What the classifier found in one syslog line (missing fields are None)."""
+    facility: str
+    severity: int
+    mnemonic: str
+    category: str
+    event_type: str
+    interface: str = None
+    state: str = None
+    user: str = None
+    details: dict = None
+
+    @property
+    def tag(self):
+        return f"%{self.facility}-{self.severity}-{self.mnemonic}"
+
+    @property
+    def severity_name(self):
+        return SEVERITY_NAMES[self.severity]
+
+    def as_dict(self):
+        return {
+            "tag": self.tag,
+            "facility": self.facility,
+            "severity_level": self.severity,
+            "severity_name": self.severity_name,
+            "mnemonic": self.mnemonic,
+            "category": self.category,
+            "event_type": self.event_type,
+            "interface": self.interface,
+            "state": self.state,
+            "user": self.user,
+            "details": self.details or {}
+        }
+
+
+def compile_rules(rules):
+    """Turn rule data into {(FACILITY, MNEMONIC): (category, event_type, compiled pattern)}."""
+    table = {}
+    for rule in rules:
+        pattern = re.compile(rule["pattern"]) if rule.get("pattern") else None
+        entry = (rule["category"], rule.get("event_type", "error_detected"), pattern)
+        for tag in rule["tags"]:
+            # Mnemonics never contain '-', facilities sometimes do
+            facility, mnemonic = tag.rsplit("-", 1)
+            table[(facility, mnemonic)] = entry
+    return table
+
+
+class SyslogClassifier:
+    """Single-pass classifier backed by a reloadable, table-driven rule set."""
+
+    def __init__(self, rules=None):
+        self.rule_count = 0
+        self._table = {}
+        self.load_rules(DEFAULT_RULES if rules is None else rules)
+
+    def load_rules(self, rules):
+        """Compile and swap in a new rule set (in-flight calls keep the old table)."""
+        table = compile_rules(rules)
+        self._table = table
+        self.rule_count = len(rules)
+
+    def load_rules_file(self, path):
+        """Reload rules from a JSON file containing a list shaped like DEFAULT_RULES."""
+        with open(path) as rules_file:
+            self.load_rules(json.load(rules_file))
+
+    def classify(self, message: str):
+        """Classify one syslog line. Returns a SyslogEvent, or None when it has no mnemonic tag."""
+        tag = MNEMONIC_TAG.search(message)
+        if tag is None:
+            return None
+        facility, severity, mnemonic = tag.groups()
+        severity = int(severity)
+
+        rule = self._table.get((facility, mnemonic))
+        if rule is None:
+            category = "error" if severity <= 3 else "other"
+            return SyslogEvent(facility, severity, mnemonic, category,
+                               "error_detected" if severity <= 3 else "syslog")
+
+        category, event_type, pattern = rule
+        if pattern is None:
+            return SyslogEvent(facility, severity, mnemonic, category, event_type)
+        detail = pattern.search(message, tag.end())
+        if detail is None:
+            return SyslogEvent(facility, severity, mnemonic, category, event_type)
+        fields = detail.groupdict()
+        return SyslogEvent(
+            facility, severity, mnemonic, category, event_type,
+            interface=fields.pop("interface", None),
+            state=fields.pop("state", None),
+            user=fields.pop("user", None),
+            details=fields or None
+        )
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    templates = [
+        "%LINK-3-UPDOWN: Interface GigabitEthernet1/0/{n}, changed state to down",
+        "%LINK-3-UPDOWN: Interface GigabitEthernet1/0/{n}, changed state to up",
+        "%LINEPROTO-5-UPDOWN: Line protocol on Interface Vlan{n}, changed state to up",
+        "%PARSER-5-CFGLOG_LOGGEDCMD: User:admin{n}  logged command:interface Gi1/0/{n}",
+        "%SYS-5-CONFIG_I: Configured from console by netops{n} on vty0 (10.0.0.{n})",
+        "%SEC_LOGIN-4-LOGIN_FAILED: Login failed [user: guest{n}] [Source: 10.9.9.{n}]",
+        "%OSPF-5-ADJCHG: Process 1, Nbr 10.0.0.{n} on Gi0/1 from FULL to DOWN, Neighbor Down",
+        "%PLATFORM-2-ERROR: Fan tray {n} failure detected",
+        "%DOT1X-5-FAIL: Authentication failed for client on Interface Gi1/0/{n}",
+        "Mar  1 10:00:{n:02d} router-{n}: no mnemonic on this line at all",
+    ]
+    rng = random.Random(5)
+    lines = [
+        f"<189>{rng.randrange(10000)}: *Mar  1 10:00:00.000: " + rng.choice(templates).format(n=rng.randrange(48))
+        for _ in range(1_000_000)
+    ]
+
+    classifier = SyslogClassifier()
+    started = time.perf_counter()
+    categories = {}
+    for line in lines:
+        event = classifier.classify(line)
+        category = event.category if event else "unclassified"
+        categories[category] = categories.get(category, 0) + 1
+    elapsed = time.perf_counter() - started
+
+    print("🏷️  Syslog Classifier Benchmark")
+    print("=" * 50)
+    print(f"Lines:        {len(lines):,}")
+    print(f"Throughput:   {len(lines) / elapsed:,.0f} lines/sec ({elapsed / len(lines) * 1e6:.2f} µs/line)")
+    print(f"Categories:   {categories}")
@@ -0,0 +1,375 @@
+"""
+Section 06: Syslog Receiver (UDP / TCP)
+
+Every EDM webhook costs the router an applet run plus a curl process. Most of
+those applets only forward a syslog line the router already produces, so the
+server can just as well receive syslog directly:
+
+    logging host 192.168.1.100 transport udp port 5514
+
+SyslogReceiver listens on UDP and/or TCP, parses RFC 3164 / RFC 5424 /
+Cisco-style lines and turns the ones the classifier knows -
+%LINK-3-UPDOWN, %PARSER-5-CFGLOG_LOGGEDCMD, error-level tags - into the same
+dicts the EDM applets post:
+
+    {"event_type": "interface_change", "device": "core-sw1", "interface": ...,
+     "timestamp": ..., "raw_message": "%LINK-3-UPDOWN: ...", "source": "syslog"}
+
+They are handed to submit(event_type, data) - in the server, the same ingest
+queue and handlers the HTTP routes use.
+
+- UDP: the socket is non-blocking and registered with loop.add_reader; each
+  wake-up drains up to batch_size datagrams in one go instead of one callback
+  per packet. SO_RCVBUF is raised so bursts wait in the kernel, not get dropped
+- TCP: octet-counted frames (RFC 6587: "123 <189>...") or newline-delimited
+  lines; every read() is split into all the complete frames it holds
+- parsing is plain string slicing - the only regex is the classifier's tag match
+
+Run this file directly for a benchmark with a local sender process:
+    python syslog_receiver.py --messages 200000
+"""
+
+import asyncio
+import socket
+import time
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+MONTHS = frozenset(("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"))
+FORWARDED_EVENT_TYPES = frozenset(("interface_change", "config_change", "error_detected"))
+# The field each handler reads the syslog text from
+MESSAGE_FIELDS = {"interface_change": "raw_message", "config_change": "syslog_message",
+                  "error_detected": "error_message"}
+
+
+class SyslogMessage(NamedTuple):
+    """One parsed syslog line (fields the sender left out are None)."""
+    facility: int
+    severity: int
+    timestamp: str
+    hostname: str
+    app: str
+    message: str
+
+
+def parse_syslog(line: str):
+    """
+    Parse an RFC 5424, RFC 3164 or Cisco IOS syslog line. Returns a
+    SyslogMessage, or None when the line has no <PRI> header.
+    """
+    if not line.startswith("<"):
+        return None
+    end = line.find(">", 1, 5)
+    if end < 0 or not line[1:end].isdigit():
+        return None
+    priority = int(line[1:end])
+    rest = line[end + 1:]
+
+    if rest.startswith("1 "):
+        # RFC 5424: VERSION TIMESTAMP HOSTNAME APP-NAME PROCID MSGID STRUCTURED-DATA MSG
+        fields = rest.split(" ", 6)
+        if len(fields) < 7:
+            return None
+        _version, timestamp, hostname, app, _procid, _msgid, data = fields
+        if data.startswith("-"):
+            message = data[2:]
+        else:
+            message = _skip_structured_data(data)
+        if message.startswith("﻿"):
+            message = message[1:]
+        return SyslogMessage(priority >> 3, priority & 7, _nil(timestamp), _nil(hostname), _nil(app), message)
+
+    if rest[:3] in MONTHS and len(rest) > 16 and rest[15] == " ":
+        # RFC 3164: "Mmm dd hh:mm:ss HOSTNAME TAG: MSG"
+        timestamp = rest[:15]
+        hostname, _, message = rest[16:].partition(" ")
+        if hostname.endswith(":") or hostname.startswith("%"):
+            # No hostname - the token was already the tag / message
+            hostname, message = None, rest[16:]
+        return SyslogMessage(priority >> 3, priority & 7, timestamp, hostname, None, message)
+
+    # Cisco IOS default: "<189>52: *Mar  1 18:46:11.123: %LINK-3-UPDOWN: ..." - no
+    # hostname; the classifier finds the %TAG wherever it is
+    return SyslogMessage(priority >> 3, priority & 7, None, None, None, rest)
+
+
+def _nil(value):
+    return None if value == "-" else value
+
+
+def _skip_structured_data(data: str):
+    """Return what follows the [SD-ELEMENT]... block of an RFC 5424 line."""
+    position = 0
+    while position < len(data) and data[position] == "[":
+        position += 1
+        while position < len(data) and data[position] != "]":
+            position += 2 if data[position] == "\\" else 1
+        position += 1
+    return data[position + 1:]
+
+
+def syslog_to_event(message: SyslogMessage, source: str, classifier):
+    """
+    (event_type, data) in the shape the EDM applets post, or None when the
+    line is not something a handler acts on.
+    """
+    syslog = classifier.classify(message.message)
+    if syslog is None or syslog.event_type not in FORWARDED_EVENT_TYPES:
+        return None
+    text = message.message
+    tag_start = text.find("%")
+    if tag_start > 0:
+        text = text[tag_start:]  # Drop the Cisco sequence number / timestamp prefix
+    data = {
+        "event_type": syslog.event_type,
+        "device": message.hostname or source,
+        "timestamp": message.timestamp or datetime.now(timezone.utc).isoformat(),
+        MESSAGE_FIELDS[syslog.event_type]: text,
+        "source": "syslog"
+    }
+    if syslog.interface:
+        data["interface"] = syslog.interface
+    return syslog.event_type, data
+
+
+class SyslogReceiver:
+    """
+    UDP/TCP syslog listener feeding submit(event_type, data) -> accepted.
+
+    - udp_port / tcp_port: None leaves that transport off
+    - batch_size:          datagrams drained per wake-up
+    - receive_buffer:      requested SO_RCVBUF for the UDP socket
+    """
+
+    def __init__(self, submit, classifier, host: str = "0.0.0.0", udp_port: int = None, tcp_port: int = None,
+                 batch_size: int = 256, receive_buffer: int = 8 * 1024 * 1024, max_line: int = 8192):
+        self.submit = submit
+        self.classifier = classifier
+        self.host = host
+        self.udp_port = udp_port
+        self.tcp_port = tcp_port
+        self.batch_size = batch_size
+        self.receive_buffer = receive_buffer
+        self.max_line = max_line
+        self._udp_socket = None
+        self._tcp_server = None
+        self._loop = None
+
+        self.received = 0
+        self.forwarded = 0
+        self.ignored = 0
+        self.invalid = 0
+        self.rejected = 0
+        self.batches = 0
+        self.tcp_connections = 0
+
+    @property
+    def running(self):
+        return self._udp_socket is not None or self._tcp_server is not None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        if self.udp_port is not None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer)
+            sock.bind((self.host, self.udp_port))
+            sock.setblocking(False)
+            self.udp_port = sock.getsockname()[1]  # Port 0 picks a free one
+            self._udp_socket = sock
+            self._loop.add_reader(sock.fileno(), self._drain_udp)
+        if self.tcp_port is not None:
+            self._tcp_server = await asyncio.start_server(self._handle_tcp, self.host, self.tcp_port)
+            self.tcp_port = self._tcp_server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._udp_socket is not None:
+            self._loop.remove_reader(self._udp_socket.fileno())
+            self._udp_socket.close()
+            self._udp_socket = None
+        if self._tcp_server is not None:
+            self._tcp_server.close()
+            await self._tcp_server.wait_closed()
+            self._tcp_server = None
+
+    def _drain_udp(self):
+        batch = []
+        recvfrom = self._udp_socket.recvfrom
+        try:
+            for _ in range(self.batch_size):
+                batch.append(recvfrom(self.max_line))
+        except (BlockingIOError, InterruptedError):
+            pass
+        if batch:
+            self.batches += 1
+            for datagram, address in batch:
+                self._process(datagram, address[0])
+
+    async def _handle_tcp(self, reader, writer):
+        self.tcp_connections += 1
+        source = writer.get_extra_info("peername")[0]
+        buffer = b""
+        try:
+            while True:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    break
+                buffer = self._split_frames(buffer + chunk, source)
+                if len(buffer) > self.max_line:
+                    self.invalid += 1
+                    buffer = b""  # Runaway frame - resynchronize on the next one
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _split_frames(self, buffer: bytes, source: str):
+        """Process every complete frame in buffer; return the incomplete tail."""
+        position = 0
+        self.batches += 1
+        while position < len(buffer):
+            if buffer[position:position + 1].isdigit():
+                # Octet counting: "<length> <frame>"
+                space = buffer.find(b" ", position, position + 8)
+                if space < 0:
+                    break
+                end = space + 1 + int(buffer[position:space])
+                if end > len(buffer):
+                    break
+                self._process(buffer[space + 1:end], source)
+                position = end
+            else:
+                end = buffer.find(b"\n", position)
+                if end < 0:
+                    break
+                if end > position:
+                    self._process(buffer[position:end].rstrip(b"\r"), source)
+                position = end + 1
+        return buffer[position:]
+
+    def _process(self, raw: bytes, source: str):
+        self.received += 1
+        message = parse_syslog(raw.decode("utf-8", "replace").rstrip("\n"))
+        if message is None:
+            self.invalid += 1
+            return
+        event = syslog_to_event(message, source, self.classifier)
+        if event is None:
+            self.ignored += 1
+            return
+        if self.submit(*event):
+            self.forwarded += 1
+        else:
+            self.rejected += 1
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "udp_port": self.udp_port if self._udp_socket is not None else None,
+            "tcp_port": self.tcp_port if self._tcp_server is not None else None,
+            "received": self.received,
+            "forwarded": self.forwarded,
+            "ignored": self.ignored,
+            "invalid": self.invalid,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "tcp_connections": self.tcp_connections
+        }
+
+
+def kernel_udp_drops():
+    """Datagrams the kernel dropped for full receive buffers (Linux only, else None)."""
+    try:
+        with open("/proc/net/snmp") as snmp:
+            lines = [line.split() for line in snmp if line.startswith("Udp:")]
+        return int(lines[1][lines[0].index("RcvbufErrors")])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+SAMPLE_LINES = [
+    "<187>{n}: *Mar  1 18:46:11.123: %LINK-3-UPDOWN: Interface GigabitEthernet1/0/{port}, changed state to down",
+    "<189>1 2024-03-01T18:46:11.123Z edge-rtr{device} IOS - - - %PARSER-5-CFGLOG_LOGGEDCMD: "
+    "User:admin  logged command:interface GigabitEthernet1/0/{port}",
+    "<186>Mar  1 18:46:11 core-sw{device} %PLATFORM-2-ERROR: Fan tray {port} failure detected",
+    "<190>{n}: *Mar  1 18:46:11.123: %SYS-6-LOGGINGHOST_STARTSTOP: Logging to host 192.168.1.100 started",
+]
+
+
+def _sender(transport: str, port: int, messages: int, rate: float):
+    """Sender process: messages syslog lines at rate/sec (0 = as fast as possible)."""
+    lines = [SAMPLE_LINES[n % len(SAMPLE_LINES)].format(n=n, port=n % 48 + 1, device=n % 500).encode()
+             for n in range(messages)]
+    if transport == "udp":
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        send = lambda line: sock.sendto(line, ("127.0.0.1", port))  # noqa: E731
+    else:
+        sock = socket.create_connection(("127.0.0.1", port))
+        send = None
+    started = time.perf_counter()
+    if send is None:
+        # TCP: write in chunks of newline-framed lines
+        for first in range(0, messages, 1000):
+            sock.sendall(b"\n".join(lines[first:first + 1000]) + b"\n")
+            if rate > 0:
+                delay = started + (first + 1000) / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+    else:
+        for number, line in enumerate(lines):
+            send(line)
+            if rate > 0 and number % 100 == 0:
+                delay = started + number / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+    sock.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    import multiprocessing
+
+    from syslog_classifier import SyslogClassifier
+
+    parser = argparse.ArgumentParser(description="Syslog receiver throughput and UDP drop rate")
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--rates", default="20000,50000,0", help="UDP send rates to try (0 = flat out)")
+    args = parser.parse_args()
+
+    async def run(transport: str, rate: float):
+        events = []
+        receiver = SyslogReceiver(lambda event_type, data: events.append(event_type) is None,
+                                  SyslogClassifier(), host="127.0.0.1",
+                                  udp_port=0 if transport == "udp" else None,
+                                  tcp_port=0 if transport == "tcp" else None)
+        await receiver.start()
+        kernel_before = kernel_udp_drops()
+        sender = multiprocessing.Process(target=_sender, args=(
+            transport, receiver.udp_port if transport == "udp" else receiver.tcp_port, args.messages, rate))
+        started = time.perf_counter()
+        sender.start()
+        last_count, last_change = 0, time.perf_counter()
+        # Wait until everything arrived, or nothing new arrived for half a second
+        while receiver.received < args.messages and time.perf_counter() - last_change < 0.5:
+            await asyncio.sleep(0.01)
+            if receiver.received != last_count:
+                last_count, last_change = receiver.received, time.perf_counter()
+        finished = last_change if receiver.received < args.messages else time.perf_counter()
+        await asyncio.to_thread(sender.join)
+        await receiver.stop()
+        kernel_after = kernel_udp_drops()
+        kernel = kernel_after - kernel_before if kernel_before is not None else None
+        return receiver, receiver.received / (finished - started), kernel
+
+    print("📡 Syslog Receiver Benchmark")
+    print("=" * 60)
+    print(f"{args.messages:,} messages per run (3 of 4 are forwarded as alerts, 1 is ignored)")
+    for rate in (float(value) for value in args.rates.split(",")):
+        receiver, throughput, kernel = asyncio.run(run("udp", rate))
+        lost = 1 - receiver.received / args.messages
+        label = f"{rate:,.0f}/s" if rate else "flat out"
+        print(f"UDP {label:>10}: {throughput:>8,.0f} msg/s received, {lost:6.2%} dropped"
+              + (f" (kernel RcvbufErrors +{kernel:,})" if kernel is not None else "")
+              + f", {receiver.received / max(receiver.batches, 1):.0f} datagrams per wake-up")
+    receiver, throughput, _kernel = asyncio.run(run("tcp", 0))
+    print(f"TCP   flat out: {throughput:>8,.0f} msg/s received, {receiver.forwarded:,} forwarded, "
+          f"{receiver.ignored:,} ignored, {receiver.invalid} invalid")
@@ -0,0 +1,68 @@
+"""
+Tests for EventStore: rotation at max_events, spill files and interned names.
+
+Run from this folder: python -m pytest -q
+"""
+
+import time
+
+from event_store import EventStore
+
+
+def fill(store, alerts: int, devices: int = None):
+    for number in range(alerts):
+        device = f"sw-{number if devices is None else number % devices:04d}"
+        store.append("interface_change", device, "Gi1/0/1", "INFO", 1_709_280_000 + number)
+
+
+def wait_for_spills(store):
+    deadline = time.monotonic() + 5
+    while store._spilling and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_full_store_drops_the_oldest_chunk_and_keeps_the_newest():
+    store = EventStore(max_events=100)
+    fill(store, 1000)
+
+    assert 90 <= len(store) < 100
+    assert store.dropped_events == 1000 - len(store)
+    assert store.latest(1)[1][-1]["device"] == "sw-0999"
+    assert store.count(device="sw-0999") == 1
+    assert store.count(device="sw-0005") == 0
+
+
+def test_names_of_rotated_out_devices_are_forgotten():
+    store = EventStore(max_events=100)
+    fill(store, 10_000)
+
+    assert store.stats()["devices"] == len(store)
+    assert len(store.strings["device"].names) <= 101
+    assert len(store.strings["interface"].names) <= 101
+
+
+def test_row_numbers_survive_rotation():
+    store = EventStore(max_events=100)
+    fill(store, 95)
+    rows = store.select(device="sw-0094")
+    fill(store, 10)  # Rotates the first chunk out
+
+    assert store.records(rows)[0]["device"] == "sw-0094"
+
+
+def test_spilled_alerts_stay_queryable(tmp_path):
+    store = EventStore(max_events=100, spill_dir=tmp_path)
+    fill(store, 1000, devices=7)
+    wait_for_spills(store)
+
+    assert store.spilled_events + len(store) == 1000
+    assert store.count() == 1000
+    assert store.count(device="sw-0001") == 143
+    assert store.count(start=1_709_280_500, end=1_709_280_600) == 100
+    matching, events = store.latest(5, device="sw-0001")
+    assert matching == 143
+    assert [event["received"] for event in events] == [1_709_280_000 + number for number in range(967, 1000, 7)]
+    assert sum(store.counts_per_device_per_hour()["sw-0001"].values()) == 143
+
+    # A new store on the same directory reads the files of the last one
+    assert EventStore(max_events=100, spill_dir=tmp_path).count() == store.spilled_events
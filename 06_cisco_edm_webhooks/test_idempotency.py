@@ -0,0 +1,71 @@
+"""
+Tests for IdempotencyMiddleware: concurrent copies of one delivery.
+
+Run from this folder: python -m pytest -q
+"""
+
+import asyncio
+
+import httpx
+
+from idempotency import IdempotencyCache, IdempotencyMiddleware
+
+BODY = b'{"event_type": "error_detected", "device": "core-sw1", "error_message": "%SYS-2-MALLOCFAIL"}'
+
+
+def make_app(statuses):
+    """An ASGI app answering each request with the next status, after a pause so copies overlap."""
+    calls = []
+
+    async def app(scope, receive, send):
+        await receive()
+        calls.append(scope["path"])
+        await asyncio.sleep(0.01)
+        status = statuses[min(len(calls), len(statuses)) - 1]
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"status": %d}' % status})
+
+    return app, calls
+
+
+async def post_copies(app, cache, copies: int):
+    middleware = IdempotencyMiddleware(app, cache=cache, paths=["/error-alert"])
+    transport = httpx.ASGITransport(app=middleware)
+    async with httpx.AsyncClient(transport=transport, base_url="http://edm.test") as client:
+        return await asyncio.gather(*(client.post("/error-alert", content=BODY) for _ in range(copies)))
+
+
+def test_concurrent_copies_share_one_success():
+    app, calls = make_app([200])
+    cache = IdempotencyCache()
+    responses = asyncio.run(post_copies(app, cache, 4))
+
+    assert [response.status_code for response in responses] == [200] * 4
+    assert len(calls) == 1
+    assert sum(response.headers.get("idempotent-replay") == "true" for response in responses) == 3
+    assert cache.stats()["in_progress"] == 0
+
+
+def test_concurrent_copies_after_refusal_are_each_handled():
+    # Admission control (429) runs inside this middleware: a refused first copy
+    # must not break the copies waiting for it
+    app, calls = make_app([429])
+    cache = IdempotencyCache()
+    responses = asyncio.run(post_copies(app, cache, 4))
+
+    assert [response.status_code for response in responses] == [429] * 4
+    assert len(calls) == 4
+    assert cache.stats()["in_progress"] == 0
+    assert cache.stats()["entries"] == 0
+
+
+def test_copy_waiting_after_refusal_can_succeed_and_is_replayed():
+    app, calls = make_app([429, 200])
+    cache = IdempotencyCache()
+    responses = asyncio.run(post_copies(app, cache, 4))
+
+    assert sorted(response.status_code for response in responses) == [200, 200, 200, 429]
+    assert len(calls) == 2
+    assert cache.stats()["in_progress"] == 0
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,28 @@
+"""
+Tests for Notifier.notify(): which destinations report an event as queued.
+
+Run from this folder: python -m pytest -q
+"""
+
+from notifier import Destination, Notifier
+
+EVENT = {"device": "core-sw1", "message": "Interface GigabitEthernet1/0/1 down"}
+
+
+def test_notify_names_only_destinations_that_queued_the_event():
+    noc = Destination("noc", "http://noc.test/hooks/edm")
+    paging = Destination("paging", "http://paging.test/hooks/edm")
+    notifier = Notifier([noc, paging], max_pending=2)
+    paging.pending.extend([b"{}", b"{}"])  # Full, as during an outage
+
+    assert notifier.notify("interface_change", EVENT) == ["noc"]
+    assert (noc.queued, paging.dropped) == (1, 1)
+
+
+def test_notify_returns_nothing_when_every_queue_is_full():
+    noc = Destination("noc", "http://noc.test/hooks/edm")
+    notifier = Notifier([noc], max_pending=1)
+
+    assert notifier.notify("interface_change", EVENT) == ["noc"]
+    assert notifier.notify("interface_change", EVENT) == []
+    assert noc.dropped == 1